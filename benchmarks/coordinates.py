@@ -0,0 +1,52 @@
+"""Formats random positions in every airframe's coordinate format with latlon_tostring and with the batch engine
+
+    python -m benchmarks.coordinates [--positions 10000] [--repeat 5]
+"""
+import argparse
+import random
+from time import perf_counter
+from LatLon23 import LatLon, Latitude, Longitude
+from src.coordinates import format_positions
+from src.drivers import latlon_tostring, DRIVERS
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--positions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    positions = [LatLon(Latitude(rng.uniform(-90, 90)), Longitude(rng.uniform(-180, 180)))
+                 for _ in range(args.positions)]
+    formats = list(dict.fromkeys(coordinate_format for driver in DRIVERS.values()
+                                 for coordinate_format in driver.coordinate_formats))
+
+    single_time = batch_time = 0
+    for _ in range(args.repeat):
+        start = perf_counter()
+        single = {coordinate_format: [latlon_tostring(position, coordinate_format.decimal_minutes_mode,
+                                                      coordinate_format.easting_zfill,
+                                                      coordinate_format.zfill_minutes,
+                                                      coordinate_format.one_digit_seconds,
+                                                      coordinate_format.precision)
+                                      for position in positions]
+                  for coordinate_format in formats}
+        formatted = perf_counter()
+        batch = format_positions(positions, formats)
+        single_time += formatted - start
+        batch_time += perf_counter() - formatted
+
+        if batch != single:
+            raise AssertionError("Batch formatting differs from latlon_tostring")
+
+    n = args.repeat * args.positions * len(formats)
+    print(f"{len(formats)} formats, {args.positions} positions, identical output")
+    print(f"{'':<16}{'total ms':>10}{'us/coordinate':>15}")
+    for name, elapsed in (("latlon_tostring", single_time), ("batch", batch_time)):
+        print(f"{name:<16}{elapsed / args.repeat * 1000:>10.1f}{elapsed / n * 1e6:>15.2f}")
+    print(f"speedup {single_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
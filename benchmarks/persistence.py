@@ -0,0 +1,147 @@
+"""Saves random profiles of growing size to a fresh database, row by row as Profile.save used to and with
+Profile.save, then saves them again after changing one waypoint. Larger profiles are then loaded and deleted
+with a query per waypoint as Profile.load and Profile.delete used to, and with them.
+
+    python -m benchmarks.persistence [--waypoints 10 100 1000] [--load 1000 10000] [--repeat 3]
+"""
+import argparse
+import copy
+import os
+import random
+import tempfile
+from time import perf_counter
+from LatLon23 import LatLon, Latitude, Longitude
+from src.db import DatabaseInterface
+from src.models import ProfileModel, WaypointModel, SequenceModel, IntegrityError, db
+from src.objects import Profile, Waypoint, MSN
+
+
+def random_profile(rng, count):
+    waypoints = [Waypoint(LatLon(Latitude(rng.uniform(-80, 80)), Longitude(rng.uniform(-179, 179))),
+                          elevation=rng.randint(0, 15000), name=f"WP {i}", sequence=rng.choice((0, 1, 2, 3)))
+                 for i in range(count - count // 10)]
+    waypoints += [MSN(LatLon(Latitude(rng.uniform(-80, 80)), Longitude(rng.uniform(-179, 179))),
+                      elevation=rng.randint(0, 15000), station=rng.choice((2, 3, 7, 8)))
+                  for _ in range(count // 10)]
+    return Profile("benchmark", waypoints=waypoints, aircraft="hornet")
+
+
+def save_row_by_row(self):
+    """Profile.save before rows were written in one transaction"""
+    try:
+        with db.atomic():
+            profile = ProfileModel.create(name=self.profilename, aircraft=self.aircraft)
+    except IntegrityError:
+        profile = ProfileModel.get(ProfileModel.name == self.profilename)
+    profile.aircraft = self.aircraft
+
+    delete_list = list(profile.waypoints) + list(profile.sequences)
+    sequences = {identifier: SequenceModel.create(identifier=identifier, profile=profile)
+                 for identifier in self.sequences}
+    for waypoint in self.waypoints:
+        WaypointModel.create(name=waypoint.name, latitude=waypoint.position.lat.decimal_degree,
+                             longitude=waypoint.position.lon.decimal_degree, elevation=waypoint.elevation,
+                             profile=profile, sequence=sequences.get(waypoint.sequence) if waypoint.wp_type != "MSN"
+                             else None, wp_type=waypoint.wp_type, station=getattr(waypoint, "station", 0))
+    for instance in delete_list:
+        instance.delete_instance()
+    profile.save()
+
+
+def load_row_by_row(profile_name):
+    """Profile.load before waypoints were fetched with their sequences in one query"""
+    profile = ProfileModel.get(ProfileModel.name == profile_name)
+    wps = list()
+    for waypoint in profile.waypoints:
+        try:
+            sequence = waypoint.sequence.identifier
+        except AttributeError:
+            sequence = 0
+        position = LatLon(Latitude(waypoint.latitude), Longitude(waypoint.longitude))
+        if waypoint.wp_type != "MSN":
+            wps.append(Waypoint(position, elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
+                                wp_type=waypoint.wp_type))
+        else:
+            wps.append(MSN(position, elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
+                           wp_type=waypoint.wp_type, station=waypoint.station))
+    return Profile(profile_name, waypoints=wps, aircraft=profile.aircraft)
+
+
+def delete_row_by_row(profile_name):
+    """Profile.delete before rows were deleted by profile"""
+    profile = ProfileModel.get(name=profile_name)
+    for waypoint in profile.waypoints:
+        waypoint.delete_instance()
+    profile.delete_instance(recursive=True)
+
+
+def timed_load(load, delete, profile, repeat):
+    """Seconds of loading and of deleting a saved profile"""
+    times = [0, 0]
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseInterface(os.path.join(directory, "benchmark.db"))
+            copy.deepcopy(profile).save()
+            start = perf_counter()
+            loaded = load(profile.profilename)
+            loaded_at = perf_counter()
+            delete(profile.profilename)
+            times[0] += loaded_at - start
+            times[1] += perf_counter() - loaded_at
+            database.close()
+        if len(loaded.waypoints) != len(profile.waypoints):
+            raise AssertionError("Loaded profile differs from the saved one")
+    return [elapsed / repeat for elapsed in times]
+
+
+def timed(save, profile, repeat):
+    """Seconds of the first save of a profile, of saving it again and of saving it after renaming a waypoint"""
+    times = [0, 0, 0]
+    for i in range(repeat):
+        with tempfile.TemporaryDirectory() as directory:
+            database = DatabaseInterface(os.path.join(directory, "benchmark.db"))
+            profile = copy.deepcopy(profile)
+            start = perf_counter()
+            save(profile)
+            saved = perf_counter()
+            save(profile)
+            saved_again = perf_counter()
+            profile.waypoints[len(profile.waypoints) // 2].name = f"renamed {i}"
+            save(profile)
+            times[0] += saved - start
+            times[1] += saved_again - saved
+            times[2] += perf_counter() - saved_again
+            database.close()
+    return [elapsed / repeat for elapsed in times]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--waypoints", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--load", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'':>10}{'row by row ms':>39}{'Profile.save ms':>39}")
+    print(f"{'waypoints':>10}" + f"{'first':>13}{'again':>13}{'one change':>13}" * 2 + f"{'speedup':>9}")
+    for count in args.waypoints:
+        profile = random_profile(rng, count)
+        single = timed(save_row_by_row, profile, args.repeat)
+        bulk = timed(Profile.save, profile, args.repeat)
+        print(f"{count:>10}" + "".join(f"{elapsed * 1000:>13.1f}" for elapsed in single + bulk)
+              + f"{sum(single) / sum(bulk):>8.1f}x")
+
+    print()
+    print(f"{'':>10}{'row by row ms':>26}{'Profile ms':>26}")
+    print(f"{'waypoints':>10}" + f"{'load':>13}{'delete':>13}" * 2 + f"{'load':>9}{'delete':>9}")
+    for count in args.load:
+        profile = random_profile(rng, count)
+        single = timed_load(load_row_by_row, delete_row_by_row, profile, args.repeat)
+        joined = timed_load(Profile.load, Profile.delete, profile, args.repeat)
+        print(f"{count:>10}" + "".join(f"{elapsed * 1000:>13.1f}" for elapsed in single + joined)
+              + "".join(f"{before / after:>8.1f}x" for before, after in zip(single, joined)))
+
+
+if __name__ == "__main__":
+    main()
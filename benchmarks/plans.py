@@ -0,0 +1,72 @@
+"""Plans random profiles for every aircraft, optimizes them and checks the result on the cockpit simulator
+
+    python -m benchmarks.plans [--waypoints 20] [--profiles 20]
+"""
+import argparse
+import configparser
+import logging
+import random
+from time import perf_counter
+from LatLon23 import LatLon, Latitude, Longitude
+from src.drivers import DRIVERS
+from src.objects import Profile, Waypoint
+
+LIMITS = dict(mirage=9, tomcat=3)
+
+
+def random_profile(aircraft, rng, count):
+    waypoints = [Waypoint(LatLon(Latitude(rng.uniform(1, 80) * rng.choice((-1, 1))),
+                                 Longitude(rng.uniform(1, 179) * rng.choice((-1, 1)))),
+                          elevation=rng.randint(0, 15000), sequence=rng.choice((0, 1)) if aircraft == "hornet" else 0)
+                 for _ in range(min(count, LIMITS.get(aircraft, count)))]
+    return Profile("benchmark", waypoints=waypoints, aircraft=aircraft)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--waypoints", type=int, default=20)
+    parser.add_argument("--profiles", type=int, default=20)
+    args = parser.parse_args()
+
+    config = configparser.ConfigParser()
+    config.add_section("PREFERENCES")
+    rng = random.Random(0)
+
+    print(f"{'aircraft':<10}{'presses':>9}{'optimized':>11}{'datagrams':>11}{'saved':>7}{'entry s':>9}"
+          f"{'plan ms':>9}{'optimize ms':>13}{'simulate ms':>13}")
+    for aircraft, driver_class in DRIVERS.items():
+        driver = driver_class(logging.getLogger(), config)
+        presses = optimized_presses = datagrams = saved = duration = 0
+        plan_time = optimize_time = simulate_time = 0
+        for _ in range(args.profiles):
+            profile = random_profile(aircraft, rng, args.waypoints)
+
+            start = perf_counter()
+            plan = driver.plan(profile)
+            planned = perf_counter()
+            optimized = driver.optimize(plan)
+            optimized_at = perf_counter()
+            original = driver.cockpit().run(plan)
+            simulated = driver.cockpit().run(optimized)
+            simulate_time += perf_counter() - optimized_at
+            plan_time += planned - start
+            optimize_time += optimized_at - planned
+
+            if (simulated.waypoints, simulated.sequences) != (original.waypoints, original.sequences):
+                raise AssertionError(f"Optimized {aircraft} plan enters a different waypoint table")
+
+            presses += len(plan)
+            optimized_presses += len(optimized)
+            datagrams += optimized.datagrams
+            saved += plan.datagrams - optimized.datagrams
+            duration += optimized.duration
+        driver.stop()
+
+        n = args.profiles
+        print(f"{aircraft:<10}{presses / n:>9.1f}{optimized_presses / n:>11.1f}{datagrams / n:>11.1f}{saved / n:>7.1f}"
+              f"{duration / n:>9.1f}{plan_time / n * 1000:>9.2f}{optimize_time / n * 1000:>13.2f}"
+              f"{simulate_time / n * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
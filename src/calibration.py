@@ -0,0 +1,212 @@
+"""Searches for the smallest release delays each aircraft still enters a standard profile with
+
+    python -m src.calibration viper [--simulated 0.05 0.15] [--settings settings.ini]
+
+Without --simulated the standard profiles are entered into DCS, which has to be running with the aircraft's
+keypad in its default state, and the entry is checked through the export stream. The results are saved as the
+aircraft's timing profile in settings.ini, which its driver loads instead of the global delays.
+"""
+import argparse
+import logging
+from configparser import ConfigParser
+from dataclasses import replace
+from math import ceil
+from LatLon23 import LatLon, Latitude, Longitude
+from src.dcs_bios import ExportStream, bios_doc, control_addresses, string_outputs
+from src.drivers import DRIVERS
+from src.objects import Profile, Waypoint
+from src.plan import PlanExecutor
+from src.readback import ReadbackVerifier
+from src.timing import TimingProfile, OPTIONS
+
+
+class CalibrationError(Exception):
+    pass
+
+
+# delays no driver uses, so every step recorded with them tells which key class its release delay comes from
+SENTINEL = TimingProfile(short_delay=1001.0, medium_delay=1002.0)
+
+
+def standard_profiles(aircraft):
+    """Two profiles entered alternately, every typed field differs between them so a trial never passes on what
+    the previous one left in the aircraft"""
+    profiles = list()
+    for sign, base in ((1, 41.6), (-1, 23.3)):
+        waypoints = [Waypoint(LatLon(Latitude(sign * (base + i * 1.1537)),
+                                     Longitude(-sign * (base + 3 * i + 2.3791))),
+                              elevation=(0, 1234, 5678)[i] if sign > 0 else (9876, 0, 321)[i],
+                              name=("Alpha", "WP 2", "Charlie")[i] if sign > 0 else ("Delta", "Echo", "")[i],
+                              sequence=1 if aircraft == "hornet" and i else 0)
+                     for i in range(3)]
+        profiles.append(Profile("calibration", waypoints=waypoints, aircraft=aircraft))
+    return profiles
+
+
+def planned(driver, profile, timing):
+    driver.use_timing(timing)
+    return driver.optimize(driver.plan(profile))
+
+
+def key_classes(plan):
+    """Timing attribute each step of a plan recorded with SENTINEL holds its key for, None for fixed delays"""
+    classes = {getattr(SENTINEL, attribute): attribute for attribute in OPTIONS}
+    return [classes.get(step.delay_release) for step in plan]
+
+
+class SimulatedTrial:
+    """Local stand-in for DCS: a press is only seen if it is held for at least the hold of its key class
+
+    holds is a TimingProfile of the minimum holds the stand-in aircraft needs, a trial passes if the cockpit model
+    ends up with the same waypoints as when every press is seen.
+    """
+    def __init__(self, driver, holds, profiles=None):
+        self.driver = driver
+        self.holds = holds
+        self.profiles = profiles if profiles is not None else standard_profiles(driver.aircraft)
+        self.classes, self.expected = list(), list()
+        for profile in self.profiles:
+            plan = planned(driver, profile, SENTINEL)
+            cockpit = driver.cockpit().run(plan)
+            self.classes.append(key_classes(plan))
+            self.expected.append((cockpit.waypoints, cockpit.sequences))
+        self.trials = 0
+
+    def seen(self, step, key_class):
+        return step.release is None or key_class is None or step.delay_release >= getattr(self.holds, key_class)
+
+    def __call__(self, timing):
+        self.trials += 1
+        for profile, classes, expected in zip(self.profiles, self.classes, self.expected):
+            cockpit = self.driver.cockpit()
+            for step, key_class in zip(planned(self.driver, profile, timing), classes):
+                if self.seen(step, key_class):
+                    for message in step.messages:
+                        cockpit.feed(message.decode("utf-8"))
+
+            if (cockpit.waypoints, cockpit.sequences) != expected:
+                return False
+        return True
+
+
+class ExportTrial:
+    """Enters the standard profiles into DCS and checks them through the export stream
+
+    Drivers that support readback have every slot read back. Otherwise a trial passes if the watched displays
+    changed as often as when the standard profiles were entered with the starting delays, which the first trial
+    records. Presses landing in the same export frame count as one change, so this errs on the slow side.
+    """
+    def __init__(self, driver, stream, verifier=None, settle=1.0, profiles=None):
+        self.driver = driver
+        self.stream = stream
+        self.verifier = verifier
+        self.settle = settle
+        self.profiles = profiles if profiles is not None else standard_profiles(driver.aircraft)
+        self.baseline = None
+        self.trials = 0
+
+    def enter(self, profile, timing):
+        mark = self.stream.mark()
+        PlanExecutor(self.driver.send, self.driver.logger, clock=self.driver.clock).run(
+            planned(self.driver, profile, timing))
+        self.driver.clock.sleep(self.settle)
+        return self.stream.parser.changes - mark[1]
+
+    def __call__(self, timing):
+        self.trials += 1
+        changes = list()
+        for profile in self.profiles:
+            changes.append(self.enter(profile, timing))
+            if self.verifier is not None and self.verifier.verify(profile):
+                return False
+
+        if self.verifier is not None:
+            return True
+        if self.baseline is None:
+            self.baseline = changes
+        return all(count >= baseline for count, baseline in zip(changes, self.baseline))
+
+
+def round_up(value, resolution):
+    return round(ceil(round(value / resolution, 6)) * resolution, 6)
+
+
+def calibrate(trial, start, floor=0.02, resolution=0.01, margin=1.25, logger=None):
+    """Smallest delays trial still passes with, searched for each key class in turn and scaled by margin
+
+    start has to pass, the short delay is searched first and the medium delay is never made shorter than it.
+    """
+    if not trial(start):
+        raise CalibrationError(f"Standard entry fails with the starting delays ({start})")
+
+    timing = start
+    for attribute in OPTIONS:
+        low = max(floor, timing.short_delay) if attribute == "medium_delay" else floor
+        high = getattr(timing, attribute)
+        if low < high and trial(replace(timing, **{attribute: low})):
+            high = low
+
+        # low fails and high passes from here on
+        while high - low > resolution:
+            middle = round_up((low + high) / 2, resolution / 2)
+            if trial(replace(timing, **{attribute: middle})):
+                high = middle
+            else:
+                low = middle
+
+        timing = replace(timing, **{attribute: high})
+        if logger is not None:
+            logger.info(f"Smallest passing {attribute}: {high}s")
+
+    short = round_up(timing.short_delay * margin, resolution)
+    return TimingProfile(short, max(short, round_up(timing.medium_delay * margin, resolution)))
+
+
+def export_trial(driver, doc_path, logger):
+    stream = ExportStream()
+    stream.watch(control_addresses(doc_path, driver.display_controls))
+    stream.start()
+
+    verifier = None
+    if driver.supports_readback:
+        verifier = ReadbackVerifier(driver, stream, string_outputs(doc_path, driver.readback_controls), logger)
+    return ExportTrial(driver, stream, verifier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrates the release delays of an aircraft")
+    parser.add_argument("aircraft", choices=sorted(DRIVERS))
+    parser.add_argument("--settings", default="settings.ini")
+    parser.add_argument("--simulated", nargs=2, type=float, metavar=("SHORT_HOLD", "MEDIUM_HOLD"),
+                        help="calibrate against a local stand-in needing these holds instead of DCS")
+    parser.add_argument("--margin", type=float, default=1.25)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger("calibration")
+    config = ConfigParser()
+    config.read(args.settings)
+    driver = DRIVERS[args.aircraft](logger, config)
+    start = driver.timing
+
+    if args.simulated:
+        trial = SimulatedTrial(driver, TimingProfile(*args.simulated))
+    else:
+        trial = export_trial(driver, bios_doc(config.get("PREFERENCES", "dcs_path", fallback=""),
+                                              driver.bios_module), logger)
+
+    try:
+        timing = calibrate(trial, start, margin=args.margin, logger=logger)
+    finally:
+        if isinstance(trial, ExportTrial):
+            trial.stream.stop()
+        driver.stop()
+
+    print(f"{args.aircraft}: {timing} after {trial.trials} trials, was {start}")
+    timing.save(config, args.aircraft)
+    with open(args.settings, "w") as f:
+        config.write(f)
+
+
+if __name__ == "__main__":
+    main()
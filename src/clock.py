@@ -0,0 +1,56 @@
+import asyncio
+from time import monotonic, sleep
+
+
+class Clock:
+    """Wall clock used by drivers and entry executors"""
+    def now(self):
+        return monotonic()
+
+    def sleep(self, delay):
+        if delay > 0:
+            sleep(delay)
+
+    def fork(self):
+        """Clock for one of several timelines running side by side, see join()"""
+        return self
+
+    def join(self, clocks):
+        """Catches up with forked clocks once their timelines ended"""
+
+    async def wait(self, event, delay):
+        """Waits for an asyncio event for at most delay seconds, returns whether it was set"""
+        try:
+            await asyncio.wait_for(event.wait(), delay)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class VirtualClock(Clock):
+    """Clock that advances instantly, so an entry is simulated in milliseconds while now() still tells how long
+    it would have taken"""
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep(self, delay):
+        if delay > 0:
+            self.time += delay
+
+    def fork(self):
+        # concurrent sleeps on one virtual clock would add up instead of overlapping
+        return VirtualClock(self.time)
+
+    def join(self, clocks):
+        self.time = max([self.time] + [clock.time for clock in clocks])
+
+    async def wait(self, event, delay):
+        await asyncio.sleep(0)
+        if event.is_set():
+            return True
+
+        self.sleep(delay)
+        return False
@@ -0,0 +1,132 @@
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(frozen=True)
+class CoordinateFormat:
+    """Options of latlon_tostring, how one airframe types a coordinate"""
+    decimal_minutes_mode: bool = False
+    easting_zfill: int = 2
+    zfill_minutes: int = 2
+    one_digit_seconds: bool = False
+    precision: int = 4
+
+
+def split_degrees(decimal_degrees):
+    """Unsigned whole degrees, decimal minutes, whole minutes and seconds of each value
+
+    Computed with the same floating point operations as LatLon23, so every digit formatted from them matches the
+    properties of its Latitude and Longitude objects.
+    """
+    values = np.abs(np.asarray(decimal_degrees, dtype=float))
+    degree = np.floor_divide(values, 1)
+    decimal_minute = (values - degree) * 60.
+    minute = np.floor_divide(decimal_minute, 1)
+    second = (decimal_minute - minute) * 60.
+    return degree, decimal_minute, minute, second
+
+
+def longitudes(decimal_degrees):
+    """Decimal degrees a LatLon23 Longitude holds for each value once wrapped into -180 to 180"""
+    wrapped = np.remainder(np.asarray(decimal_degrees, dtype=float) + 180, 360) - 180
+    sign = np.sign(wrapped)
+    degree, _, minute, second = split_degrees(wrapped)
+    return degree * sign + minute * sign / 60. + second * sign / 3600.
+
+
+def rounded(values, digits):
+    """Each value times 10 ** digits rounded half to even on its exact binary value, like round() and format()"""
+    scaled = values * 10. ** digits
+    result = np.rint(scaled)
+    # the product is inexact, so right next to a tie it may round the other way than the exact value
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        result[i] = int(f"{values[i]:.{digits}f}".replace(".", ""))
+    return result.astype(np.int64)
+
+
+def second_fraction(hundredths):
+    """What str(round(fraction, 2))[2:4] gives for a fraction rounded to that many hundredths"""
+    if hundredths == 100:
+        return "0"
+    if hundredths % 10 == 0:
+        return str(hundredths // 10)
+    return f"{hundredths:02}"
+
+
+# strings are looked up by the integers computed for each position instead of being formatted one by one,
+# tables go up to 60 minutes and seconds since a fraction just below one may round up to a whole unit
+@lru_cache()
+def number_strings(count, zfill, suffix=""):
+    return np.array([str(i).zfill(zfill) + suffix for i in range(count)], dtype=object)
+
+
+@lru_cache()
+def second_strings():
+    """Seconds as latlon_tostring types them, indexed by whole second * 101 + hundredths of its fraction and by
+    61 * 101 + whole second for seconds without a fraction"""
+    return np.array([f"{second:02}.{second_fraction(hundredths)}"
+                     for second in range(61) for hundredths in range(101)]
+                    + [f"{second:02}" for second in range(61)], dtype=object)
+
+
+class AxisDigits:
+    """Digits of one axis of every position, shared by all the formats built from them"""
+    def __init__(self, decimal_degrees):
+        self.degree, self.decimal_minute, self.minute, self.second = split_degrees(decimal_degrees)
+        self.degrees = self.degree.astype(np.int64)
+        self.cache = dict()
+
+    def decimal_minutes(self, precision, zfill):
+        key = ("DDM", precision, zfill)
+        if key not in self.cache:
+            whole, fraction = np.divmod(rounded(self.decimal_minute, precision), 10 ** precision)
+            if precision:
+                fractions = number_strings(10 ** precision, precision)
+                self.cache[key] = number_strings(61, zfill, ".")[whole] + fractions[fraction]
+            else:
+                self.cache[key] = number_strings(61, zfill)[whole]
+        return self.cache[key]
+
+    def minutes_seconds(self, zfill, one_digit_seconds):
+        key = ("DMS", zfill, one_digit_seconds)
+        if key not in self.cache:
+            whole = np.floor(self.second)
+            fraction = self.second - whole
+            whole = whole.astype(np.int64)
+            hundredths = rounded(fraction, 2)
+            has_fraction = fraction != 0
+
+            if one_digit_seconds:
+                # round() of the typed seconds, ties only happen on exactly half a second
+                up = has_fraction & (hundredths != 100) & ((hundredths > 50) | (hundredths == 50) & (whole % 2 == 1))
+                seconds = number_strings(7, 0)[(whole + up) // 10]
+            else:
+                seconds = second_strings()[np.where(has_fraction, whole * 101 + hundredths, 61 * 101 + whole)]
+            self.cache[key] = number_strings(61, zfill)[self.minute.astype(np.int64)] + seconds
+        return self.cache[key]
+
+    def format(self, coordinate_format, degree_zfill):
+        if coordinate_format.decimal_minutes_mode:
+            rest = self.decimal_minutes(coordinate_format.precision, coordinate_format.zfill_minutes)
+        else:
+            rest = self.minutes_seconds(coordinate_format.zfill_minutes, coordinate_format.one_digit_seconds)
+        return (number_strings(181, degree_zfill)[self.degrees] + rest).tolist()
+
+
+def format_coordinates(latitudes, longitudes, formats):
+    """Latitude and longitude strings of every position in each format, as latlon_tostring formats them
+
+    Values are decimal degrees as LatLon23 holds them, use longitudes() first for values that may need wrapping.
+    Returns a list of (lat, lon) per format.
+    """
+    lat_digits, lon_digits = AxisDigits(latitudes), AxisDigits(longitudes)
+    return {coordinate_format: list(zip(lat_digits.format(coordinate_format, 0),
+                                        lon_digits.format(coordinate_format, coordinate_format.easting_zfill)))
+            for coordinate_format in formats}
+
+
+def format_positions(positions, formats):
+    """format_coordinates of a list of LatLon positions"""
+    return format_coordinates([position.lat.decimal_degree for position in positions],
+                              [position.lon.decimal_degree for position in positions], formats)
@@ -1,15 +1,81 @@
-from src.models import ProfileModel, WaypointModel, SequenceModel, db
+import sqlite3
+from src.models import db
 from src.logger import get_logger
 
 
+# the tables as peewee created them from the models before schema versions were tracked, kept as they were so
+# every later change to the schema lives in the one migration that makes it
+V1_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS "profilemodel" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255) NOT NULL, '
+    '"aircraft" VARCHAR(255) NOT NULL)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS "profilemodel_name" ON "profilemodel" ("name")',
+    'CREATE TABLE IF NOT EXISTS "sequencemodel" ("id" INTEGER NOT NULL PRIMARY KEY, "identifier" INTEGER NOT NULL, '
+    '"profile_id" INTEGER NOT NULL, FOREIGN KEY ("profile_id") REFERENCES "profilemodel" ("id"))',
+    'CREATE INDEX IF NOT EXISTS "sequencemodel_profile_id" ON "sequencemodel" ("profile_id")',
+    'CREATE TABLE IF NOT EXISTS "waypointmodel" ("id" INTEGER NOT NULL PRIMARY KEY, "name" VARCHAR(255), '
+    '"latitude" REAL NOT NULL, "longitude" REAL NOT NULL, "elevation" INTEGER NOT NULL, '
+    '"profile_id" INTEGER NOT NULL, "sequence_id" INTEGER, "wp_type" VARCHAR(255) NOT NULL, '
+    '"station" INTEGER NOT NULL, FOREIGN KEY ("profile_id") REFERENCES "profilemodel" ("id"), '
+    'FOREIGN KEY ("sequence_id") REFERENCES "sequencemodel" ("id"))',
+    'CREATE INDEX IF NOT EXISTS "waypointmodel_profile_id" ON "waypointmodel" ("profile_id")',
+    'CREATE INDEX IF NOT EXISTS "waypointmodel_sequence_id" ON "waypointmodel" ("sequence_id")',
+)
+
+
+def create_tables(database):
+    for statement in V1_SCHEMA:
+        database.execute_sql(statement)
+
+
+def index_sequences(database):
+    # covers the identifier to id lookup of a profile's sequences when it is loaded, waypoint rows are looked up
+    # through the profile and sequence indexes of version 1, which hold the row id so they already cover the
+    # queries by profile
+    database.execute_sql("CREATE INDEX sequencemodel_profile_id_identifier ON sequencemodel (profile_id, identifier)")
+
+
+# schema versions in order, a database at version n has had the first n applied, append only
+MIGRATIONS = [create_tables, index_sequences]
+
+
 class DatabaseInterface:
     def __init__(self, db_name):
         self.logger = get_logger("db")
         db.init(db_name)
         db.connect()
-        db.create_tables([ProfileModel, WaypointModel, SequenceModel])
+        self.migrate(db_name)
         self.logger.debug("Connected to database")
 
+    def migrate(self, db_name):
+        """Applies the migrations the database has not had yet, each in its own transaction
+
+        Databases created before schema versions were tracked are at version 0 with their tables already there,
+        the first migration leaves those as they are. A copy of an existing database is kept before it is changed.
+        """
+        version = db.pragma("user_version")
+        if version > len(MIGRATIONS):
+            self.logger.warning(f"Database schema version {version} is newer than this version supports "
+                                f"({len(MIGRATIONS)})")
+            return
+        if version == len(MIGRATIONS):
+            return
+
+        if db.get_tables() and db_name != ":memory:":
+            backup_name = f"{db_name}.v{version}.bak"
+            self.logger.info(f"Backing up database to {backup_name} before migrating it")
+            with sqlite3.connect(backup_name) as backup:
+                db.connection().backup(backup)
+            backup.close()
+
+        for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+            with db.atomic():
+                migration(db)
+                db.pragma("user_version", number)
+            self.logger.info(f"Migrated database to schema version {number}: {migration.__name__}")
+
     @staticmethod
     def close():
+        if not db.is_closed():
+            # lets SQLite refresh the statistics the query planner picks indexes with
+            db.execute_sql("PRAGMA optimize")
         db.close()
@@ -0,0 +1,439 @@
+import json
+import socket
+import struct
+import threading
+import difflib
+import argparse
+from time import monotonic, sleep
+
+
+EXPORT_GROUP = "239.255.50.10"
+EXPORT_PORT = 5010
+IMPORT_PORT = 7778
+SYNC = b"\x55\x55\x55\x55"
+HEADER = struct.Struct("<HH")
+
+
+def bios_doc(dcs_path, module):
+    """Path of a DCS-BIOS module JSON document in a DCS saved games folder"""
+    return f"{dcs_path}\\Scripts\\DCS-BIOS\\doc\\json\\{module}.json"
+
+
+def parse_endpoints(text, port=IMPORT_PORT):
+    """(host, port) of each DCS-BIOS import endpoint in a comma separated list of host or host:port"""
+    endpoints = list()
+    for endpoint in text.split(","):
+        endpoint = endpoint.strip()
+        if not endpoint:
+            continue
+
+        host, _, endpoint_port = endpoint.partition(":")
+        endpoints.append((host, int(endpoint_port) if endpoint_port else port))
+    return endpoints
+
+
+def control_outputs(doc_path, identifiers):
+    """Export memory regions of the given controls by identifier, looked up in a DCS-BIOS module JSON document"""
+    with open(doc_path, "r") as f:
+        doc = json.load(f)
+
+    outputs = dict()
+    for category in doc.values():
+        for identifier, control in category.items():
+            if identifier not in identifiers:
+                continue
+
+            for output in control.get("outputs", list()):
+                if output.get("type") == "string":
+                    outputs.setdefault(identifier, list()).append((output["address"], output["max_length"]))
+                else:
+                    outputs.setdefault(identifier, list()).append((output["address"], 2))
+    return outputs
+
+
+def control_addresses(doc_path, identifiers):
+    """Export memory regions of the given controls, looked up in a DCS-BIOS module JSON document"""
+    return [region for regions in control_outputs(doc_path, identifiers).values() for region in regions]
+
+
+def string_outputs(doc_path, identifiers):
+    """Address and length of the string output of each given control"""
+    return {identifier: regions[0] for identifier, regions in control_outputs(doc_path, identifiers).items()}
+
+
+class ExportParser:
+    """Keeps the aircraft's export memory up to date from export datagrams
+
+    Datagrams are walked through a memoryview so blocks are compared and copied into memory without slicing
+    intermediate bytes objects.
+    """
+    size = 0x10000
+
+    def __init__(self):
+        self.memory = bytearray(self.size)
+        self.view = memoryview(self.memory)
+        self.watched = bytearray(self.size)
+        self.regions = list()
+        self.frames = 0
+        self.changes = 0
+
+    def watch(self, regions):
+        self.regions = list(regions)
+        self.watched = bytearray(self.size)
+        for start, length in self.regions:
+            self.watched[start:start+length] = b"\x01" * len(self.watched[start:start+length])
+
+    def parse(self, datagram):
+        view = memoryview(datagram)
+        pos, size = 0, len(view)
+        changed = False
+
+        while pos + 4 <= size:
+            if datagram.startswith(SYNC, pos):
+                self.frames += 1
+                pos += 4
+                continue
+
+            address, count = HEADER.unpack_from(datagram, pos)
+            pos += 4
+            data = view[pos:pos+min(count, self.size - address)]
+            pos += count
+
+            end = address + len(data)
+            if not changed and self.watched.find(1, address, end) != -1 and self.view[address:end] != data:
+                changed = True
+            self.view[address:end] = data
+
+        if changed:
+            self.changes += 1
+        return changed
+
+    def read_string(self, address, length):
+        return self.view[address:address+length].tobytes().decode("latin-1").rstrip("\x00")
+
+    def read_strings(self, outputs):
+        return {identifier: self.read_string(address, length) for identifier, (address, length) in outputs.items()}
+
+
+class ExportStream:
+    def __init__(self, host=EXPORT_GROUP, port=EXPORT_PORT, multicast=True):
+        self.host, self.port = host, port
+        self.multicast = multicast
+        self.parser = ExportParser()
+        self.condition = threading.Condition()
+        self.s = None
+        self.thread = None
+        self.running = False
+        self.recorded = None
+        self.record_start = None
+
+    def record(self):
+        """Keeps every received datagram with its offset so it can be saved with save_frames and replayed"""
+        self.recorded = list()
+        self.record_start = monotonic()
+
+    def watch(self, regions):
+        with self.condition:
+            self.parser.watch(regions)
+
+    def open_socket(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.multicast:
+            s.bind(("", self.port))
+            membership = struct.pack("=4sl", socket.inet_aton(self.host), socket.INADDR_ANY)
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        else:
+            s.bind((self.host, self.port))
+        s.settimeout(0.1)
+        return s
+
+    def start(self):
+        self.s = self.open_socket()
+        self.running = True
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.s is not None:
+            self.s.close()
+            self.s = None
+
+    def listen(self):
+        while self.running:
+            try:
+                datagram = self.s.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if self.recorded is not None:
+                self.recorded.append((monotonic() - self.record_start, datagram))
+
+            with self.condition:
+                self.parser.parse(datagram)
+                self.condition.notify_all()
+
+    def read_strings(self, outputs):
+        with self.condition:
+            return self.parser.read_strings(outputs)
+
+    def mark(self):
+        with self.condition:
+            return self.parser.frames, self.parser.changes
+
+    def wait_for(self, predicate, timeout):
+        with self.condition:
+            return self.condition.wait_for(predicate, timeout)
+
+    def wait_display(self, mark, timeout):
+        """Waits until a watched display changes after mark, returns False if timeout elapsed first"""
+        if not self.parser.regions:
+            sleep(timeout)
+            return False
+        return self.wait_for(lambda: self.parser.changes > mark[1], timeout)
+
+    def wait_frame(self, mark, timeout):
+        """Waits until DCS exported a frame after mark, which means it has processed what was sent before"""
+        return self.wait_for(lambda: self.parser.frames > mark[0], timeout)
+
+
+def load_frames(path):
+    frames = list()
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(12)
+            if len(header) < 12:
+                break
+            offset, size = struct.unpack("<dI", header)
+            frames.append((offset, f.read(size)))
+    return frames
+
+
+def save_frames(frames, path):
+    with open(path, "wb") as f:
+        for offset, frame in frames:
+            f.write(struct.pack("<dI", offset, len(frame)))
+            f.write(frame)
+
+
+def encode_frame(*writes):
+    """Export datagram that writes each (address, data) pair"""
+    frame = bytearray(SYNC)
+    for address, data in writes:
+        frame += struct.pack("<HH", address, len(data)) + data
+    return bytes(frame)
+
+
+class ExportReplay:
+    """Local stand-in for DCS that sends recorded export frames to an ExportStream"""
+    def __init__(self, frames, host="127.0.0.1", port=EXPORT_PORT, loop=False):
+        self.frames = frames
+        self.host, self.port = host, port
+        self.loop = loop
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.replay, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.s.close()
+
+    def replay(self):
+        while self.running:
+            start = monotonic()
+            for offset, frame in self.frames:
+                remaining = start + offset - monotonic()
+                if remaining > 0:
+                    sleep(remaining)
+                if not self.running:
+                    return
+                self.s.sendto(frame, (self.host, self.port))
+
+            if not self.loop:
+                return
+
+
+class Session:
+    """Commands received by a FakeBios, each with its offset in seconds from the first one"""
+    def __init__(self, commands=None):
+        self.commands = list(commands) if commands is not None else list()
+
+    def __len__(self):
+        return len(self.commands)
+
+    @property
+    def duration(self):
+        return self.commands[-1][0] if self.commands else 0
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write("[\n" + ",\n".join(json.dumps([round(offset, 4), command])
+                                       for offset, command in self.commands) + "\n]\n")
+
+    @staticmethod
+    def load(path):
+        with open(path, "r") as f:
+            return Session([(offset, command) for offset, command in json.load(f)])
+
+    def diff(self, golden, timing_tolerance=None):
+        """Differences from a golden session, empty if both sent the same commands
+
+        With a timing_tolerance, commands are also reported when their offset differs from the golden one by
+        more than that many seconds.
+        """
+        differences = list(difflib.unified_diff([command for _, command in golden.commands],
+                                                [command for _, command in self.commands],
+                                                "golden", "recorded", lineterm=""))
+        if differences or timing_tolerance is None:
+            return differences
+
+        for i, ((offset, command), (golden_offset, _)) in enumerate(zip(self.commands, golden.commands)):
+            if abs(offset - golden_offset) > timing_tolerance:
+                differences.append(f"{i}: {command} sent at {round(offset, 3)}s, "
+                                   f"golden at {round(golden_offset, 3)}s")
+        return differences
+
+    def replay(self, send):
+        """Sends every command again with its recorded timing, send takes the encoded datagram"""
+        start = monotonic()
+        for offset, command in self.commands:
+            remaining = start + offset - monotonic()
+            if remaining > 0:
+                sleep(remaining)
+            send(f"{command}\n".encode("utf-8"))
+
+
+class BiosTransport:
+    """Socket every driver sends its commands to the DCS-BIOS import port through, counting what it sent"""
+    def __init__(self, host="127.0.0.1", port=IMPORT_PORT, send_buffer=None):
+        self.host, self.port = host, port
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if send_buffer is not None:
+            self.s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+        self.datagrams = 0
+        self.bytes = 0
+
+    def send(self, message):
+        sent = self.s.sendto(message, (self.host, self.port))
+        self.datagrams += 1
+        self.bytes += sent
+        return sent
+
+    def close(self):
+        self.s.close()
+
+
+class FakeBios:
+    """Local stand-in for the DCS-BIOS import port that timestamps and records every command it receives"""
+    def __init__(self, host="127.0.0.1", port=IMPORT_PORT):
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # entries simulated on a virtual clock arrive as one burst, the default buffer drops the tail of it
+        self.s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.s.bind((host, port))
+        self.s.settimeout(0.1)
+        self.host, self.port = self.s.getsockname()
+        self.commands = list()
+        self.first = None
+        self.last = None
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.listen, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.s.close()
+
+    def listen(self):
+        while self.running:
+            try:
+                datagram = self.s.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            for command in datagram.decode("utf-8").splitlines():
+                self.received(command)
+
+    def received(self, command):
+        now = monotonic()
+        with self.condition:
+            if self.first is None:
+                self.first = now
+            self.last = now
+            self.commands.append((now - self.first, command))
+            self.condition.notify_all()
+
+    def wait_idle(self, idle=0.2, timeout=10):
+        """Waits until nothing was received for idle seconds, returns False if that took longer than timeout"""
+        deadline = monotonic() + timeout
+        with self.condition:
+            while monotonic() < deadline:
+                last = self.last
+                self.condition.wait(idle)
+                if self.last == last:
+                    return True
+        return False
+
+    def session(self):
+        with self.condition:
+            return Session(self.commands)
+
+    def clear(self):
+        with self.condition:
+            self.commands, self.first, self.last = list(), None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake DCS-BIOS endpoint that records the commands it receives")
+    parser.add_argument("session", help="file the recorded session is saved to")
+    parser.add_argument("--port", type=int, default=IMPORT_PORT)
+    parser.add_argument("--golden", help="golden session to diff the recording against")
+    args = parser.parse_args()
+
+    fake = FakeBios(port=args.port).start()
+    print(f"Listening on {fake.host}:{fake.port}, press Ctrl+C to stop")
+    try:
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake.stop()
+
+    session = fake.session()
+    session.save(args.session)
+    print(f"Recorded {len(session)} commands over {round(session.duration, 2)}s")
+
+    if args.golden:
+        for line in session.diff(Session.load(args.golden)):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
-import socket
 import re
-from time import sleep
-from configparser import NoOptionError
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from functools import wraps
+from src.plan import Step, EntryPlan, PlanExecutor, profile_key
+from src.clock import Clock
+from src.coordinates import CoordinateFormat, format_positions
+from src.dcs_bios import BiosTransport
+from src.timing import TimingProfile
+from src.validation import drop_reason, validate
+from src.keymaps import compile_keymap, HORNET, HARRIER, MIRAGE, TOMCAT, WARTHOG, VIPER
+from src.optimizer import drop_noops, rewrite
+from src.readback import COORDINATE, read_fields
+from src.simulator import HornetCockpit, HarrierCockpit, MirageCockpit, TomcatCockpit, WarthogCockpit, ViperCockpit
 
 
 class DriverException(Exception):
@@ -40,14 +51,14 @@ def latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=2, zfill_
         return lat_deg + lat_min + lat_sec, lon_deg + lon_min + lon_sec
     else:
         lat_deg = str(abs(round(latlong.lat.degree)))
-        lat_min = str(round(latlong.lat.decimal_minute, precision))
+        lat_min = f"{round(latlong.lat.decimal_minute, precision):.{precision}f}"
 
         lat_min_split = lat_min.split(".")
         lat_min_split[0] = lat_min_split[0].zfill(zfill_minutes)
         lat_min = ".".join(lat_min_split)
 
         lon_deg = str(abs(round(latlong.lon.degree))).zfill(easting_zfill)
-        lon_min = str(round(latlong.lon.decimal_minute, precision))
+        lon_min = f"{round(latlong.lon.decimal_minute, precision):.{precision}f}"
 
         lon_min_split = lon_min.split(".")
         lon_min_split[0] = lon_min_split[0].zfill(zfill_minutes)
@@ -56,84 +67,271 @@ def latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=2, zfill_
         return lat_deg + lat_min, lon_deg + lon_min
 
 
+def traced(method):
+    """Tags the presses a driver method records with its name, so entry traces show which call they came from"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.calls += 1
+        self.sections.append((method.__name__, self.calls))
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.sections.pop()
+    return wrapper
+
+
 class Driver:
-    def __init__(self, logger, config, host="127.0.0.1", port=7778):
+    aircraft = None
+    plan_cache_size = 8
+    bios_module = None
+    display_controls = ()
+    supports_delta = False
+    supports_readback = False
+    readback_controls = ()
+    readback_tolerance = 0
+    keymap = dict()
+    cockpit = None
+    supports_optimize = False
+    coordinate_formats = ()
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
         self.logger = logger
-        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.host, self.port = host, port
+        self.clock = clock if clock is not None else Clock()
+        # drivers built by a DriverRegistry share its transport, one built alone owns a transport of its own
+        self.owns_transport = transport is None
+        self.transport = transport if transport is not None else BiosTransport(host, port)
         self.config = config
+        # presses are only dropped where the cockpit model proves them redundant, the setting turns that off
+        # should the model disagree with DCS
+        self.optimize_plans = self.supports_optimize and config.getboolean("PREFERENCES", "optimize_plans",
+                                                                           fallback=True)
         self.limits = dict()
+        self.keys = compile_keymap(self.keymap)
+        self.recording = None
+        self.slots = None
+        self.current_waypoint = None
+        self.pending_note = None
+        self.ordinal = -1
+        self.sections = list()
+        self.calls = 0
+        self.formatted_positions = dict()
+        self.last_validation = None
+        self.plan_cache = OrderedDict()
+        # the GUI estimates, the entry worker plans and the readback verifier records plans on their own threads,
+        # all of them through the recording state and caches above
+        self.lock = threading.RLock()
+
+        self.use_timing(TimingProfile.load(config, self.aircraft))
+
+    def use_timing(self, timing):
+        """Release delays the next plans are recorded with, cached plans stay keyed by the delays they used"""
+        self.short_delay, self.medium_delay = timing.short_delay, timing.medium_delay
+
+    @property
+    def timing(self):
+        return TimingProfile(self.short_delay, self.medium_delay)
+
+    def send(self, message):
+        return self.transport.send(message)
+
+    def record(self, step):
+        if self.recording is None:
+            return PlanExecutor(self.send, clock=self.clock).run_step(step)
+
+        self.recording.append(step)
+        return True
+
+    def start_waypoint(self, note, slot=None):
+        """Tags the presses that follow with the next waypoint ordinal, note is logged when they are sent
+
+        slot identifies where the waypoint (or sequence, or mission) is stored in the aircraft, drivers that
+        address every slot directly can then re-enter only the slots that changed.
+        """
+        self.ordinal += 1
+        self.current_waypoint = self.ordinal
+        if self.slots is not None and slot is not None:
+            self.slots[self.ordinal] = slot
+
+        if self.recording is None:
+            self.logger.info(note)
+        else:
+            self.pending_note = note
 
-        try:
-            self.short_delay = float(self.config.get("PREFERENCES", "button_release_short_delay"))
-            self.medium_delay = float(self.config.get("PREFERENCES", "button_release_medium_delay"))
-        except NoOptionError:
-            self.short_delay, self.medium_delay = 0.2, 0.5
+    def end_waypoint(self):
+        self.current_waypoint = None
 
-    def press_with_delay(self, key, delay_after=None, delay_release=None, raw=False):
-        if not key:
-            return False
+    def wait(self, delay):
+        if self.recording is None:
+            self.clock.sleep(delay)
+        elif self.recording:
+            last = self.recording[-1]
+            self.recording[-1] = replace(last, delay_after=last.delay_after + delay)
+        # a wait before the first press of a plan has nothing to wait for
 
+    def step(self, control, press, release, delay_after, delay_release, messages=None):
         if delay_after is None:
             delay_after = self.short_delay
 
         if delay_release is None:
             delay_release = self.short_delay
 
-        encoded_str = key.replace("OSB", "OS").encode("utf-8")
+        step = Step(control, press, release, delay_release, delay_after, self.current_waypoint, self.pending_note,
+                    messages, tuple(self.sections))
+        self.pending_note = None
+        return self.record(step)
+
+    def press(self, panel, name, delay_after=None, delay_release=None):
+        key = self.keys[panel].get(name)
+        if key is None:
+            self.logger.warning(f"Skipping unknown {panel} key: {name}")
+            return False
+
+        return self.step(key.control, key.press, key.release, delay_after, delay_release, key.messages)
+
+    def press_with_delay(self, key, delay_after=None, delay_release=None, raw=False):
+        if not key:
+            return False
 
-        # TODO get rid of the OSB -> OS replacement
         if not raw:
-            sent = self.s.sendto(f"{key} 1\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-            sleep(delay_release)
+            return self.step(key, "1", "0", delay_after, delay_release)
+
+        control, _, value = key.partition(" ")
+        return self.step(control, value, None, delay_after, delay_release)
+
+    def format_positions(self, positions):
+        """Formats every position in each of the driver's coordinate formats in one batch"""
+        positions = list(positions)
+        self.formatted_positions = dict()
+        for coordinate_format, formatted in format_positions(positions, self.coordinate_formats).items():
+            for position, strings in zip(positions, formatted):
+                key = (coordinate_format, position.lat.decimal_degree, position.lon.decimal_degree)
+                self.formatted_positions[key] = strings
+
+    def position_strings(self, latlong, coordinate_format):
+        """Latitude and longitude strings of a position, from the last batch if it was in there"""
+        key = (coordinate_format, latlong.lat.decimal_degree, latlong.lon.decimal_degree)
+        strings = self.formatted_positions.get(key)
+        if strings is None:
+            strings = format_positions([latlong], (coordinate_format,))[coordinate_format][0]
+        return strings
+
+    def record_plan(self, aircraft, enter, *args):
+        """Records the presses enter makes into a plan instead of sending them"""
+        with self.lock:
+            self.recording, self.slots = list(), dict()
+            self.current_waypoint, self.pending_note, self.ordinal = None, None, -1
+            self.calls = 0
+            try:
+                enter(*args)
+                return EntryPlan(aircraft, self.recording, self.slots)
+            finally:
+                self.recording, self.slots = None, None
+                self.current_waypoint, self.pending_note = None, None
+
+    def plan(self, profile):
+        with self.lock:
+            key = (profile_key(profile), self.short_delay, self.medium_delay)
+            cached = self.plan_cache.get(key)
+            if cached is not None:
+                self.plan_cache.move_to_end(key)
+                return cached
+
+            self.format_positions(wp.position for wp in profile.waypoints)
+            plan = self.record_plan(profile.aircraft, self.enter_all, profile)
+            self.plan_cache[key] = plan
+            if len(self.plan_cache) > self.plan_cache_size:
+                self.plan_cache.popitem(last=False)
+            return plan
+
+    def optimize(self, plan):
+        """Plan without the presses the cockpit model proves redundant, run on the plan that is actually sent
+        since a press may only be redundant because of the slots entered before it"""
+        if not self.optimize_plans or self.cockpit is None:
+            return plan
+
+        optimized = drop_noops(rewrite(plan, self.cockpit.initial_states()), self.cockpit.initial_states())
+        self.logger.debug(f"Optimized {plan.datagrams} datagrams to {optimized.datagrams}")
+        return optimized
+
+    def estimate(self, profile):
+        return self.optimize(self.plan(profile)).estimate()
+
+    def execute(self, plan, pacer=None):
+        plan = self.optimize(plan)
+        self.logger.info(f"Executing {plan}")
+        executor = PlanExecutor(self.send, self.logger, pacer, self.clock)
+        result = executor.run(plan)
+        self.logger.info(f"Executed in {round(executor.elapsed, 1)}s: {executor.stats}")
+        return result
 
-            self.s.sendto(f"{key} 0\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-            strlen = len(encoded_str) + 3
-        else:
-            sent = self.s.sendto(f"{key}\n".encode("utf-8"), (self.host, self.port))
-            strlen = len(encoded_str) + 1
+    def enter_all(self, profile):
+        raise NotImplementedError
 
-        sleep(delay_after)
-        return sent == strlen
+    def entered_waypoints(self, profile):
+        """Waypoint entered into each aircraft slot, for drivers that support readback"""
+        raise NotImplementedError
+
+    def show_waypoints(self, slots):
+        """Presses that bring each slot up on the readback displays in turn, each tagged with its slot"""
+        raise NotImplementedError
+
+    def read_waypoint(self, displays):
+        """Slot number and values shown on the readback displays"""
+        raise NotImplementedError
+
+    def readback_plan(self, aircraft, slots):
+        return self.record_plan(aircraft, self.show_waypoints, slots)
 
     def validate_waypoint(self, waypoint):
-        try:
-            return self.limits[waypoint.wp_type] is None or waypoint.number <= self.limits[waypoint.wp_type]
-        except KeyError:
-            return False
+        return drop_reason(waypoint, self.limits) is None
 
     def validate_waypoints(self, waypoints):
-        for waypoint in waypoints:
-            if not self.validate_waypoint(waypoint):
-                waypoints.remove(waypoint)
-        return sorted(waypoints, key=lambda wp: wp.wp_type)
+        return validate(waypoints, self.limits).accepted
+
+    def validation(self, profile):
+        """Validation report of the profile's waypoints, kept until the profile changes"""
+        with self.lock:
+            key = profile_key(profile)
+            if self.last_validation is None or self.last_validation[0] != key:
+                report = validate(profile.waypoints, self.limits)
+                for waypoint, reason in report.dropped:
+                    self.logger.debug(f"{waypoint} will not be entered: {reason}")
+                self.last_validation = key, report
+            return self.last_validation[1]
 
     def stop(self):
-        self.s.close()
+        if self.owns_transport:
+            self.transport.close()
 
 
 class HornetDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "hornet"
+    bios_module = "FA-18C_hornet"
+    display_controls = ("UFC_SCRATCHPAD_NUMBER_DISPLAY", "UFC_SCRATCHPAD_STRING_1_DISPLAY",
+                        "UFC_SCRATCHPAD_STRING_2_DISPLAY", "UFC_OPTION_DISPLAY_1", "UFC_OPTION_DISPLAY_2",
+                        "UFC_OPTION_DISPLAY_3", "UFC_OPTION_DISPLAY_4", "UFC_OPTION_DISPLAY_5")
+    supports_delta = True
+    keymap = HORNET
+    cockpit = HornetCockpit
+    supports_optimize = True
+    waypoint_format = CoordinateFormat(decimal_minutes_mode=True)
+    mission_format = CoordinateFormat()
+    coordinate_formats = (waypoint_format, mission_format)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=None, MSN=6)
 
     def ufc(self, num, delay_after=None, delay_release=None):
-        key = f"UFC_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+        self.press("ufc", num, delay_after=delay_after, delay_release=delay_release)
 
     def lmdi(self, pb, delay_after=None, delay_release=None):
-        key = f"LEFT_DDI_PB_{pb.zfill(2)}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+        self.press("lmdi", pb, delay_after=delay_after, delay_release=delay_release)
 
     def ampcd(self, pb, delay_after=None, delay_release=None):
-        key = f"AMPCD_PB_{pb.zfill(2)}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+        self.press("ampcd", pb, delay_after=delay_after, delay_release=delay_release)
 
+    @traced
     def enter_number(self, number, two_enters=False):
         for num in str(number):
             if num == ".":
@@ -152,8 +350,10 @@ class HornetDriver(Driver):
 
             self.ufc("ENT", delay_release=self.medium_delay)
 
+    @traced
     def enter_coords(self, latlong, elev, pp, decimal_minutes_mode=False):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=decimal_minutes_mode)
+        lat_str, lon_str = self.position_strings(latlong, self.waypoint_format if decimal_minutes_mode
+                                                 else self.mission_format)
         self.logger.debug(f"Entering coords string: {lat_str}, {lon_str}")
 
         if not pp:
@@ -162,7 +362,7 @@ class HornetDriver(Driver):
             else:
                 self.ufc("8", delay_release=self.medium_delay)
             self.enter_number(lat_str, two_enters=True)
-            sleep(0.5)
+            self.wait(0.5)
 
             if latlong.lon.degree > 0:
                 self.ufc("6", delay_release=self.medium_delay)
@@ -200,6 +400,7 @@ class HornetDriver(Driver):
                 elev = round(float(elev) / 3.2808)
                 self.enter_number(elev)
 
+    @traced
     def enter_waypoints(self, wps, sequences):
         if not wps:
             return
@@ -210,16 +411,18 @@ class HornetDriver(Driver):
         self.ufc("CLR")
 
         for i, wp in enumerate(wps):
+            self.ampcd("12")
+
             if not wp.name:
-                self.logger.info(f"Entering waypoint {i+1}")
+                self.start_waypoint(f"Entering waypoint {i+1}", slot=("WP", i+1))
             else:
-                self.logger.info(f"Entering waypoint {i+1} - {wp.name}")
+                self.start_waypoint(f"Entering waypoint {i+1} - {wp.name}", slot=("WP", i+1))
 
-            self.ampcd("12")
             self.ampcd("5")
             self.ufc("OSB1")
             self.enter_coords(wp.position, wp.elevation, pp=False, decimal_minutes_mode=True)
             self.ufc("CLR")
+            self.end_waypoint()
 
         for sequencenumber, waypointslist in sequences.items():
             if sequencenumber != 1:
@@ -228,11 +431,13 @@ class HornetDriver(Driver):
             else:
                 waypointslist = [0] + waypointslist
 
+            self.start_waypoint(f"Entering sequence {sequencenumber}", slot=("SEQ", sequencenumber))
             self.ampcd("1")
 
             for waypoint in waypointslist:
                 self.ufc("OSB4")
                 self.enter_number(waypoint)
+            self.end_waypoint()
 
         self.ufc("CLR")
         self.ufc("CLR")
@@ -240,14 +445,16 @@ class HornetDriver(Driver):
         self.ampcd("19")
         self.ampcd("10")
 
+    @traced
     def enter_pp_msn(self, msn, n):
+        if n > 1:
+            self.lmdi(f"{n + 5}")
+
         if msn.name:
-            self.logger.info(f"Entering PP mission {n} - {msn.name}")
+            self.start_waypoint(f"Entering PP mission {n} - {msn.name}", slot=("MSN", msn.station, n))
         else:
-            self.logger.info(f"Entering PP mission {n}")
+            self.start_waypoint(f"Entering PP mission {n}", slot=("MSN", msn.station, n))
 
-        if n > 1:
-            self.lmdi(f"{n + 5}")
         self.lmdi("14")
         self.ufc("OSB3")
 
@@ -255,7 +462,9 @@ class HornetDriver(Driver):
 
         self.ufc("CLR")
         self.ufc("CLR")
+        self.end_waypoint()
 
+    @traced
     def enter_missions(self, missions):
         def stations_order(x):
             if x == 8:
@@ -303,38 +512,37 @@ class HornetDriver(Driver):
             self.lmdi("13")
         self.lmdi("6")
 
+    @traced
     def enter_all(self, profile):
-        self.enter_missions(self.validate_waypoints(profile.msns_as_list))
-        sleep(1)
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list), profile.sequences_dict)
+        validation = self.validation(profile)
+        self.enter_missions(validation.missions)
+        self.wait(1)
+        self.enter_waypoints(validation.waypoints, profile.sequences_dict)
 
 
 class HarrierDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "harrier"
+    bios_module = "AV8BNA"
+    display_controls = ("UFC_SCRATCHPAD", "ODU_OPTION_1", "ODU_OPTION_2", "ODU_OPTION_3")
+    keymap = HARRIER
+    cockpit = HarrierCockpit
+    coordinate_format = CoordinateFormat(easting_zfill=3)
+    coordinate_formats = (coordinate_format,)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=None)
 
     def ufc(self, num, delay_after=None, delay_release=None):
-        if num not in ("ENT", "CLR"):
-            key = f"UFC_B{num}"
-        elif num == "ENT":
-            key = "UFC_ENTER"
-        elif num == "CLR":
-            key = "UFC_CLEAR"
-        else:
-            key = f"UFC_{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+        self.press("ufc", num, delay_after=delay_after, delay_release=delay_release)
 
     def odu(self, num, delay_after=None, delay_release=None):
-        key = f"ODU_OPT{num}"
-        self.press_with_delay(key, delay_after=delay_after,
-                              delay_release=delay_release)
+        self.press("odu", num, delay_after=delay_after, delay_release=delay_release)
 
     def lmpcd(self, pb, delay_after=None, delay_release=None):
-        key = f"MPCD_L_{pb}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+        self.press("lmpcd", pb, delay_after=delay_after, delay_release=delay_release)
 
+    @traced
     def enter_number(self, number, two_enters=False):
         for num in str(number):
             if num == ".":
@@ -353,8 +561,9 @@ class HarrierDriver(Driver):
 
             self.ufc("ENT", delay_release=self.medium_delay)
 
+    @traced
     def enter_coords(self, latlong, elev):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=False, easting_zfill=3)
+        lat_str, lon_str = self.position_strings(latlong, self.coordinate_format)
         self.logger.debug(f"Entering coords string: {lat_str}, {lon_str}")
 
         if latlong.lat.degree > 0:
@@ -378,38 +587,45 @@ class HarrierDriver(Driver):
             self.odu("3")
             self.enter_number(elev)
 
+    @traced
     def enter_waypoints(self, wps):
         self.lmpcd("2")
 
-        for wp in wps:
+        for i, wp in enumerate(wps, 1):
+            self.start_waypoint(f"Entering waypoint {i}", slot=("WP", i))
             self.ufc("7")
             self.ufc("7")
             self.ufc("ENT")
             self.odu("2")
             self.enter_coords(wp.position, wp.elevation)
             self.odu("1")
+            self.end_waypoint()
 
         self.lmpcd("2")
 
+    @traced
     def enter_all(self, profile):
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
+        self.enter_waypoints(self.validation(profile).waypoints)
 
 
 class MirageDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "mirage"
+    bios_module = "M-2000C"
+    display_controls = ("PCN_DISP_L", "PCN_DISP_R", "PCN_DISP_DEST")
+    supports_delta = True
+    keymap = MIRAGE
+    cockpit = MirageCockpit
+    coordinate_format = CoordinateFormat(decimal_minutes_mode=True, easting_zfill=3)
+    coordinate_formats = (coordinate_format,)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=9)
 
     def pcn(self, num, delay_after=None, delay_release=None):
-        if num in ("ENTER", "CLR"):
-            key = f"INS_{num}_BTN"
-        elif num == "PREP":
-            key = "INS_PREP_SW"
-        else:
-            key = f"INS_BTN_{num}"
-
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+        self.press("pcn", num, delay_after=delay_after, delay_release=delay_release)
 
+    @traced
     def enter_number(self, number):
         for num in str(number):
             if num == ".":
@@ -418,8 +634,9 @@ class MirageDriver(Driver):
             self.pcn(num)
         self.pcn("ENTER")
 
+    @traced
     def enter_coords(self, latlong):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3)
+        lat_str, lon_str = self.position_strings(latlong, self.coordinate_format)
         self.logger.debug(f"Entering coords string: {lat_str[:-2]}, {lon_str[:-2]}")
 
         self.pcn("1")
@@ -437,50 +654,47 @@ class MirageDriver(Driver):
             self.pcn("4", delay_release=self.medium_delay)
         self.enter_number(lon_str[:-2])
 
+    @traced
     def enter_waypoints(self, wps):
         for i, wp in enumerate(wps, 1):
+            self.start_waypoint(f"Entering waypoint {i}", slot=("WP", i))
             self.pcn("PREP")
             self.pcn("0")
             self.pcn(str(i))
             self.enter_coords(wp.position)
             self.pcn("ENTER")
+            self.end_waypoint()
 
+    @traced
     def enter_all(self, profile):
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
+        self.enter_waypoints(self.validation(profile).waypoints)
 
 
 class TomcatDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "tomcat"
+    bios_module = "F-14"
+    supports_delta = True
+    keymap = TOMCAT
+    cockpit = TomcatCockpit
+    coordinate_format = CoordinateFormat(one_digit_seconds=True)
+    coordinate_formats = (coordinate_format,)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=3, FP=1, IP=1, ST=1, HA=1, DP=1, HB=1)
 
     def cap(self, num, delay_after=None, delay_release=None):
-        raw = False
-        cap_key_names = {
-            "0": "RIO_CAP_BRG_",
-            "1": "RIO_CAP_LAT_",
-            "2": "RIO_CAP_NBR_",
-            "3": "RIO_CAP_SPD_",
-            "4": "RIO_CAP_ALT_",
-            "5": "RIO_CAP_RNG_",
-            "6": "RIO_CAP_LONG_",
-            "8": "RIO_CAP_HDG_",
-        }
-
-        if num == "TAC":
-            key = "RIO_CAP_CATRGORY 3"
-            raw = True
-        else:
-            key = f"{cap_key_names.get(num, 'RIO_CAP_')}{num}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release, raw=raw)
+        self.press("cap", num, delay_after=delay_after, delay_release=delay_release)
 
+    @traced
     def enter_number(self, number):
         for num in str(number):
             self.cap(num)
         self.cap("ENTER")
 
+    @traced
     def enter_coords(self, latlong, elev):
-        lat_str, lon_str = latlon_tostring(latlong, one_digit_seconds=True)
+        lat_str, lon_str = self.position_strings(latlong, self.coordinate_format)
         self.logger.debug(f"Entering coords string: {lat_str}, {lon_str}")
 
         self.cap("1")
@@ -502,6 +716,7 @@ class TomcatDriver(Driver):
             self.cap("3")
             self.enter_number(elev)
 
+    @traced
     def enter_waypoints(self, wps):
         cap_wp_type_buttons = dict(
             FP=4,
@@ -513,6 +728,7 @@ class TomcatDriver(Driver):
         )
         self.cap("TAC")
         for wp in wps:
+            self.start_waypoint(f"Entering {wp}", slot=(wp.wp_type, wp.number))
             if wp.wp_type == "WP":
                 self.cap(f"BTN_{wp.number}")
             else:
@@ -520,24 +736,35 @@ class TomcatDriver(Driver):
 
             self.enter_coords(wp.position, wp.elevation)
             self.cap("CLEAR")
+            self.end_waypoint()
 
+    @traced
     def enter_all(self, profile):
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
+        self.enter_waypoints(self.validation(profile).waypoints)
 
 
 class WarthogDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "warthog"
+    bios_module = "A-10C"
+    display_controls = tuple(f"CDU_LINE{i}" for i in range(10))
+    keymap = WARTHOG
+    cockpit = WarthogCockpit
+    coordinate_format = CoordinateFormat(decimal_minutes_mode=True, easting_zfill=3, precision=3)
+    coordinate_formats = (coordinate_format,)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=99)
 
     def cdu(self, num, delay_after=None, delay_release=None):
-        key = f"CDU_{num}"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+        self.press("cdu", num, delay_after=delay_after, delay_release=delay_release)
 
+    @traced
     def clear_input(self, repeat=3):
         for i in range(0, repeat):
             self.cdu("CLR")
 
+    @traced
     def enter_waypoint_name(self, wp):
         result = re.sub(r'[^A-Za-z0-9]', '', wp.name)
         if result == "":
@@ -550,14 +777,16 @@ class WarthogDriver(Driver):
 
         self.cdu("LSK_3R")
 
+    @traced
     def enter_number(self, number):
         for num in str(number):
             if num != '.':
                 self.logger.debug(f"Entering value: " + str(num))
                 self.cdu(num)
 
+    @traced
     def enter_coords(self, latlong):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3)
+        lat_str, lon_str = self.position_strings(latlong, self.coordinate_format)
         self.logger.debug(f"Entering coords string: {lat_str}, {lon_str}")
 
         self.clear_input(repeat=2)
@@ -578,18 +807,20 @@ class WarthogDriver(Driver):
         self.cdu("LSK_9L")
         self.clear_input(repeat=2)
 
+    @traced
     def enter_elevation(self, elev):
         self.clear_input(repeat=2)
         self.enter_number(elev)
         self.cdu("LSK_5L")
         self.clear_input(repeat=2)
 
+    @traced
     def enter_waypoints(self, wps):
         self.cdu("WP", self.short_delay)
         self.cdu("LSK_3L", self.medium_delay)
         self.logger.debug("Number of waypoints: " + str(len(wps)))
-        for wp in wps:
-            self.logger.debug(f"Entering WP: {wp}")
+        for i, wp in enumerate(wps, 1):
+            self.start_waypoint(f"Entering WP: {wp}", slot=("WP", i))
             self.cdu("LSK_7R", self.short_delay)
             self.enter_waypoint_name(wp)
             self.enter_coords(wp.position)
@@ -599,70 +830,58 @@ class WarthogDriver(Driver):
                 self.enter_elevation(wp.elevation)
             else:
                 self.logger.debug("Not entering elevation because it is 0")
+            self.end_waypoint()
 
+    @traced
     def enter_all(self, profile):
-        self.enter_waypoints(self.validate_waypoints(profile.waypoints_as_list))
+        self.enter_waypoints(self.validation(profile).waypoints)
 
 
 class ViperDriver(Driver):
-    def __init__(self, logger, config):
-        super().__init__(logger, config)
+    aircraft = "viper"
+    bios_module = "F-16C_50"
+    display_controls = tuple(f"DED_LINE_{i}" for i in range(1, 6))
+    supports_delta = True
+    supports_readback = True
+    readback_controls = display_controls
+    # coordinates are entered to a thousandth of a minute
+    readback_tolerance = 0.001 / 60
+    readback_fields = dict(number=r"STPT\s+(\d+)", lat=r"LAT\s+" + COORDINATE, lon=r"LNG\s+" + COORDINATE,
+                           elev=r"ELEV\s+(-?\d+)")
+    keymap = VIPER
+    cockpit = ViperCockpit
+    coordinate_format = CoordinateFormat(decimal_minutes_mode=True, easting_zfill=3, precision=3)
+    coordinate_formats = (coordinate_format,)
+
+    def __init__(self, logger, config, host="127.0.0.1", port=7778, clock=None, transport=None):
+        super().__init__(logger, config, host, port, clock, transport)
         self.limits = dict(WP=127)
 
     def icp_btn(self, num, delay_after=None, delay_release=None):
-        key = f"ICP_BTN_{num}"
-        if num == "ENTR":
-            key = "ICP_ENTR_BTN"
-        self.press_with_delay(key, delay_after=delay_after, delay_release=delay_release)
+        self.press("icp", num, delay_after=delay_after, delay_release=delay_release)
 
     def icp_ded(self, num, delay_after=None, delay_release=None):
-        if delay_release is None:
-            delay_release = self.short_delay
-
-        if num == "DN":
-            self.s.sendto(f"ICP_DED_SW 0\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-        elif num == "UP":
-            self.s.sendto(f"ICP_DED_SW 2\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-
-        sleep(delay_release)
-        self.s.sendto(f"ICP_DED_SW 1\n".replace("OSB", "OS").encode(
-            "utf-8"), (self.host, self.port))
+        self.press("ded", num, delay_after=0, delay_release=delay_release)
 
     def icp_data(self, num, delay_after=None, delay_release=None):
-        if delay_release is None:
-            delay_release = self.short_delay
-
-        if num == "DN":
-            self.s.sendto(f"ICP_DATA_UP_DN_SW 0\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-        elif num == "UP":
-            self.s.sendto(f"ICP_DATA_UP_DN_SW 2\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-        elif num == "RTN":
-            self.s.sendto(f"ICP_DATA_RTN_SEQ_SW 0\n".replace("OSB", "OS").encode(
-                "utf-8"), (self.host, self.port))
-
-        sleep(delay_release)
-        self.s.sendto(f"ICP_DATA_UP_DN_SW 1\n".replace("OSB", "OS").encode(
-            "utf-8"), (self.host, self.port))
-        self.s.sendto(f"ICP_DATA_RTN_SEQ_SW 1\n".replace("OSB", "OS").encode(
-            "utf-8"), (self.host, self.port))
+        self.press("data", num, delay_after=0, delay_release=delay_release)
 
+    @traced
     def enter_number(self, number):
         for num in str(number):
             if num != '.':
                 self.icp_btn(num)
 
+    @traced
     def enter_elevation(self, elev):
         if elev < 0:
             self.icp_btn("0")
         self.enter_number(elev)
         self.icp_btn("ENTR")
 
+    @traced
     def enter_coords(self, latlong):
-        lat_str, lon_str = latlon_tostring(latlong, decimal_minutes_mode=True, easting_zfill=3, precision=3)
+        lat_str, lon_str = self.position_strings(latlong, self.coordinate_format)
         self.logger.debug(f"Entering coords string: {lat_str}, {lon_str}")
 
         if latlong.lat.degree > 0:
@@ -682,21 +901,77 @@ class ViperDriver(Driver):
         self.icp_btn("ENTR")
         self.icp_data("DN")
 
+    @traced
     def enter_waypoints(self, wps):
         self.icp_btn("4", delay_release=1)
         self.icp_data("DN", delay_release=1)
 
-        for wp in wps:
+        for i, wp in enumerate(wps, 1):
+            self.start_waypoint(f"Entering {wp}", slot=("WP", i))
             self.enter_coords(wp.position)
             if wp.elevation != 0:
                 self.enter_elevation(wp.elevation)
-
+            # back on the LAT line, so a skipped steerpoint leaves the cursor where the next one expects it
             self.icp_data("UP")
             self.icp_data("UP")
+            self.end_waypoint()
+
             self.icp_ded("UP")
 
         self.icp_ded("DN")
         self.icp_data("RTN")
 
+    @traced
     def enter_all(self, profile):
-        self.enter_waypoints(self.validate_waypoints(profile.all_waypoints_as_list))
\ No newline at end of file
+        self.enter_waypoints(self.validation(profile).waypoints)
+
+    def entered_waypoints(self, profile):
+        return {("WP", i): wp for i, wp in enumerate(self.validation(profile).waypoints, 1)}
+
+    @traced
+    def show_waypoints(self, slots):
+        self.icp_btn("4", delay_release=1)
+        for slot in slots:
+            self.start_waypoint(f"Reading back steerpoint {slot[1]}", slot=slot)
+            self.enter_number(slot[1])
+            self.icp_btn("ENTR")
+            self.end_waypoint()
+        self.icp_data("RTN")
+
+    def read_waypoint(self, displays):
+        return read_fields(" ".join(displays.get(control, "") for control in self.readback_controls),
+                           self.readback_fields)
+
+
+DRIVERS = dict(hornet=HornetDriver, harrier=HarrierDriver, mirage=MirageDriver, tomcat=TomcatDriver,
+               warthog=WarthogDriver, viper=ViperDriver)
+
+
+class DriverRegistry:
+    """Drivers by aircraft, each built the first time it is asked for and sending through one shared transport"""
+    def __init__(self, logger, config, clock=None, transport=None, classes=None):
+        self.logger = logger
+        self.config = config
+        self.clock = clock
+        self.transport = transport if transport is not None else BiosTransport()
+        self.classes = classes if classes is not None else DRIVERS
+        self.created = dict()
+
+    def __contains__(self, aircraft):
+        return aircraft in self.classes
+
+    def __iter__(self):
+        return iter(self.classes)
+
+    def __getitem__(self, aircraft):
+        driver = self.created.get(aircraft)
+        if driver is None:
+            driver = self.classes[aircraft](self.logger, self.config, clock=self.clock, transport=self.transport)
+            self.created[aircraft] = driver
+        return driver
+
+    def stop(self):
+        for driver in self.created.values():
+            driver.stop()
+        self.created.clear()
+        self.transport.close()
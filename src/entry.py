@@ -0,0 +1,332 @@
+import asyncio
+import queue
+import threading
+from dataclasses import dataclass, replace
+from src.clock import Clock
+from src.scheduler import DeadlineScheduler
+
+
+class EntryCancelled(Exception):
+    pass
+
+
+class EntryControl:
+    """Cancel token and pause switch for an entry, safe to use from any thread"""
+    def __init__(self):
+        self.loop = None
+        self.cancel_event = None
+        self.run_event = None
+        self.cancelled = False
+        self.paused = False
+
+    def bind(self):
+        if self.loop is asyncio.get_running_loop():
+            return
+
+        self.loop = asyncio.get_running_loop()
+        self.cancel_event = asyncio.Event()
+        self.run_event = asyncio.Event()
+        if self.cancelled:
+            self.cancel_event.set()
+        if self.cancelled or not self.paused:
+            self.run_event.set()
+
+    def call(self, callback):
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback)
+
+    def cancel(self):
+        self.cancelled = True
+        if self.loop is not None:
+            self.call(self.cancel_event.set)
+            self.call(self.run_event.set)
+
+    def pause(self):
+        self.paused = True
+        if self.loop is not None:
+            self.call(self.run_event.clear)
+
+    def resume(self):
+        self.paused = False
+        if self.loop is not None:
+            self.call(self.run_event.set)
+
+    async def sleep(self, delay, clock=None):
+        if clock is None:
+            clock = Clock()
+        if await clock.wait(self.cancel_event, delay):
+            raise EntryCancelled
+
+    async def checkpoint(self):
+        await self.run_event.wait()
+        if self.cancelled:
+            raise EntryCancelled
+
+
+@dataclass(frozen=True)
+class EntryProgress:
+    waypoint: int
+    waypoints: int
+    elapsed: float
+    eta: float
+    endpoint: str = None
+
+    def __str__(self):
+        text = f"Waypoint {self.waypoint} of {self.waypoints} | {round(self.elapsed)}s elapsed | " \
+               f"ETA {round(self.eta)}s"
+        return text if self.endpoint is None else f"{self.endpoint} | {text}"
+
+
+@dataclass(frozen=True)
+class EndpointResult:
+    endpoint: str
+    result: bool
+    completed: int = None
+    elapsed: float = 0
+    error: str = None
+
+    def __str__(self):
+        if self.error is not None:
+            return f"{self.endpoint}: failed after {round(self.elapsed, 1)}s, {self.error}"
+        return f"{self.endpoint}: {'entered' if self.result else 'entered with send errors'} " \
+               f"in {round(self.elapsed, 1)}s"
+
+
+class AsyncPlanExecutor:
+    def __init__(self, send, logger=None, control=None, pacer=None, progress=None, clock=None, tracer=None,
+                 on_completed=None):
+        self.send = send
+        self.logger = logger
+        self.control = control if control is not None else EntryControl()
+        self.pacer = pacer
+        self.progress = progress
+        self.clock = clock if clock is not None else Clock()
+        self.tracer = tracer
+        # called with each waypoint ordinal once all of its presses were sent
+        self.on_completed = on_completed
+        self.scheduler = DeadlineScheduler(self.clock)
+        self.completed = None
+        self.elapsed = 0
+        self.stats = None
+
+    def report(self, plan, step, started, planned_done, planned_left):
+        waypoints = plan.waypoints
+        total = waypoints[-1] + 1 if waypoints else 0
+        if step.waypoint is not None:
+            current = step.waypoint + 1
+        else:
+            current = self.completed + 1 if self.completed is not None else 0
+
+        elapsed = self.clock.now() - started
+        eta = planned_left * elapsed / planned_done if planned_done else planned_left
+        self.progress(EntryProgress(min(current, total), total, elapsed, eta))
+
+    async def pause(self, mark, delay, press):
+        if self.pacer is None:
+            await self.control.sleep(self.scheduler.remaining(), self.clock)
+            return
+
+        wait = self.pacer.wait_display if press else self.pacer.wait_frame
+        await asyncio.get_running_loop().run_in_executor(None, wait, mark, delay)
+        self.scheduler.rebase()
+        await self.control.sleep(0, self.clock)
+
+    def mark(self):
+        return self.pacer.mark() if self.pacer is not None else None
+
+    async def run_step(self, step):
+        datagrams = step.datagrams
+        (message, delay), release = datagrams[0], datagrams[1:]
+
+        mark = self.mark()
+        sent = self.send(message)
+        self.scheduler.sent()
+        if self.tracer is not None:
+            self.tracer.sent(step, 0, delay)
+        self.scheduler.advance(delay)
+        try:
+            await self.pause(mark, delay, press=True)
+        finally:
+            # never leave a button held down when the entry is cancelled between press and release
+            if release:
+                mark = self.mark()
+                self.send(release[0][0])
+                self.scheduler.sent()
+                if self.tracer is not None:
+                    self.tracer.sent(step, 1, release[0][1])
+
+        if release:
+            self.scheduler.advance(release[0][1])
+            await self.pause(mark, release[0][1], press=False)
+        return sent == len(message)
+
+    async def run(self, plan):
+        """Runs the plan, self.completed holds the last waypoint entered in full if it gets cancelled"""
+        self.control.bind()
+        last_steps = {step.waypoint: i for i, step in enumerate(plan) if step.waypoint is not None}
+        result = True
+        started, planned_done, planned_left = self.clock.now(), 0, plan.duration
+        if self.tracer is not None:
+            self.tracer.start(plan)
+        self.scheduler.start()
+
+        for i, step in enumerate(plan):
+            if self.control.paused:
+                if self.logger is not None:
+                    self.logger.info("Entry paused")
+                await self.control.checkpoint()
+                self.scheduler.rebase()
+            await self.control.checkpoint()
+
+            if step.note and self.logger is not None:
+                self.logger.info(step.note)
+            result = await self.run_step(step) and result
+
+            if step.waypoint is not None and last_steps[step.waypoint] == i:
+                self.completed = step.waypoint
+                if self.on_completed is not None:
+                    self.on_completed(step.waypoint)
+
+            self.elapsed = self.clock.now() - started
+            if self.progress is not None:
+                planned_done, planned_left = planned_done + step.duration, planned_left - step.duration
+                self.report(plan, step, started, planned_done, planned_left)
+
+        self.scheduler.finish()
+        self.stats = self.scheduler.stats()
+        return result
+
+
+class FanOutExecutor:
+    """Runs one plan on several DCS-BIOS endpoints at once
+
+    Every endpoint gets an AsyncPlanExecutor of its own on the same control, so a pause or cancel applies to all
+    of them while an endpoint that fails stops alone. transports maps each endpoint's name to its transport, only
+    the first endpoint logs the notes of the plan. Each executor runs on a fork of clock, which catches up with
+    the slowest endpoint once they are done.
+    """
+    def __init__(self, transports, logger=None, control=None, progress=None, clock=None, tracer=None):
+        self.logger = logger
+        self.control = control if control is not None else EntryControl()
+        self.clock = clock if clock is not None else Clock()
+        self.executors = dict()
+        for i, (endpoint, transport) in enumerate(transports.items()):
+            endpoint_clock = self.clock.fork()
+            self.executors[endpoint] = AsyncPlanExecutor(transport.send, logger if i == 0 else None, self.control,
+                                                         progress=self.endpoint_progress(progress, endpoint),
+                                                         clock=endpoint_clock,
+                                                         tracer=tracer.process(endpoint, endpoint_clock)
+                                                         if tracer else None)
+        self.results = dict()
+
+    @staticmethod
+    def endpoint_progress(progress, endpoint):
+        if progress is None:
+            return None
+        return lambda entry_progress: progress(replace(entry_progress, endpoint=endpoint))
+
+    @property
+    def completed(self):
+        """Last waypoint every endpoint entered in full"""
+        completed = [executor.completed for executor in self.executors.values()]
+        return None if None in completed else min(completed)
+
+    @property
+    def elapsed(self):
+        return max((executor.elapsed for executor in self.executors.values()), default=0)
+
+    @property
+    def stats(self):
+        return "; ".join(f"{endpoint} {executor.stats}" for endpoint, executor in self.executors.items())
+
+    async def run(self, plan):
+        """Runs the plan on every endpoint, self.results holds an EndpointResult for each of them
+
+        Returns whether every endpoint entered the whole plan, raises EntryCancelled if the entry was cancelled.
+        """
+        self.control.bind()
+        outcomes = await asyncio.gather(*(executor.run(plan) for executor in self.executors.values()),
+                                        return_exceptions=True)
+        self.clock.join(executor.clock for executor in self.executors.values())
+
+        cancelled = False
+        for (endpoint, executor), outcome in zip(self.executors.items(), outcomes):
+            if isinstance(outcome, EntryCancelled):
+                cancelled = True
+                result = EndpointResult(endpoint, False, executor.completed, executor.elapsed, "cancelled")
+            elif isinstance(outcome, Exception):
+                result = EndpointResult(endpoint, False, executor.completed, executor.elapsed, repr(outcome))
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                result = EndpointResult(endpoint, outcome, executor.completed, executor.elapsed)
+            self.results[endpoint] = result
+
+            if self.logger is not None and not isinstance(outcome, EntryCancelled):
+                if result.error is None:
+                    self.logger.info(str(result))
+                else:
+                    self.logger.error(str(result))
+
+        if cancelled:
+            raise EntryCancelled
+        return all(result.result for result in self.results.values())
+
+
+class EntryWorker:
+    """Runs one entry at a time off the calling thread and reports EntryProgress through self.progress"""
+    def __init__(self, editor, logger=None):
+        self.editor = editor
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.progress = queue.Queue()
+        self.control = None
+        self.thread = None
+        self.result = None
+
+    @property
+    def busy(self):
+        return self.lock.locked()
+
+    def start(self, profile, resume=False, delta=False):
+        if not self.lock.acquire(blocking=False):
+            return False
+
+        self.control = EntryControl()
+        self.result = None
+        self.thread = threading.Thread(target=self.run, args=(profile, resume, delta), daemon=True)
+        self.thread.start()
+        return True
+
+    def run(self, profile, resume, delta):
+        try:
+            self.result = "completed" if self.editor.enter_all(profile, self.control, resume,
+                                                               progress=self.progress.put,
+                                                               delta=delta) else "cancelled"
+        except Exception:
+            self.result = "failed"
+            if self.logger is not None:
+                self.logger.error("Entry failed", exc_info=True)
+        finally:
+            self.lock.release()
+
+    def cancel(self):
+        if self.control is not None:
+            self.control.cancel()
+
+    def stop(self, timeout=2.0):
+        """Cancels the entry and waits at most timeout seconds for it to stop, returns whether it did"""
+        self.cancel()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            return not self.thread.is_alive()
+        return True
+
+    def poll(self):
+        """Latest progress reported since the last poll, if any"""
+        latest = None
+        while True:
+            try:
+                latest = self.progress.get_nowait()
+            except queue.Empty:
+                return latest
@@ -96,6 +96,12 @@ def first_time_setup():
     config.set("PREFERENCES", "quick_capture_hotkey", values.get("quick_capture_hotkey") or "ctrl+shift+t")
     config.set("PREFERENCES", "enter_aircraft_hotkey", values.get("enter_aircraft_hotkey") or '')
     config.set("PREFERENCES", "log_raw_tesseract_output", "false")
+    config.set("PREFERENCES", "closed_loop_pacing", "false")
+    config.set("PREFERENCES", "verify_entry", "false")
+    config.set("PREFERENCES", "dcs_bios_endpoints", "")
+    config.set("PREFERENCES", "trace_entry", "false")
+    config.set("PREFERENCES", "optimize_plans", "true")
+    config.set("PREFERENCES", "entry_journal", "entry_journal.jsonl")
 
     with open("settings.ini", "w+") as f:
         config.write(f)
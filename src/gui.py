@@ -1,5 +1,6 @@
 from src.objects import Profile, Waypoint, MSN
 from src.logger import get_logger
+from src.entry import EntryWorker
 from peewee import DoesNotExist
 from LatLon23 import LatLon, Longitude, Latitude, string2latlon
 from PIL import ImageGrab, ImageEnhance, ImageOps
@@ -21,6 +22,7 @@ import cv2
 import numpy
 import re
 import datetime
+import copy
 
 def json_zip(j):
     j = base64.b64encode(
@@ -149,6 +151,8 @@ class GUI:
         self.is_focused = True
         self.scaled_dcs_gui = False
         self.selected_wp_type = "WP"
+        self.entry_worker = EntryWorker(self.editor, self.logger)
+        self.entering = False
 
         try:
             with open(f"{self.editor.settings.get('PREFERENCES', 'dcs_path')}\\Config\\options.lua", "r") as f:
@@ -174,7 +178,7 @@ class GUI:
         self.window = self.create_gui()
         keyboard.add_hotkey(self.quick_capture_hotkey, self.toggle_quick_capture)
         if self.enter_aircraft_hotkey != '':
-            keyboard.add_hotkey(self.enter_aircraft_hotkey, self.enter_coords_to_aircraft)
+            keyboard.add_hotkey(self.enter_aircraft_hotkey, self.request_entry)
 
     def exit_capture(self):
         self.exit_quick_capture = True
@@ -325,7 +329,10 @@ class GUI:
             [framedata, framewptype],
             [frameposition],
             [frameactype],
-            [PyGUI.Button("Enter into aircraft", key="enter")],
+            [PyGUI.Button("Enter into aircraft", key="enter"),
+             PyGUI.Checkbox("Only changed", key="delta_entry"),
+             PyGUI.Text("", key="entry_status", auto_size_text=False, size=(32, 1))],
+            [PyGUI.Text("", key="entry_estimate", auto_size_text=False, size=(48, 1))],
         ]
 
         colmain1 = [
@@ -414,13 +421,13 @@ class GUI:
 
     def update_waypoints_list(self, set_to_first=False):
         values = list()
-        self.profile.update_waypoint_numbers()
+        validation = self.editor.driver.validation(self.profile)
 
-        for wp in sorted(self.profile.waypoints,
-                         key=lambda waypoint: waypoint.wp_type if waypoint.wp_type != "MSN" else str(waypoint.station)):
+        for i, wp in sorted(enumerate(self.profile.waypoints),
+                            key=lambda item: item[1].wp_type if item[1].wp_type != "MSN" else str(item[1].station)):
             namestr = str(wp)
 
-            if not self.editor.driver.validate_waypoint(wp):
+            if not validation.valid[i]:
                 namestr = strike(namestr)
 
             values.append(namestr)
@@ -430,6 +437,15 @@ class GUI:
         else:
             self.window.Element('activesList').Update(values=values)
         self.window.Element(self.profile.aircraft).Update(value=True)
+        self.update_entry_estimate()
+
+    def update_entry_estimate(self):
+        if not self.profile.waypoints:
+            self.window.Element('entry_estimate').Update("")
+            return
+
+        estimate = self.editor.estimate(self.profile)
+        self.window.Element('entry_estimate').Update(f"Estimate: {estimate}")
 
     def disable_coords_input(self):
         for element_name in\
@@ -455,9 +471,7 @@ class GUI:
         try:
             if self.selected_wp_type == "MSN":
                 station = int(self.values.get("sequence", 0))
-                number = len(self.profile.stations_dict.get(station, list()))+1
-                wp = MSN(position=position, elevation=int(elevation) or 0, name=name,
-                         station=station, number=number)
+                wp = MSN(position=position, elevation=int(elevation) or 0, name=name, station=station)
 
             else:
                 sequence = self.values["sequence"]
@@ -470,8 +484,7 @@ class GUI:
                     return False
 
                 wp = Waypoint(position, elevation=int(elevation or 0),
-                              name=name, sequence=sequence, wp_type=self.selected_wp_type,
-                              number=len(self.profile.waypoints_of_type(self.selected_wp_type))+1)
+                              name=name, sequence=sequence, wp_type=self.selected_wp_type)
 
                 if sequence not in self.profile.sequences:
                     self.profile.sequences.append(sequence)
@@ -797,14 +810,43 @@ class GUI:
             if str(wp) == valuestr:
                 self.profile.waypoints.remove(wp)
 
+    def request_entry(self):
+        # hotkeys fire on the keyboard library's thread, entry is always started from the GUI loop
+        self.window.write_event_value("enter", None)
+
     def enter_coords_to_aircraft(self):
-        self.window.Element('enter').Update(disabled=True)
-        self.editor.enter_all(self.profile)
-        self.window.Element('enter').Update(disabled=False)
+        if self.entering:
+            self.entry_worker.cancel()
+            self.window.Element('entry_status').Update("Cancelling...")
+            return
+
+        resume = False
+        if self.editor.resume_point(self.profile):
+            resume = PyGUI.PopupYesNo("Resume the cancelled entry from where it stopped?") == "Yes"
+
+        delta = bool(self.values and self.values.get("delta_entry"))
+        if self.entry_worker.start(copy.deepcopy(self.profile), resume, delta):
+            self.entering = True
+            self.window.Element('enter').Update(text="Cancel entry")
+            self.window.Element('entry_status').Update("Starting entry...")
+
+    def poll_entry(self):
+        progress = self.entry_worker.poll()
+        if progress is not None:
+            self.window.Element('entry_status').Update(str(progress))
+
+        if self.entering and not self.entry_worker.busy:
+            self.entering = False
+            self.window.Element('enter').Update(text="Enter into aircraft")
+            self.window.Element('entry_status').Update(f"Entry {self.entry_worker.result}")
 
     def run(self):
         while True:
-            event, self.values = self.window.Read()
+            event, self.values = self.window.Read(timeout=100)
+            if event == PyGUI.TIMEOUT_KEY:
+                self.poll_entry()
+                continue
+
             self.logger.debug(f"Event: {event}")
             self.logger.debug(f"Values: {self.values}")
 
@@ -984,5 +1026,8 @@ class GUI:
         except KeyError:
             pass
 
+        # the entry uses the editor's transports and journal until it unwinds
+        if not self.entry_worker.stop():
+            self.logger.warning("Entry did not stop in time, closing anyway")
         self.window.Close()
         self.editor.stop()
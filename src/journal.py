@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+from src.plan import profile_key
+
+
+def journal_key(profile):
+    """Key of a profile's entries, the same for every profile that enters the same waypoints"""
+    digest = hashlib.sha1(repr(profile_key(profile)).encode("utf-8")).hexdigest()[:16]
+    return f"{profile.aircraft}:{digest}"
+
+
+class EntryJournal:
+    """Append-only record of the waypoints every entry completed, so one cut short can be resumed after a restart
+
+    One JSON line per event, flushed when written so a crash of the editor loses nothing. Lines are only synced to
+    disk when an entry finishes or stops, as completed() is called from the event loop sending the presses and must
+    not wait on the disk. Waypoints lost to a power cut are then entered again on resume. The file is rewritten
+    without finished entries once it holds more than compact_lines lines.
+    """
+    def __init__(self, path, compact_lines=1000):
+        self.path = path
+        self.entries = dict()
+        self.names = dict()
+        self.f = None
+        self.unsynced = 0
+
+        if self.load() > compact_lines:
+            self.compact()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        for line in lines:
+            try:
+                self.apply(json.loads(line))
+            except (ValueError, KeyError):
+                # a line torn by a crash while it was written
+                continue
+        return len(lines)
+
+    def apply(self, record):
+        key, event = record["key"], record["event"]
+        if event == "start":
+            if not record.get("resumed") or self.entries.get(key) is None:
+                self.entries[key] = set()
+            self.names[key] = record.get("name")
+        elif event == "waypoint" and self.entries.get(key) is not None:
+            self.entries[key].add(record["ordinal"])
+        elif event == "finish":
+            self.entries[key] = None
+
+    def write(self, record, sync=False):
+        self.apply(record)
+        if self.f is None:
+            self.f = open(self.path, "a")
+        self.f.write(json.dumps(record) + "\n")
+        self.f.flush()
+        self.unsynced += 1
+        if sync:
+            self.sync()
+
+    def sync(self):
+        if self.f is not None and self.unsynced:
+            os.fsync(self.f.fileno())
+        self.unsynced = 0
+
+    def start(self, key, name=None, resumed=False):
+        self.write(dict(key=key, event="start", name=name, resumed=resumed))
+
+    def completed(self, key, ordinal):
+        self.write(dict(key=key, event="waypoint", ordinal=ordinal))
+
+    def finished(self, key):
+        self.write(dict(key=key, event="finish"), sync=True)
+
+    def resume_point(self, key):
+        """First waypoint ordinal the last entry of key did not complete, None if it finished or never ran"""
+        completed = self.entries.get(key)
+        if completed is None:
+            return None
+        return max(completed) + 1 if completed else 0
+
+    def compact(self):
+        """Rewrites the journal with only the entries that did not finish"""
+        self.close()
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            for key, completed in self.entries.items():
+                if completed is None:
+                    continue
+                f.write(json.dumps(dict(key=key, event="start", name=self.names.get(key), resumed=False)) + "\n")
+                for ordinal in sorted(completed):
+                    f.write(json.dumps(dict(key=key, event="waypoint", ordinal=ordinal)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.entries = {key: completed for key, completed in self.entries.items() if completed is not None}
+
+    def close(self):
+        if self.f is not None:
+            self.sync()
+            self.f.close()
+            self.f = None
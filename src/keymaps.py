@@ -0,0 +1,65 @@
+from dataclasses import dataclass, field
+from string import ascii_uppercase, digits
+from src.plan import encode
+
+
+# Each airframe maps panel -> key name -> DCS-BIOS control, or (control, press value, release value) for
+# switches and one-shot commands (release None). A new airframe's keys only need a table here.
+
+HORNET = dict(
+    ufc={**{d: f"UFC_{d}" for d in digits}, "ENT": "UFC_ENT", "CLR": "UFC_CLR",
+         **{f"OSB{i}": f"UFC_OS{i}" for i in range(1, 6)}},
+    lmdi={str(pb): f"LEFT_DDI_PB_{pb:02}" for pb in range(1, 21)},
+    ampcd={str(pb): f"AMPCD_PB_{pb:02}" for pb in range(1, 21)},
+)
+
+HARRIER = dict(
+    ufc={**{d: f"UFC_B{d}" for d in digits}, "ENT": "UFC_ENTER", "CLR": "UFC_CLEAR"},
+    odu={str(i): f"ODU_OPT{i}" for i in range(1, 6)},
+    lmpcd={str(pb): f"MPCD_L_{pb}" for pb in range(1, 21)},
+)
+
+MIRAGE = dict(
+    pcn={**{d: f"INS_BTN_{d}" for d in digits}, "ENTER": "INS_ENTER_BTN", "CLR": "INS_CLR_BTN",
+         "PREP": "INS_PREP_SW"},
+)
+
+TOMCAT = dict(
+    cap={"0": "RIO_CAP_BRG_0", "1": "RIO_CAP_LAT_1", "2": "RIO_CAP_NBR_2", "3": "RIO_CAP_SPD_3",
+         "4": "RIO_CAP_ALT_4", "5": "RIO_CAP_RNG_5", "6": "RIO_CAP_LONG_6", "7": "RIO_CAP_7", "8": "RIO_CAP_HDG_8",
+         "9": "RIO_CAP_9", "NE": "RIO_CAP_NE", "SW": "RIO_CAP_SW", "ENTER": "RIO_CAP_ENTER",
+         "CLEAR": "RIO_CAP_CLEAR", **{f"BTN_{i}": f"RIO_CAP_BTN_{i}" for i in range(1, 11)},
+         "TAC": ("RIO_CAP_CATRGORY", "3", None)},
+)
+
+WARTHOG = dict(
+    cdu={**{c: f"CDU_{c}" for c in ascii_uppercase + digits}, "CLR": "CDU_CLR", "WP": "CDU_WP",
+         **{f"LSK_{row}{side}": f"CDU_LSK_{row}{side}" for row in (3, 5, 7, 9) for side in "LR"}},
+)
+
+VIPER = dict(
+    icp={**{d: f"ICP_BTN_{d}" for d in digits}, "ENTR": "ICP_ENTR_BTN"},
+    ded={"UP": ("ICP_DED_SW", "2", "1"), "DN": ("ICP_DED_SW", "0", "1")},
+    data={"UP": ("ICP_DATA_UP_DN_SW", "2", "1"), "DN": ("ICP_DATA_UP_DN_SW", "0", "1"),
+          "RTN": ("ICP_DATA_RTN_SEQ_SW", "0", "1")},
+)
+
+
+@dataclass(frozen=True)
+class Key:
+    control: str
+    press: str = "1"
+    release: str = "0"
+    messages: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "messages", encode(self.control, self.press, self.release))
+
+
+def compile_keymap(keymap):
+    """Turns a keymap table into Key objects whose datagrams are encoded up front"""
+    compiled = dict()
+    for panel, keys in keymap.items():
+        compiled[panel] = {name: Key(*control) if isinstance(control, tuple) else Key(control)
+                           for name, control in keys.items()}
+    return compiled
@@ -1,6 +1,10 @@
 from peewee import Model, IntegerField, CharField, ForeignKeyField, FloatField, SqliteDatabase, IntegrityError
 
-db = SqliteDatabase(None, pragmas={'foreign_keys': 1})
+# WAL lets the GUI read while a save commits and, with synchronous normal, only syncs on checkpoints,
+# cache_size is in KiB when negative
+PRAGMAS = dict(foreign_keys=1, journal_mode="wal", synchronous="normal", cache_size=-16000, mmap_size=64 * 2 ** 20)
+
+db = SqliteDatabase(None, pragmas=PRAGMAS)
 
 class ProfileModel(Model):
     name = CharField(unique=True)
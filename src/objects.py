@@ -1,6 +1,8 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import Any
+from bisect import bisect_left, insort
 from LatLon23 import LatLon, Longitude, Latitude
+from peewee import JOIN, chunked
 import json
 import urllib.request
 from os import walk, path
@@ -85,6 +87,8 @@ class Waypoint:
     wp_type: str = "WP"
     latitude: float = None
     longitude: float = None
+    # id of the database row the waypoint was last loaded from or saved to
+    row_id: int = field(default=None, compare=False, repr=False)
 
     def __post_init__(self):
         if type(self.position) == str:
@@ -116,6 +120,7 @@ class Waypoint:
     def as_dict(self):
         d = asdict(self)
         del d["position"]
+        del d["row_id"]
         return d
 
     @staticmethod
@@ -163,28 +168,185 @@ class MSN(Waypoint):
         )
 
 
+def numbering_group(waypoint):
+    """Waypoints are numbered per type, missions per station"""
+    if isinstance(waypoint, MSN):
+        return "MSN", waypoint.station
+    return waypoint.wp_type
+
+
+class WaypointList(list):
+    """List of a profile's waypoints that keeps them numbered and indexed by type, station and sequence
+
+    Adding or removing a waypoint only renumbers the waypoints after it in its group, and appending, the usual case,
+    touches nothing else. Operations that reorder the list rebuild the indexes. A waypoint whose type, station or
+    sequence changes must go through update, or be followed by reindex.
+    """
+    def __init__(self, waypoints=()):
+        super().__init__(waypoints)
+        self.reindex()
+
+    def __reduce_ex__(self, protocol):
+        # copies and pickles are rebuilt from their waypoints, the indexes would otherwise be filled twice
+        return type(self), (list(self),)
+
+    def reindex(self):
+        # numbering group -> its waypoints in profile order
+        self.groups = dict()
+        self.missions = list()
+        self.points = list()
+        # sequence -> 1 based positions of its waypoints in points
+        self.sequences = dict()
+        for i, waypoint in enumerate(self):
+            self.link(i, waypoint)
+
+    def counts_before(self, i, waypoint):
+        """Waypoints before position i in the group of waypoint, and waypoints before i that are not missions"""
+        key = numbering_group(waypoint)
+        same = points = 0
+        for wp in self[:i]:
+            same += numbering_group(wp) == key
+            points += not isinstance(wp, MSN)
+        return same, points
+
+    def link(self, i, waypoint):
+        """Indexes and numbers waypoint as the one at position i, after the indexed waypoints before i"""
+        group = self.groups.setdefault(numbering_group(waypoint), list())
+        indexed = len(self.missions) + len(self.points)
+        if i == indexed:
+            same, points = len(group), len(self.points)
+        else:
+            same, points = self.counts_before(i, waypoint)
+
+        group.insert(same, waypoint)
+        for number, wp in enumerate(group[same:], same + 1):
+            wp.number = number
+
+        if isinstance(waypoint, MSN):
+            self.missions.insert(i - points, waypoint)
+            return
+
+        self.points.insert(points, waypoint)
+        position = points + 1
+        if i != indexed:
+            self.shift_positions(position, 1)
+        if type(waypoint) == Waypoint and waypoint.sequence:
+            insort(self.sequences.setdefault(waypoint.sequence, list()), position)
+
+    def unlink(self, i):
+        """Drops the waypoint at position i from the indexes, before it is removed from the list"""
+        waypoint = self[i]
+        key = numbering_group(waypoint)
+        group = self.groups[key]
+        if i == len(self.missions) + len(self.points) - 1:
+            same, points = len(group) - 1, len(self.points) - (not isinstance(waypoint, MSN))
+        else:
+            same, points = self.counts_before(i, waypoint)
+
+        del group[same]
+        for number, wp in enumerate(group[same:], same + 1):
+            wp.number = number
+        if not group:
+            del self.groups[key]
+
+        if isinstance(waypoint, MSN):
+            del self.missions[i - points]
+            return
+
+        del self.points[points]
+        position = points + 1
+        if type(waypoint) == Waypoint and waypoint.sequence:
+            positions = self.sequences[waypoint.sequence]
+            positions.remove(position)
+            if not positions:
+                del self.sequences[waypoint.sequence]
+        self.shift_positions(position, -1)
+
+    def shift_positions(self, position, offset):
+        """Moves the sequence positions of the waypoints from position on, after one was added or removed before"""
+        for positions in self.sequences.values():
+            for j in range(bisect_left(positions, position + (offset < 0)), len(positions)):
+                positions[j] += offset
+
+    def update(self, waypoint, **changes):
+        """Changes fields of a waypoint in the list and moves it to the indexes its new values belong in"""
+        i = next(i for i, wp in enumerate(self) if wp is waypoint)
+        self.unlink(i)
+        for name, value in changes.items():
+            setattr(waypoint, name, value)
+        self.link(i, waypoint)
+
+    def append(self, waypoint):
+        self.link(len(self), waypoint)
+        super().append(waypoint)
+
+    def extend(self, waypoints):
+        for waypoint in waypoints:
+            self.append(waypoint)
+
+    def __iadd__(self, waypoints):
+        self.extend(waypoints)
+        return self
+
+    def insert(self, i, waypoint):
+        i = min(max(i + len(self) if i < 0 else i, 0), len(self))
+        self.link(i, waypoint)
+        super().insert(i, waypoint)
+
+    def remove(self, waypoint):
+        i = self.index(waypoint)
+        self.unlink(i)
+        super().__delitem__(i)
+
+    def pop(self, i=-1):
+        self.unlink(range(len(self))[i])
+        return super().pop(i)
+
+    def clear(self):
+        super().clear()
+        self.reindex()
+
+    def __delitem__(self, i):
+        if isinstance(i, slice):
+            super().__delitem__(i)
+            self.reindex()
+        else:
+            self.unlink(range(len(self))[i])
+            super().__delitem__(i)
+
+    def __setitem__(self, i, waypoint):
+        super().__setitem__(i, waypoint)
+        self.reindex()
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self.reindex()
+        return self
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self.reindex()
+
+    def reverse(self):
+        super().reverse()
+        self.reindex()
+
+
 class Profile:
     def __init__(self, profilename, waypoints=None, aircraft="hornet"):
         self.profilename = profilename
         self.aircraft = aircraft
-
-        if waypoints is None:
-            self.waypoints = list()
-        else:
-            self.waypoints = waypoints
-            self.update_waypoint_numbers()
+        self.waypoints = WaypointList(waypoints or ())
+        # (id, name, aircraft) of the profile row and the waypoint rows and sequence ids as last loaded or saved
+        self.saved_as = None
+        self.saved_rows = dict()
+        self.saved_sequences = dict()
 
     def __str__(self):
         return json.dumps(self.to_dict())
 
     def update_sequences(self):
-        sequences = set()
-        for waypoint in self.waypoints:
-            if type(waypoint) == Waypoint and waypoint.sequence:
-                sequences.add(waypoint.sequence)
-        sequences = list(sequences)
-        sequences.sort()
-        return sequences
+        return sorted(self.waypoints.sequences)
 
     @property
     def has_waypoints(self):
@@ -196,51 +358,38 @@ class Profile:
 
     @property
     def waypoints_as_list(self):
-        return [wp for wp in self.waypoints if type(wp) == Waypoint]
+        return list(self.waypoints.points)
 
     @property
     def all_waypoints_as_list(self):
-        return [wp for wp in self.waypoints if not isinstance(wp, MSN)]
+        return list(self.waypoints.points)
 
     @property
     def msns_as_list(self):
-        return [wp for wp in self.waypoints if isinstance(wp, MSN)]
+        return list(self.waypoints.missions)
 
     @property
     def stations_dict(self):
-        stations = dict()
-        for mission in self.msns_as_list:
-            station_msn_list = stations.get(mission.station, list())
-            station_msn_list.append(mission)
-            stations[mission.station] = station_msn_list
-        return stations
+        return {key[1]: list(missions) for key, missions in self.waypoints.groups.items() if type(key) == tuple}
 
     @property
     def waypoints_dict(self):
-        wps_dict = dict()
-        for wp in self.waypoints_as_list:
-            wps_list = wps_dict.get(wp.wp_type, list())
-            wps_list.append(wp)
-            wps_dict[wp.wp_type] = wps_list
-        return wps_dict
+        return {key: list(wps) for key, wps in self.waypoints.groups.items() if type(key) != tuple}
 
     @property
     def sequences_dict(self):
-        d = dict()
-        for sequence_identifier in self.sequences:
-            for i, wp in enumerate(self.waypoints_as_list):
-                if wp.sequence == sequence_identifier:
-                    wp_list = d.get(sequence_identifier, list())
-                    wp_list.append(i+1)
-                    d[sequence_identifier] = wp_list
-
-        return d
+        return {identifier: list(self.waypoints.sequences[identifier]) for identifier in self.sequences}
 
     def waypoints_of_type(self, wp_type):
-        return [wp for wp in self.waypoints if wp.wp_type == wp_type]
+        if wp_type == "MSN":
+            return list(self.waypoints.missions)
+        return list(self.waypoints.groups.get(wp_type, ()))
 
     def get_sequence(self, identifier):
-        return self.sequences_dict.get(identifier, list())
+        return list(self.waypoints.sequences.get(identifier, ()))
+
+    def update_waypoint(self, waypoint, **changes):
+        self.waypoints.update(waypoint, **changes)
 
     def to_dict(self):
         return dict(
@@ -250,13 +399,9 @@ class Profile:
         )
 
     def update_waypoint_numbers(self):
-        for _, station_msn_list in self.stations_dict.items():
-            for i, mission in enumerate(station_msn_list, 1):
-                mission.number = i
-
-        for _, waypoint_list in self.waypoints_dict.items():
-            for i, waypoint in enumerate(waypoint_list, 1):
-                waypoint.number = i
+        """Waypoints are numbered as they are added and removed, this is only needed after changing the type,
+        station or sequence of a waypoint without update_waypoint"""
+        self.waypoints.reindex()
 
     def to_readable_string(self):
         readable_string = "Waypoints:\n\n"
@@ -293,11 +438,101 @@ class Profile:
             logger.error(e)
             raise ValueError("Failed to load profile from data")
 
+    @staticmethod
+    def waypoint_row(waypoint):
+        """Column values of a waypoint's row, with its sequence identifier instead of the sequence row"""
+        return dict(
+            name=waypoint.name,
+            latitude=waypoint.position.lat.decimal_degree,
+            longitude=waypoint.position.lon.decimal_degree,
+            elevation=waypoint.elevation,
+            wp_type=waypoint.wp_type,
+            sequence=0 if isinstance(waypoint, MSN) else waypoint.sequence,
+            station=waypoint.station if isinstance(waypoint, MSN) else 0
+        )
+
+    def model_row(self, row, profile):
+        return dict(row, profile=profile, sequence=self.saved_sequences.get(row["sequence"]))
+
     def save(self, profilename=None):
-        delete_list = list()
+        """Writes the rows that changed since the profile was loaded or last saved, in one transaction
+
+        Waypoints keep their row ids across saves. A profile saved under a new name, or whose rows cannot be
+        updated in place, is written again in bulk.
+        """
         if profilename is not None:
             self.profilename = profilename
 
+        with db.atomic():
+            if not self.save_changes():
+                self.save_all()
+
+    def save_changes(self):
+        """Inserts, updates and deletes the rows of the waypoints that changed, False if it wrote nothing
+
+        Rows load back in id order, so this is only possible while the saved waypoints are still in that order
+        and every new one comes after them.
+        """
+        if self.saved_as is None or self.saved_as[1] != self.profilename:
+            return False
+
+        profile_id, _, aircraft = self.saved_as
+        saved_ids = {waypoint.id for waypoint in
+                     WaypointModel.select(WaypointModel.id).where(WaypointModel.profile == profile_id)}
+        if saved_ids != set(self.saved_rows):
+            # the profile was deleted or saved from somewhere else since
+            return False
+
+        seen, updates, inserts = set(), list(), list()
+        last = 0
+        for waypoint in self.waypoints:
+            row = self.waypoint_row(waypoint)
+            if waypoint.row_id in self.saved_rows and waypoint.row_id not in seen:
+                if inserts or waypoint.row_id < last:
+                    return False
+                last = waypoint.row_id
+                seen.add(waypoint.row_id)
+                if row != self.saved_rows[waypoint.row_id]:
+                    updates.append((waypoint.row_id, row))
+            else:
+                inserts.append((waypoint, row))
+        deletes = [row_id for row_id in self.saved_rows if row_id not in seen]
+
+        if aircraft != self.aircraft:
+            ProfileModel.update(aircraft=self.aircraft).where(ProfileModel.id == profile_id).execute()
+
+        sequences = self.sequences
+        for identifier in sequences:
+            if identifier not in self.saved_sequences:
+                self.saved_sequences[identifier] = SequenceModel.insert(identifier=identifier,
+                                                                        profile=profile_id).execute()
+
+        for row_id, row in updates:
+            WaypointModel.update(**self.model_row(row, profile_id)).where(WaypointModel.id == row_id).execute()
+            self.saved_rows[row_id] = row
+        for waypoint, row in inserts:
+            row_id = WaypointModel.insert(**self.model_row(row, profile_id)).execute()
+            # a waypoint that is in the profile twice keeps the row of its first entry
+            if waypoint.row_id not in seen:
+                waypoint.row_id = row_id
+            self.saved_rows[row_id] = row
+        if deletes:
+            WaypointModel.delete().where(WaypointModel.id.in_(deletes)).execute()
+            for row_id in deletes:
+                del self.saved_rows[row_id]
+
+        unused = [identifier for identifier in self.saved_sequences if identifier not in sequences]
+        if unused:
+            SequenceModel.delete().where(
+                SequenceModel.id.in_([self.saved_sequences.pop(identifier) for identifier in unused])).execute()
+
+        self.saved_as = profile_id, self.profilename, self.aircraft
+        logger.debug(f"Saved {self.profilename}: {len(inserts)} inserted, {len(updates)} updated, "
+                     f"{len(deletes)} deleted")
+        return True
+
+    def save_all(self):
+        """Replaces all the profile's rows, inserting the new rows in bulk"""
         try:
             with db.atomic():
                 profile = ProfileModel.create(
@@ -305,85 +540,73 @@ class Profile:
         except IntegrityError:
             profile = ProfileModel.get(
                 ProfileModel.name == self.profilename)
-        profile.aircraft = self.aircraft
-
-        for waypoint in profile.waypoints:
-            delete_list.append(waypoint)
-
-        for sequence in profile.sequences:
-            delete_list.append(sequence)
-
-        sequences_db_instances = dict()
-        for sequencenumber in self.sequences:
-            sequence_db_instance = SequenceModel.create(
-                identifier=sequencenumber,
-                profile=profile
-            )
-            sequences_db_instances[sequencenumber] = sequence_db_instance
-
-        for waypoint in self.waypoints:
-            if not isinstance(waypoint, MSN):
-                sequence = sequences_db_instances.get(waypoint.sequence)
-                WaypointModel.create(
-                    name=waypoint.name,
-                    latitude=waypoint.position.lat.decimal_degree,
-                    longitude=waypoint.position.lon.decimal_degree,
-                    elevation=waypoint.elevation,
-                    profile=profile,
-                    sequence=sequence,
-                    wp_type=waypoint.wp_type
-                )
-            else:
-                WaypointModel.create(
-                    name=waypoint.name,
-                    latitude=waypoint.position.lat.decimal_degree,
-                    longitude=waypoint.position.lon.decimal_degree,
-                    elevation=waypoint.elevation,
-                    profile=profile,
-                    wp_type=waypoint.wp_type,
-                    station=waypoint.station
-                )
-
-        for instance in delete_list:
-            instance.delete_instance()
-        profile.save()
+            profile.aircraft = self.aircraft
+            profile.save()
+
+        WaypointModel.delete().where(WaypointModel.profile == profile).execute()
+        SequenceModel.delete().where(SequenceModel.profile == profile).execute()
+
+        sequences = self.sequences
+        if sequences:
+            SequenceModel.insert_many([dict(identifier=identifier, profile=profile)
+                                       for identifier in sequences]).execute()
+        self.saved_sequences = {sequence.identifier: sequence.id for sequence in
+                                SequenceModel.select().where(SequenceModel.profile == profile)}
+
+        rows = [self.waypoint_row(waypoint) for waypoint in self.waypoints]
+        # SQLite limits the variables of one statement, 999 in older versions
+        for batch in chunked(rows, 100):
+            WaypointModel.insert_many([self.model_row(row, profile) for row in batch]).execute()
+
+        # ids are handed out in insertion order
+        row_ids = [waypoint.id for waypoint in WaypointModel.select(WaypointModel.id)
+                   .where(WaypointModel.profile == profile).order_by(WaypointModel.id)]
+        self.saved_rows = dict()
+        for waypoint, row, row_id in zip(self.waypoints, rows, row_ids):
+            waypoint.row_id = row_id
+            self.saved_rows[row_id] = row
+        self.saved_as = profile.id, self.profilename, self.aircraft
 
     @staticmethod
     def load(profile_name):
-        profile = ProfileModel.get(ProfileModel.name == profile_name)
-        aircraft = profile.aircraft
+        """Loads a profile with one query for all its waypoints and their sequences"""
+        model = ProfileModel.get(ProfileModel.name == profile_name)
+        rows = (WaypointModel
+                .select(WaypointModel.id, WaypointModel.name, WaypointModel.latitude, WaypointModel.longitude,
+                        WaypointModel.elevation, WaypointModel.wp_type, WaypointModel.station,
+                        SequenceModel.identifier)
+                .join(SequenceModel, JOIN.LEFT_OUTER)
+                .where(WaypointModel.profile == model)
+                .order_by(WaypointModel.id))
 
         wps = list()
-        for waypoint in profile.waypoints:
-            try:
-                sequence = waypoint.sequence.identifier
-            except AttributeError:
-                sequence = 0
-
-            if waypoint.wp_type != "MSN":
-                wp = Waypoint(LatLon(Latitude(waypoint.latitude), Longitude(waypoint.longitude)),
-                              elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
-                              wp_type=waypoint.wp_type)
+        # columns are plain SQLite values, reading them from the cursor skips peewee's conversion of every value
+        for row_id, name, latitude, longitude, elevation, wp_type, station, sequence in db.execute(rows):
+            position = LatLon(Latitude(latitude), Longitude(longitude))
+            if wp_type != "MSN":
+                wp = Waypoint(position, elevation=elevation, name=name, sequence=sequence or 0, wp_type=wp_type,
+                              row_id=row_id)
             else:
-                wp = MSN(LatLon(Latitude(waypoint.latitude), Longitude(waypoint.longitude)),
-                         elevation=waypoint.elevation, name=waypoint.name, sequence=sequence,
-                         wp_type=waypoint.wp_type, station=waypoint.station)
+                wp = MSN(position, elevation=elevation, name=name, sequence=sequence or 0, wp_type=wp_type,
+                         row_id=row_id, station=station)
             wps.append(wp)
 
-        profile = Profile(profile_name, waypoints=wps, aircraft=aircraft)
-        profile.update_waypoint_numbers()
+        profile = Profile(profile_name, waypoints=wps, aircraft=model.aircraft)
+        profile.saved_as = model.id, profile_name, model.aircraft
+        profile.saved_rows = {wp.row_id: Profile.waypoint_row(wp) for wp in profile.waypoints}
+        profile.saved_sequences = dict(SequenceModel.select(SequenceModel.identifier, SequenceModel.id)
+                                       .where(SequenceModel.profile == model).tuples())
         logger.debug(
             f"Fetched {profile_name} from DB, with {len(wps)} waypoints")
         return profile
 
     @staticmethod
     def delete(profile_name):
-        profile = ProfileModel.get(name=profile_name)
-
-        for waypoint in profile.waypoints:
-            waypoint.delete_instance()
-
-        profile.delete_instance(recursive=True)
+        with db.atomic():
+            profile = ProfileModel.get(name=profile_name)
+            WaypointModel.delete().where(WaypointModel.profile == profile).execute()
+            SequenceModel.delete().where(SequenceModel.profile == profile).execute()
+            profile.delete_instance()
 
     @staticmethod
     def list_all():
@@ -0,0 +1,105 @@
+from dataclasses import replace
+from src.plan import EntryPlan
+
+# HSI DATA pushbuttons that bring up their UFC options, SEQ and WYPT, and the ones that only step the waypoint or
+# sequence shown on the page
+UFC_TAKEOVERS = {("ampcd", "1"), ("ampcd", "5")}
+PAGE_STEPS = {("ampcd", "12"), ("ampcd", "13"), ("ampcd", "15")}
+
+
+def ufc_takeover(keys, i):
+    """Run of UFC CLRs from i that only clears what the next AMPCD UFC pushbutton replaces anyway
+
+    HornetDriver.enter_waypoints clears the UFC before the first waypoint and after every waypoint, then brings
+    up the WYPT or SEQ options of the next one, which start on an empty scratchpad. Returns the end of the run
+    and the index of the pushbutton that makes it redundant, None if the presses from i are not such a run.
+    """
+    end = i
+    while end < len(keys) and keys[end] == ("ufc", "CLR"):
+        end += 1
+    takeover = end
+    while takeover < len(keys) and keys[takeover] in PAGE_STEPS:
+        takeover += 1
+    if end == i or takeover == len(keys) or keys[takeover] not in UFC_TAKEOVERS:
+        return None
+    return end, takeover
+
+
+RULES = (ufc_takeover,)
+
+
+def without(plan, dropped):
+    """Plan without the steps at the dropped indexes
+
+    The wait after a dropped press stays on the press before it and its note moves to the next press sent.
+    """
+    steps = list()
+    note = None
+    for i, step in enumerate(plan):
+        if i not in dropped:
+            if note is not None and step.note is None:
+                step = replace(step, note=note)
+            steps.append(step)
+            note = None
+            continue
+
+        note = note if step.note is None else step.note
+        if steps and step.delay_after > steps[-1].delay_after:
+            steps[-1] = replace(steps[-1], delay_after=step.delay_after)
+    return EntryPlan(plan.aircraft, steps, plan.slots)
+
+
+def same_outcome(cockpit, steps, rewritten):
+    """Whether the rewritten presses leave a branch of the cockpit model where the original ones do"""
+    original, branch = cockpit.branch(), cockpit.branch()
+    for step in steps:
+        original.press(step.control, step.press)
+    for step in rewritten:
+        branch.press(step.control, step.press)
+    return (original.registers(), original.waypoints, original.sequences, original.commits) == \
+        (branch.registers(), branch.waypoints, branch.sequences, branch.commits)
+
+
+def rewrite(plan, cockpits, rules=RULES):
+    """Plan without the presses a rule finds redundant, where every cockpit model agrees
+
+    A rule returns the end of a run of presses it would drop from an index and the index of the press that makes
+    them redundant. The run is only dropped when each cockpit, in a state the aircraft may be in when entry
+    begins, ends up the same after that press with and without it.
+    """
+    steps = plan.steps
+    keys = [cockpits[0].keys.get((step.control, step.press)) for step in steps]
+    dropped = set()
+    i = 0
+    while i < len(steps):
+        for rule in rules:
+            match = rule(keys, i)
+            if match is None:
+                continue
+
+            end, until = match
+            if all(same_outcome(cockpit, steps[i:until + 1], steps[end:until + 1]) for cockpit in cockpits):
+                dropped.update(range(i, end))
+                i = end
+                break
+        else:
+            for cockpit in cockpits:
+                cockpit.press(steps[i].control, steps[i].press)
+            i += 1
+    return without(plan, dropped) if dropped else plan
+
+
+def drop_noops(plan, cockpits):
+    """Plan without the presses that leave every cockpit model unchanged
+
+    Each cockpit starts in a state the aircraft may be in when entry begins, so a press is only dropped when it is
+    redundant whatever was left on the displays.
+    """
+    dropped = set()
+    for i, step in enumerate(plan):
+        before = [cockpit.state() for cockpit in cockpits]
+        for cockpit in cockpits:
+            cockpit.press(step.control, step.press)
+        if all(cockpit.state() == state for cockpit, state in zip(cockpits, before)):
+            dropped.add(i)
+    return without(plan, dropped)
@@ -0,0 +1,202 @@
+from dataclasses import dataclass, field
+from src.clock import Clock
+from src.scheduler import DeadlineScheduler
+
+
+def encode(control, press, release):
+    if release is None:
+        return f"{control} {press}\n".encode("utf-8"),
+    return f"{control} {press}\n".encode("utf-8"), f"{control} {release}\n".encode("utf-8")
+
+
+@dataclass(frozen=True)
+class Step:
+    control: str
+    press: str = "1"
+    release: str = "0"
+    delay_release: float = 0.0
+    delay_after: float = 0.0
+    waypoint: int = None
+    note: str = None
+    messages: tuple = field(default=None, repr=False, compare=False)
+    # (method name, call number) of each traced driver method the press was recorded in, outermost first
+    section: tuple = field(default=(), repr=False, compare=False)
+    datagrams: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # encoded once so executors only send and wait
+        if self.messages is None:
+            object.__setattr__(self, "messages", encode(self.control, self.press, self.release))
+
+        if self.release is None:
+            datagrams = (self.messages[0], self.delay_after),
+        else:
+            datagrams = (self.messages[0], self.delay_release), (self.messages[1], self.delay_after)
+        object.__setattr__(self, "datagrams", datagrams)
+
+    @property
+    def duration(self):
+        return sum(delay for _, delay in self.datagrams)
+
+
+@dataclass(frozen=True)
+class EntryEstimate:
+    aircraft: str
+    datagrams: int
+    presses: dict
+    duration: float
+
+    def slots_of(self, *kinds):
+        return sum(1 for slot in self.presses if slot is not None and slot[0] in kinds)
+
+    @property
+    def waypoints(self):
+        """Waypoint slots, of every type the aircraft has but sequences and missions"""
+        return sum(1 for slot in self.presses if slot is not None and slot[0] not in ("SEQ", "MSN"))
+
+    @property
+    def sequences(self):
+        return self.slots_of("SEQ")
+
+    @property
+    def missions(self):
+        return self.slots_of("MSN")
+
+    def __str__(self):
+        minutes, seconds = divmod(round(self.duration), 60)
+        slots = f"{self.waypoints} waypoints"
+        if self.sequences:
+            slots += f", {self.sequences} sequences"
+        if self.missions:
+            slots += f", {self.missions} missions"
+        return f"{slots}, {sum(self.presses.values())} presses, ~{minutes}:{seconds:02} to enter"
+
+
+class EntryPlan:
+    def __init__(self, aircraft, steps=None, slots=None):
+        self.aircraft = aircraft
+        self.steps = list(steps) if steps is not None else list()
+        self.slots = dict(slots) if slots is not None else dict()
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __str__(self):
+        return f"{self.aircraft} entry plan: {len(self.steps)} presses, {self.datagrams} datagrams, " \
+               f"{round(self.duration, 1)}s"
+
+    @property
+    def datagrams(self):
+        return sum(len(step.messages) for step in self.steps)
+
+    @property
+    def duration(self):
+        return sum(step.duration for step in self.steps)
+
+    @property
+    def waypoints(self):
+        return sorted({step.waypoint for step in self.steps if step.waypoint is not None})
+
+    def estimate(self):
+        """Datagrams, presses per slot and time it takes to enter this plan, without sending anything
+
+        Presses that navigate between slots are counted under None.
+        """
+        presses = dict()
+        datagrams = 0
+        duration = 0
+        for step in self.steps:
+            slot = self.slots.get(step.waypoint)
+            presses[slot] = presses.get(slot, 0) + 1
+            datagrams += len(step.messages)
+            duration += step.duration
+        return EntryEstimate(self.aircraft, datagrams, presses, duration)
+
+    def only(self, waypoints):
+        """Plan that enters only the given waypoints but keeps every navigation step"""
+        return EntryPlan(self.aircraft, [step for step in self.steps
+                                         if step.waypoint is None or step.waypoint in waypoints], self.slots)
+
+    def resume_from(self, waypoint):
+        """Plan that skips the entry steps of every waypoint before the given one but keeps navigation"""
+        return self.only({ordinal for ordinal in self.waypoints if ordinal >= waypoint})
+
+    def fingerprints(self):
+        """Presses typed for each aircraft slot, which tell whether a slot needs to be entered again"""
+        presses = dict()
+        for step in self.steps:
+            if step.waypoint is not None:
+                presses.setdefault(step.waypoint, list()).append((step.control, step.press, step.release))
+        return {slot: tuple(presses.get(ordinal, ())) for ordinal, slot in self.slots.items()}
+
+    def delta(self, entered):
+        """Plan that enters only the slots whose contents differ from entered"""
+        fingerprints = self.fingerprints()
+        return self.only({ordinal for ordinal, slot in self.slots.items()
+                          if entered.get(slot) != fingerprints[slot]})
+
+    def removed(self, entered):
+        return sorted(set(entered) - set(self.slots.values()), key=str)
+
+
+def profile_key(profile):
+    return tuple((type(wp).__name__, wp.wp_type, wp.number, wp.name, wp.sequence, getattr(wp, "station", 0),
+                  wp.elevation, wp.position.lat.decimal_degree, wp.position.lon.decimal_degree)
+                 for wp in profile.waypoints)
+
+
+class PlanExecutor:
+    def __init__(self, send, logger=None, pacer=None, clock=None, tracer=None):
+        self.send = send
+        self.logger = logger
+        self.pacer = pacer
+        self.clock = clock if clock is not None else Clock()
+        self.tracer = tracer
+        self.scheduler = DeadlineScheduler(self.clock)
+        self.elapsed = 0
+        self.stats = None
+
+    def pause(self, mark, delay, press):
+        if self.pacer is None:
+            self.clock.sleep(self.scheduler.remaining())
+            return
+
+        if press:
+            self.pacer.wait_display(mark, delay)
+        else:
+            self.pacer.wait_frame(mark, delay)
+        self.scheduler.rebase()
+
+    def run_step(self, step):
+        if self.scheduler.origin is None:
+            self.scheduler.start()
+
+        result = True
+        for i, (message, delay) in enumerate(step.datagrams):
+            mark = self.pacer.mark() if self.pacer is not None else None
+            sent = self.send(message)
+            self.scheduler.sent()
+            if self.tracer is not None:
+                self.tracer.sent(step, i, delay)
+            if i == 0:
+                result = sent == len(message)
+            self.scheduler.advance(delay)
+            self.pause(mark, delay, press=i == 0)
+        return result
+
+    def run(self, plan):
+        result = True
+        if self.tracer is not None:
+            self.tracer.start(plan)
+        self.scheduler.start()
+        for step in plan:
+            if step.note and self.logger is not None:
+                self.logger.info(step.note)
+            result = self.run_step(step) and result
+        self.scheduler.finish()
+        self.elapsed = self.scheduler.finished - self.scheduler.started
+        self.stats = self.scheduler.stats()
+        return result
@@ -0,0 +1,104 @@
+import re
+from dataclasses import dataclass
+from src.plan import PlanExecutor
+
+
+COORDINATE = r"([NSEW])\s*(\d{1,3})\D+?(\d{1,2}(?:\.\d+)?)"
+
+
+def parse_coordinate(hemisphere, degrees, minutes):
+    """Signed decimal degrees of a displayed hemisphere, degrees and decimal minutes"""
+    value = int(degrees) + float(minutes) / 60
+    return -value if hemisphere in "SW" else value
+
+
+def read_fields(text, patterns):
+    """Fields found in display text, patterns map a field to a regex whose groups are a coordinate or a number"""
+    fields = dict()
+    for field, pattern in patterns.items():
+        match = re.search(pattern, text)
+        if match is None:
+            continue
+
+        groups = match.groups()
+        fields[field] = parse_coordinate(*groups) if len(groups) == 3 else int(groups[0])
+    return fields
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    slot: tuple
+    field: str
+    expected: object
+    displayed: object
+
+    def __str__(self):
+        return f"{self.slot} {self.field}: expected {self.expected}, displayed {self.displayed}"
+
+
+class ReadbackVerifier:
+    """Reads entered waypoints back from the cockpit displays through the export stream
+
+    The driver pages through the entered slots and every slot is read once the displays show it, so frames still
+    in flight from earlier presses are never mistaken for the slot's values.
+    """
+    def __init__(self, driver, stream, outputs, logger=None, timeout=2.0):
+        self.driver = driver
+        self.stream = stream
+        self.outputs = outputs
+        self.logger = logger
+        self.timeout = timeout
+
+    def stop(self):
+        self.stream.stop()
+
+    def read(self, slot):
+        reading = None
+
+        def shown():
+            nonlocal reading
+            reading = self.driver.read_waypoint(self.stream.parser.read_strings(self.outputs))
+            return reading.get("number") == slot[1]
+
+        if not self.stream.wait_for(shown, self.timeout):
+            return None
+        return reading
+
+    def compare(self, slot, waypoint, reading):
+        if reading is None:
+            return [Mismatch(slot, "display", slot[1], None)]
+
+        mismatches = list()
+        for field, expected in (("lat", waypoint.position.lat.decimal_degree),
+                                ("lon", waypoint.position.lon.decimal_degree)):
+            displayed = reading.get(field)
+            if displayed is None or abs(displayed - expected) > self.driver.readback_tolerance:
+                mismatches.append(Mismatch(slot, field, expected, displayed))
+
+        if waypoint.elevation and reading.get("elev") != waypoint.elevation:
+            mismatches.append(Mismatch(slot, "elev", waypoint.elevation, reading.get("elev")))
+        return mismatches
+
+    def verify(self, profile, slots=None):
+        """Mismatches between the profile and what the aircraft shows for each slot, or for the given slots"""
+        entered = self.driver.entered_waypoints(profile)
+        if slots is not None:
+            entered = {slot: waypoint for slot, waypoint in entered.items() if slot in slots}
+
+        plan = self.driver.readback_plan(profile.aircraft, list(entered))
+        last = {step.waypoint: i for i, step in enumerate(plan) if step.waypoint is not None}
+        executor = PlanExecutor(self.driver.send, self.logger, clock=self.driver.clock)
+
+        mismatches = list()
+        for i, step in enumerate(plan):
+            executor.run_step(step)
+            if step.waypoint is not None and last[step.waypoint] == i:
+                slot = plan.slots[step.waypoint]
+                mismatches += self.compare(slot, entered[slot], self.read(slot))
+        return mismatches
+
+    @staticmethod
+    def retry_plan(plan, mismatches):
+        """Part of plan that enters again only the slots with mismatches"""
+        failed = {mismatch.slot for mismatch in mismatches}
+        return plan.only({ordinal for ordinal, slot in plan.slots.items() if slot in failed})
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from statistics import mean, pstdev
+
+
+@dataclass(frozen=True)
+class ScheduleStats:
+    datagrams: int
+    drift: float
+    mean_lateness: float
+    max_lateness: float
+    jitter: float
+    slips: int
+
+    def __str__(self):
+        return f"{self.datagrams} datagrams, drift {round(self.drift * 1000, 1)}ms, " \
+               f"mean lateness {round(self.mean_lateness * 1000, 2)}ms, " \
+               f"max lateness {round(self.max_lateness * 1000, 2)}ms, jitter {round(self.jitter * 1000, 2)}ms, " \
+               f"{self.slips} slips"
+
+
+class DeadlineScheduler:
+    """Gives every datagram of an entry an absolute deadline on the clock
+
+    Sleeping until each deadline instead of for each delay keeps sleep overshoot and send costs from adding up.
+    A datagram later than slip_tolerance moves every following deadline back instead of sending the rest in a
+    burst, so a stalled machine never shortens the time a button is held.
+    """
+    def __init__(self, clock, slip_tolerance=0.02):
+        self.clock = clock
+        self.slip_tolerance = slip_tolerance
+        self.started = None
+        self.origin = None
+        self.offset = 0
+        self.lateness = list()
+        self.slips = 0
+        self.finished = None
+
+    def start(self):
+        self.started = self.origin = self.clock.now()
+        self.offset = 0
+        self.lateness, self.slips, self.finished = list(), 0, None
+
+    @property
+    def due(self):
+        return self.origin + self.offset
+
+    def remaining(self):
+        return self.due - self.clock.now()
+
+    def sent(self):
+        """Records the lateness of a datagram that was just sent"""
+        lateness = self.clock.now() - self.due
+        self.lateness.append(max(lateness, 0))
+        if lateness > self.slip_tolerance:
+            self.rebase()
+            self.slips += 1
+
+    def advance(self, delay):
+        self.offset += delay
+
+    def rebase(self):
+        """Moves the next deadline to now, used after slips and waits that are not on the schedule"""
+        self.origin = self.clock.now() - self.offset
+
+    def finish(self):
+        self.finished = self.clock.now()
+
+    def stats(self):
+        end = self.finished if self.finished is not None else self.clock.now()
+        return ScheduleStats(
+            datagrams=len(self.lateness),
+            drift=end - self.started - self.offset if self.started is not None else 0,
+            mean_lateness=mean(self.lateness) if self.lateness else 0,
+            max_lateness=max(self.lateness) if self.lateness else 0,
+            jitter=pstdev(self.lateness) if self.lateness else 0,
+            slips=self.slips
+        )
@@ -0,0 +1,534 @@
+import argparse
+import copy
+import json
+import socket
+from src.dcs_bios import FakeBios, encode_frame, EXPORT_PORT, IMPORT_PORT
+from src.keymaps import compile_keymap, HORNET, HARRIER, MIRAGE, TOMCAT, WARTHOG, VIPER
+
+
+class Cockpit:
+    """Deterministic model of the keypad state machine a driver types into
+
+    Only the behaviour the driver relies on is modelled. Presses the model does not know are kept in unmodelled
+    and leave the keypad in an unknown mode, so nothing typed after them is ever taken for a no-op. Entered
+    values end up in waypoints, keyed by the number the aircraft shows for each waypoint.
+    """
+    keymap = dict()
+
+    def __init__(self):
+        keys = compile_keymap(self.keymap)
+        self.keys = {(key.control, key.press): (panel, name)
+                     for panel, names in keys.items() for name, key in names.items()}
+        self.releases = {(key.control, key.release) for names in keys.values() for key in names.values()}
+        self.mode = None
+        self.scratchpad = ""
+        self.hemisphere = None
+        self.waypoints = dict()
+        self.sequences = dict()
+        self.unmodelled = list()
+        self.commits = 0
+
+    def press(self, control, value):
+        key = self.keys.get((control, value))
+        if key is None:
+            if (control, value) not in self.releases:
+                self.unknown(control, value)
+            return
+
+        panel, name = key
+        handler = getattr(self, panel, None)
+        if handler is None or handler(name) is False:
+            self.unknown(control, value)
+
+    def feed(self, command):
+        """Takes one line of the DCS-BIOS import stream"""
+        control, _, value = command.strip().partition(" ")
+        self.press(control, value)
+
+    def run(self, plan):
+        for step in plan:
+            for message in step.messages:
+                self.feed(message.decode("utf-8"))
+        return self
+
+    def replay(self, session):
+        for _, command in session.commands:
+            self.feed(command)
+        return self
+
+    def registers(self):
+        return self.mode, self.scratchpad, self.hemisphere
+
+    def branch(self):
+        """Copy of the keypad state with empty tables, to try presses on without changing this model"""
+        cockpit = copy.copy(self)
+        cockpit.waypoints, cockpit.sequences, cockpit.unmodelled = dict(), dict(), list()
+        return cockpit
+
+    def displays(self):
+        """Text of each exported display, by DCS-BIOS control identifier"""
+        return dict()
+
+    def state(self):
+        return self.registers() + (len(self.unmodelled), self.commits)
+
+    def unknown(self, control, value):
+        self.unmodelled.append((control, value))
+        self.mode = "UNKNOWN"
+
+    def type(self, character):
+        if self.scratchpad == "ERROR":
+            self.scratchpad = ""
+        self.scratchpad += character
+
+    def clear_entry(self):
+        self.scratchpad, self.hemisphere = "", None
+
+    def error(self):
+        self.clear_entry()
+        self.scratchpad = "ERROR"
+
+    def commit(self, waypoint, field, value):
+        self.waypoints.setdefault(waypoint, dict())[field] = value
+        self.commits += 1
+
+
+class HornetCockpit(Cockpit):
+    """AMPCD HSI DATA page and UFC as HornetDriver.enter_waypoints uses them, LMDI mission pages are not modelled"""
+    keymap = HORNET
+    pages = {("MENU", 10): "HSI", ("HSI", 10): "MENU", ("HSI", 19): "DATA", ("DATA", 19): "HSI"}
+    hemispheres = {"2": "N", "8": "S", "4": "W", "6": "E"}
+
+    def __init__(self, mode=None, option=None, scratchpad="", hemisphere=None):
+        super().__init__()
+        self.page = "MENU"
+        self.waypoint = 0
+        self.sequence_presses = 0
+        self.mode = mode
+        self.option = option
+        self.scratchpad = scratchpad
+        self.hemisphere = hemisphere
+        self.whole = None
+
+    @classmethod
+    def initial_states(cls):
+        """States the UFC may have been left in by the pilot before an entry starts"""
+        return [cls(), cls(scratchpad="123"), cls(mode="WYPT", option="POSN", hemisphere="N")]
+
+    @property
+    def sequence(self):
+        # the driver moves to the next sequence with two presses of PB 15
+        return 1 + self.sequence_presses // 2
+
+    def registers(self):
+        return super().registers() + (self.page, self.waypoint, self.sequence_presses, self.option, self.whole)
+
+    def clear_entry(self):
+        super().clear_entry()
+        self.whole = None
+
+    def ampcd(self, name):
+        pb = int(name)
+        if (self.page, pb) in self.pages:
+            self.page = self.pages[(self.page, pb)]
+        elif self.page != "DATA":
+            return False
+        elif pb == 12:
+            self.waypoint += 1
+        elif pb == 13:
+            self.waypoint = max(self.waypoint - 1, 0)
+        elif pb == 15:
+            self.sequence_presses += 1
+        elif pb in (1, 5):
+            self.mode, self.option = "SEQ" if pb == 1 else "WYPT", None
+            self.clear_entry()
+        else:
+            return False
+
+    def ufc(self, name):
+        if self.mode == "UNKNOWN":
+            return False
+
+        if name == "CLR":
+            if self.scratchpad or self.hemisphere or self.whole is not None:
+                self.clear_entry()
+            else:
+                self.mode, self.option = None, None
+        elif name == "ENT":
+            self.enter()
+        elif name.startswith("OSB"):
+            return self.select(int(name[3:]))
+        elif self.option == "POSN" and not self.scratchpad and self.hemisphere is None and name in self.hemispheres:
+            self.hemisphere = self.hemispheres[name]
+        else:
+            self.type(name)
+
+    def select(self, osb):
+        if self.mode == "WYPT" and osb == 1:
+            self.option = "FEET" if self.option == "ELEV" else "POSN"
+        elif self.mode == "WYPT" and osb == 3:
+            self.option = "ELEV"
+        elif self.mode == "SEQ" and osb == 4:
+            self.option = "INS"
+        else:
+            return False
+        self.clear_entry()
+
+    def enter(self):
+        if self.option == "POSN" and self.hemisphere is not None and self.scratchpad.isdigit():
+            if self.whole is None:
+                self.whole, self.scratchpad = self.scratchpad, ""
+                return
+
+            field = "lat" if self.hemisphere in "NS" else "lon"
+            self.commit(self.waypoint, field, f"{self.hemisphere}{self.whole}.{self.scratchpad}")
+            self.clear_entry()
+        elif self.option == "FEET" and self.scratchpad.isdigit():
+            self.commit(self.waypoint, "elev", int(self.scratchpad))
+            self.clear_entry()
+        elif self.option == "INS" and self.scratchpad.isdigit():
+            self.sequences.setdefault(self.sequence, list()).append(int(self.scratchpad))
+            self.commits += 1
+            self.option = None
+            self.clear_entry()
+        else:
+            self.error()
+
+
+class HarrierCockpit(Cockpit):
+    """EHSD data page, UFC and ODU as HarrierDriver uses them, 77 ENT creates the next waypoint"""
+    keymap = HARRIER
+    hemispheres = {"2": "N", "8": "S", "4": "W", "6": "E"}
+
+    def __init__(self):
+        super().__init__()
+        self.data_page = False
+        self.waypoint = 0
+        self.option = None
+
+    def registers(self):
+        return super().registers() + (self.data_page, self.waypoint, self.option)
+
+    def lmpcd(self, name):
+        if name != "2":
+            return False
+        self.data_page = not self.data_page
+
+    def odu(self, name):
+        if not self.data_page or name not in ("1", "2", "3"):
+            return False
+        self.option = dict(zip("123", (None, "POS", "ELEV")))[name]
+        self.clear_entry()
+
+    def ufc(self, name):
+        if not self.data_page:
+            return False
+
+        if name == "CLR":
+            self.clear_entry()
+        elif name == "ENT":
+            self.enter()
+        elif self.option == "POS" and not self.scratchpad and self.hemisphere is None and name in self.hemispheres:
+            self.hemisphere = self.hemispheres[name]
+        else:
+            self.type(name)
+
+    def enter(self):
+        if self.option is None and self.scratchpad == "77":
+            self.waypoint += 1
+            self.clear_entry()
+        elif self.option == "POS" and self.hemisphere is not None and self.scratchpad.isdigit():
+            self.commit(self.waypoint, "lat" if self.hemisphere in "NS" else "lon",
+                        f"{self.hemisphere}{self.scratchpad}")
+            self.clear_entry()
+        elif self.option == "ELEV" and self.scratchpad.isdigit():
+            self.commit(self.waypoint, "elev", int(self.scratchpad))
+            self.clear_entry()
+        else:
+            self.error()
+
+
+class MirageCockpit(Cockpit):
+    """PCN in PREP mode, where two digits select the waypoint and 1 and 3 select latitude and longitude"""
+    keymap = MIRAGE
+    fields = {"1": "lat", "3": "lon"}
+    hemispheres = dict(lat={"2": "N", "8": "S"}, lon={"6": "E", "4": "W"})
+
+    def __init__(self):
+        super().__init__()
+        self.selection = None
+        self.waypoint = None
+        self.field = None
+
+    def registers(self):
+        return super().registers() + (self.selection, self.waypoint, self.field)
+
+    def pcn(self, name):
+        if name == "PREP":
+            self.mode, self.selection, self.field = "PREP", "", None
+            self.clear_entry()
+        elif self.mode != "PREP":
+            return False
+        elif name == "CLR":
+            self.clear_entry()
+        elif name == "ENTER":
+            self.enter()
+        elif self.selection is not None:
+            self.selection += name
+            if len(self.selection) == 2:
+                self.waypoint, self.selection = int(self.selection), None
+        elif self.field is None:
+            if name not in self.fields:
+                return False
+            self.field = self.fields[name]
+        elif not self.scratchpad and self.hemisphere is None and name in self.hemispheres[self.field]:
+            self.hemisphere = self.hemispheres[self.field][name]
+        else:
+            self.type(name)
+
+    def enter(self):
+        if self.field is not None and self.hemisphere is not None and self.scratchpad.isdigit():
+            self.commit(self.waypoint, self.field, f"{self.hemisphere}{self.scratchpad}")
+            self.field = None
+            self.clear_entry()
+        elif self.field is None and not self.scratchpad and self.selection is None:
+            self.mode = None
+        else:
+            self.error()
+
+
+class TomcatCockpit(Cockpit):
+    """RIO CAP in the tactical category, where a button selects the waypoint and 1, 6 and 3 its fields"""
+    keymap = TOMCAT
+    fields = {"1": "lat", "6": "lon", "3": "elev"}
+    hemispheres = dict(lat=dict(NE="N", SW="S"), lon=dict(NE="E", SW="W"))
+
+    def __init__(self):
+        super().__init__()
+        self.button = None
+        self.field = None
+
+    def registers(self):
+        return super().registers() + (self.button, self.field)
+
+    def cap(self, name):
+        if name == "TAC":
+            self.mode, self.button, self.field = "TAC", None, None
+            self.clear_entry()
+        elif self.mode != "TAC":
+            return False
+        elif name.startswith("BTN_"):
+            self.button, self.field = int(name[4:]), None
+            self.clear_entry()
+        elif self.button is None:
+            return False
+        elif name == "CLEAR":
+            if self.scratchpad or self.hemisphere or self.field is not None:
+                self.field = None
+                self.clear_entry()
+            else:
+                self.button = None
+        elif name == "ENTER":
+            self.enter()
+        elif name in ("NE", "SW"):
+            if self.field not in self.hemispheres or self.scratchpad:
+                return False
+            self.hemisphere = self.hemispheres[self.field][name]
+        elif self.field is None:
+            if name not in self.fields:
+                return False
+            self.field = self.fields[name]
+        else:
+            self.type(name)
+
+    def enter(self):
+        if self.field == "elev" and self.scratchpad.isdigit():
+            self.commit(self.button, "elev", int(self.scratchpad))
+        elif self.field in self.hemispheres and self.hemisphere is not None and self.scratchpad.isdigit():
+            self.commit(self.button, self.field, f"{self.hemisphere}{self.scratchpad}")
+        else:
+            self.error()
+            return
+        self.field = None
+        self.clear_entry()
+
+
+class WarthogCockpit(Cockpit):
+    """CDU waypoint page, line select keys take the scratchpad into the field next to them"""
+    keymap = WARTHOG
+    fields = dict(LSK_3R="name", LSK_5L="elev", LSK_7L="lat", LSK_9L="lon")
+
+    def __init__(self):
+        super().__init__()
+        self.page = None
+        self.waypoint = 0
+
+    def registers(self):
+        return super().registers() + (self.page, self.waypoint)
+
+    def cdu(self, name):
+        if name == "WP":
+            self.page = "WP"
+        elif self.page is None:
+            return False
+        elif name == "CLR":
+            self.clear_entry()
+        elif name == "LSK_3L" and self.page == "WP":
+            self.page = "WAYPOINT"
+        elif name == "LSK_7R" and self.page == "WAYPOINT":
+            self.waypoint += 1
+        elif name in self.fields:
+            return self.line_select(self.fields[name])
+        elif name.startswith("LSK_"):
+            return False
+        else:
+            self.type(name)
+
+    def line_select(self, field):
+        if self.page != "WAYPOINT" or not self.waypoint:
+            return False
+
+        value = self.scratchpad
+        if field == "name" and value.isalnum():
+            self.commit(self.waypoint, field, value)
+        elif field == "elev" and value.isdigit():
+            self.commit(self.waypoint, field, int(value))
+        elif field in ("lat", "lon") and value[:1] in ("NS" if field == "lat" else "EW") and value[1:].isdigit():
+            self.commit(self.waypoint, field, value)
+        else:
+            self.error()
+            return
+        self.clear_entry()
+
+
+class ViperCockpit(Cockpit):
+    """ICP and DED STPT page, the DCS moves the cursor between fields and the DED switch steps the steerpoint"""
+    keymap = VIPER
+    rows = ("STPT", "LAT", "LNG", "ELEV", "TOS")
+    hemispheres = dict(LAT={"2": "N", "8": "S"}, LNG={"6": "E", "4": "W"})
+
+    def __init__(self):
+        super().__init__()
+        self.steerpoint = None
+        self.row = None
+        self.negative = False
+
+    def registers(self):
+        return super().registers() + (self.steerpoint, self.row, self.negative)
+
+    def clear_entry(self):
+        super().clear_entry()
+        self.negative = False
+
+    def icp(self, name):
+        if self.mode is None and name == "4":
+            self.mode, self.steerpoint, self.row = "STPT", 1, "STPT"
+            self.clear_entry()
+        elif self.mode != "STPT":
+            return False
+        elif name == "ENTR":
+            self.enter()
+        elif not self.scratchpad and self.hemisphere is None and name in self.hemispheres.get(self.row, ()):
+            self.hemisphere = self.hemispheres[self.row][name]
+        elif self.row == "ELEV" and not self.scratchpad and not self.negative and name == "0":
+            self.negative = True
+        else:
+            self.type(name)
+
+    def data(self, name):
+        if self.mode != "STPT":
+            return False
+
+        if name == "RTN":
+            self.mode, self.row = None, None
+        else:
+            step = 1 if name == "DN" else -1
+            self.row = self.rows[(self.rows.index(self.row) + step) % len(self.rows)]
+        self.clear_entry()
+
+    def ded(self, name):
+        if self.mode != "STPT":
+            return False
+        self.steerpoint = max(self.steerpoint + (1 if name == "UP" else -1), 1)
+        self.clear_entry()
+
+    @staticmethod
+    def coordinate(value, degree_digits):
+        if value is None:
+            return ""
+        digits = value[1:]
+        return f"{value[0]} {digits[:degree_digits]}\xb0{digits[degree_digits:-3]}.{digits[-3:]}'"
+
+    def displays(self):
+        if self.mode != "STPT":
+            return {f"DED_LINE_{i}": "" for i in range(1, 6)}
+
+        entered = self.waypoints.get(self.steerpoint, dict())
+        elevation = entered.get("elev")
+        return dict(DED_LINE_1=f"      STPT {self.steerpoint:>3}  AUTO",
+                    DED_LINE_2=f"   LAT  {self.coordinate(entered.get('lat'), 2)}",
+                    DED_LINE_3=f"   LNG  {self.coordinate(entered.get('lon'), 3)}",
+                    DED_LINE_4=f"  ELEV  {elevation if elevation is not None else 0:>5}FT",
+                    DED_LINE_5="   TOS  00:00:00")
+
+    def enter(self):
+        if self.row == "STPT" and self.scratchpad.isdigit():
+            self.steerpoint = int(self.scratchpad)
+        elif self.row in self.hemispheres and self.hemisphere is not None and self.scratchpad.isdigit():
+            self.commit(self.steerpoint, "lat" if self.row == "LAT" else "lon", f"{self.hemisphere}{self.scratchpad}")
+        elif self.row == "ELEV" and self.scratchpad.isdigit():
+            self.commit(self.steerpoint, "elev", -int(self.scratchpad) if self.negative else int(self.scratchpad))
+        else:
+            self.error()
+            return
+        self.clear_entry()
+
+
+class CockpitEndpoint(FakeBios):
+    """Fake DCS that types every command it receives into a cockpit model and exports its displays
+
+    outputs gives the export address and length of each display, frames go to an ExportStream listening on
+    export_port without multicast.
+    """
+    def __init__(self, cockpit, outputs, host="127.0.0.1", port=IMPORT_PORT, export_port=EXPORT_PORT):
+        super().__init__(host, port)
+        self.cockpit = cockpit
+        self.outputs = outputs
+        self.export = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.export_address = (host, export_port)
+
+    def stop(self):
+        super().stop()
+        self.export.close()
+
+    def received(self, command):
+        super().received(command)
+        self.cockpit.feed(command)
+        writes = list()
+        for identifier, text in self.cockpit.displays().items():
+            if identifier in self.outputs:
+                address, length = self.outputs[identifier]
+                writes.append((address, text.encode("latin-1")[:length].ljust(length, b" ")))
+        self.export.sendto(encode_frame(*writes), self.export_address)
+
+
+cockpits = dict(hornet=HornetCockpit, harrier=HarrierCockpit, mirage=MirageCockpit, tomcat=TomcatCockpit,
+                warthog=WarthogCockpit, viper=ViperCockpit)
+
+
+def main():
+    from src.dcs_bios import Session
+
+    parser = argparse.ArgumentParser(description="Prints the waypoint table a recorded session leaves in a cockpit")
+    parser.add_argument("session", help="session file recorded with the fake DCS-BIOS endpoint")
+    parser.add_argument("aircraft", choices=sorted(cockpits))
+    args = parser.parse_args()
+
+    cockpit = cockpits[args.aircraft]().replay(Session.load(args.session))
+    print(json.dumps(dict(waypoints=cockpit.waypoints, sequences=cockpit.sequences), indent=2))
+    for control, value in cockpit.unmodelled:
+        print(f"not modelled: {control} {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+
+
+# attribute -> settings.ini option, the same options name the global delays in PREFERENCES and the calibrated
+# ones in each aircraft's timing section
+OPTIONS = dict(short_delay="button_release_short_delay", medium_delay="button_release_medium_delay")
+
+
+def timing_section(aircraft):
+    return f"TIMING_{aircraft.upper()}"
+
+
+@dataclass(frozen=True)
+class TimingProfile:
+    """Release delays of the two key classes a driver presses: short for most keys, medium for keys that switch
+    the keypad into another mode (hemisphere keys, ENT) and need the aircraft to catch up"""
+    short_delay: float = 0.2
+    medium_delay: float = 0.5
+
+    @classmethod
+    def load(cls, config, aircraft=None):
+        """Delays calibrated for aircraft, falling back to the global preferences and then to the defaults"""
+        delays = dict()
+        for attribute, option in OPTIONS.items():
+            value = config.getfloat("PREFERENCES", option, fallback=getattr(cls, attribute))
+            if aircraft is not None:
+                value = config.getfloat(timing_section(aircraft), option, fallback=value)
+            delays[attribute] = value
+        return cls(**delays)
+
+    def save(self, config, aircraft):
+        section = timing_section(aircraft)
+        if not config.has_section(section):
+            config.add_section(section)
+        for attribute, option in OPTIONS.items():
+            config.set(section, option, str(getattr(self, attribute)))
+
+    def __str__(self):
+        return f"short {self.short_delay}s, medium {self.medium_delay}s"
@@ -0,0 +1,109 @@
+import json
+from dataclasses import dataclass
+from src.clock import Clock
+
+
+@dataclass(frozen=True)
+class SentDatagram:
+    process: str
+    index: int
+    step: object
+    datagram: int
+    sent: float
+    planned: float
+
+
+class EntryTracer:
+    """Records when every datagram of an entry was sent and exports it as a Chrome trace
+
+    Executors report each datagram with the delay the plan asked for after it. The trace nests a span for each
+    traced driver call (enter_waypoints, enter_coords, enter_number...) the presses were recorded in and one for
+    each datagram, whose actual delay runs until the next datagram was sent. Waypoints get a row of their own.
+    Several executors, one per endpoint, can share a tracer through process().
+    """
+    def __init__(self, clock=None, name="entry", events=None):
+        self.clock = clock if clock is not None else Clock()
+        self.name = name
+        self.events = events if events is not None else list()
+        self.slots = dict()
+        self.steps = 0
+
+    def process(self, name, clock=None):
+        """Tracer recording into the same trace under another process name, on its own clock if given"""
+        tracer = EntryTracer(clock if clock is not None else self.clock, name, self.events)
+        tracer.slots = self.slots
+        return tracer
+
+    def start(self, plan):
+        self.slots.update(plan.slots)
+
+    def sent(self, step, datagram, planned):
+        if datagram == 0:
+            self.steps += 1
+        self.events.append(SentDatagram(self.name, self.steps, step, datagram, self.clock.now(), planned))
+
+    def spans(self, events):
+        """Chrome complete events of one process, its datagrams sorted by the time they were sent"""
+        spans = list()
+        open_sections = list()
+        waypoint = None
+
+        def close(depth, end):
+            while len(open_sections) > depth:
+                (name, _), start = open_sections.pop()
+                spans.append(dict(name=name, cat="call", ph="X", ts=start, dur=end - start, tid=1))
+
+        def close_waypoint(end):
+            ordinal, start = waypoint
+            slot = self.slots.get(ordinal)
+            name = f"WP ordinal {ordinal}" if slot is None else " ".join(str(part) for part in slot)
+            spans.append(dict(name=name, cat="waypoint", ph="X", ts=start, dur=end - start, tid=2))
+
+        for event, following in zip(events, events[1:] + [None]):
+            end = following.sent if following is not None else event.sent + event.planned
+            section = event.step.section
+            depth = 0
+            while depth < min(len(section), len(open_sections)) and open_sections[depth][0] == section[depth]:
+                depth += 1
+            close(depth, event.sent)
+            for call in section[depth:]:
+                open_sections.append((call, event.sent))
+
+            if waypoint is not None and waypoint[0] != event.step.waypoint:
+                close_waypoint(event.sent)
+                waypoint = None
+            if waypoint is None and event.step.waypoint is not None:
+                waypoint = (event.step.waypoint, event.sent)
+
+            message = event.step.messages[event.datagram].decode("utf-8").strip()
+            spans.append(dict(name=message, cat="datagram", ph="X", ts=event.sent, dur=end - event.sent, tid=1,
+                              args=dict(step=event.index, planned_delay=event.planned,
+                                        actual_delay=round(end - event.sent, 6), note=event.step.note)))
+
+        if events:
+            end = events[-1].sent + events[-1].planned
+            close(0, end)
+            if waypoint is not None:
+                close_waypoint(end)
+        return spans
+
+    def chrome_trace(self):
+        """Trace in the Chrome trace event format, for chrome://tracing or Perfetto"""
+        origin = min((event.sent for event in self.events), default=0)
+        processes = list(dict.fromkeys(event.process for event in self.events))
+
+        trace = list()
+        for pid, process in enumerate(processes, 1):
+            trace.append(dict(name="process_name", ph="M", pid=pid, args=dict(name=process)))
+            trace.append(dict(name="thread_name", ph="M", pid=pid, tid=1, args=dict(name="presses")))
+            trace.append(dict(name="thread_name", ph="M", pid=pid, tid=2, args=dict(name="waypoints")))
+
+            events = sorted((event for event in self.events if event.process == process), key=lambda e: e.sent)
+            for span in self.spans(events):
+                span.update(pid=pid, ts=round((span["ts"] - origin) * 1e6, 3), dur=round(span["dur"] * 1e6, 3))
+                trace.append(span)
+        return dict(traceEvents=trace, displayTimeUnit="ms")
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
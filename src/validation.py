@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+from src.objects import MSN
+
+
+def drop_reason(waypoint, limits):
+    """Why an aircraft with these per type limits cannot take a waypoint, None if it can"""
+    if waypoint.wp_type not in limits:
+        return f"{waypoint.wp_type} not supported"
+
+    limit = limits[waypoint.wp_type]
+    if limit is not None and waypoint.number > limit:
+        return f"over the limit of {limit} {waypoint.wp_type}"
+    return None
+
+
+@dataclass
+class ValidationReport:
+    """Which waypoints of a profile an aircraft takes, computed once for the editor and the driver"""
+    limits: dict
+    valid: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+    entered: dict = field(default_factory=dict)
+    dropped: list = field(default_factory=list)
+    accepted: list = field(default_factory=list)
+
+    @property
+    def missions(self):
+        return [wp for wp in self.accepted if isinstance(wp, MSN)]
+
+    @property
+    def waypoints(self):
+        return [wp for wp in self.accepted if not isinstance(wp, MSN)]
+
+    def __str__(self):
+        counts = ", ".join(f"{wp_type} {self.entered.get(wp_type, 0)}/{count}"
+                           for wp_type, count in sorted(self.counts.items()))
+        return f"{counts}, {len(self.dropped)} dropped"
+
+
+def validate(waypoints, limits):
+    """Checks every waypoint against limits in one pass
+
+    A waypoint is valid if its type is in limits and its number, counted per type and per station for missions,
+    is at most the type's limit, None for no limit. Accepted waypoints are kept grouped by type in type order,
+    like a stable sort on the type.
+    """
+    report = ValidationReport(limits)
+    by_type = dict()
+    for waypoint in waypoints:
+        wp_type = waypoint.wp_type
+        report.counts[wp_type] = report.counts.get(wp_type, 0) + 1
+        reason = drop_reason(waypoint, limits)
+        report.valid.append(reason is None)
+        if reason is None:
+            by_type.setdefault(wp_type, list()).append(waypoint)
+        else:
+            report.dropped.append((waypoint, reason))
+
+    for wp_type in sorted(by_type):
+        report.entered[wp_type] = len(by_type[wp_type])
+        report.accepted += by_type[wp_type]
+    return report
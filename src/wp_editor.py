@@ -1,25 +1,32 @@
-from time import sleep
+import asyncio
 from src.objects import default_bases
 from src.db import DatabaseInterface
 from src.logger import get_logger
-from src.drivers import HornetDriver, HarrierDriver, MirageDriver, TomcatDriver, DriverException, WarthogDriver,\
-    ViperDriver
+from src.dcs_bios import ExportStream, BiosTransport, bios_doc, control_addresses, parse_endpoints, \
+    string_outputs
+from src.entry import AsyncPlanExecutor, FanOutExecutor, EntryControl, EntryCancelled
+from src.plan import profile_key
+from src.readback import ReadbackVerifier
+from src.tracing import EntryTracer
+from src.journal import EntryJournal, journal_key
+from src.clock import Clock
+from src.drivers import DriverRegistry, DriverException
 
 
 class WaypointEditor:
 
-    def __init__(self, settings):
+    def __init__(self, settings, clock=None):
         self.logger = get_logger("driver")
         self.settings = settings
+        self.clock = clock if clock is not None else Clock()
         self.db = DatabaseInterface(settings['PREFERENCES'].get("DB_Name", "profiles.db"))
         self.default_bases = default_bases
-        self.drivers = dict(hornet=HornetDriver(self.logger, settings),
-                            harrier=HarrierDriver(self.logger, settings),
-                            mirage=MirageDriver(self.logger, settings),
-                            tomcat=TomcatDriver(self.logger, settings),
-                            warthog=WarthogDriver(self.logger, settings),
-                            viper=ViperDriver(self.logger, settings))
+        self.drivers = DriverRegistry(self.logger, settings, clock=self.clock)
         self.driver = self.drivers["hornet"]
+        self.interrupted = None
+        self.journal = self.entry_journal()
+        self.entered = dict()
+        self.last_entry_time = None
 
     def set_driver(self, driver_name):
         try:
@@ -27,12 +34,246 @@ class WaypointEditor:
         except KeyError:
             raise DriverException(f"Undefined driver: {driver_name}")
 
-    def enter_all(self, profile):
+    def plan(self, profile):
+        return self.driver.plan(profile)
+
+    def estimate(self, profile, aircraft=None):
+        """Entry estimate of a profile for the given aircraft, or the current driver's"""
+        driver = self.drivers[aircraft] if aircraft is not None else self.driver
+        return driver.estimate(profile)
+
+    def bios_doc(self, driver):
+        return bios_doc(self.settings['PREFERENCES'].get('dcs_path', ''), driver.bios_module)
+
+    def export_pacer(self, driver):
+        if self.settings['PREFERENCES'].get('closed_loop_pacing', 'false') != 'true':
+            return None
+
+        stream = ExportStream()
+        doc_path = self.bios_doc(driver)
+        try:
+            stream.watch(control_addresses(doc_path, driver.display_controls))
+        except (OSError, ValueError, KeyError):
+            self.logger.warning(f"Failed to read DCS-BIOS controls from {doc_path}, "
+                                f"presses will not wait for display confirmation", exc_info=True)
+
+        try:
+            return stream.start()
+        except OSError:
+            self.logger.warning("Failed to join the DCS-BIOS export stream, pacing with fixed delays",
+                                exc_info=True)
+            return None
+
+    def entry_tracer(self):
+        if self.settings['PREFERENCES'].get('trace_entry', 'false') != 'true':
+            return None
+        return EntryTracer(self.clock, "DCS-BIOS")
+
+    def save_trace(self, tracer):
+        path = self.settings['PREFERENCES'].get('trace_path', 'entry_trace.json')
+        try:
+            tracer.save(path)
+        except OSError:
+            self.logger.warning(f"Failed to save the entry trace to {path}", exc_info=True)
+            return
+        self.logger.info(f"Entry trace saved to {path}, open it in chrome://tracing or Perfetto")
+
+    def endpoint_transports(self):
+        """Transport of each DCS-BIOS endpoint set in the preferences, None to enter through the driver alone"""
+        text = self.settings['PREFERENCES'].get('dcs_bios_endpoints', '')
+        try:
+            endpoints = parse_endpoints(text)
+        except ValueError:
+            self.logger.warning(f"Invalid DCS-BIOS endpoints: {text}, entering on the local aircraft only")
+            return None
+
+        if not endpoints:
+            return None
+        return {f"{host}:{port}": BiosTransport(host, port) for host, port in endpoints}
+
+    def readback_verifier(self, driver):
+        if self.settings['PREFERENCES'].get('verify_entry', 'false') != 'true':
+            return None
+
+        if not driver.supports_readback:
+            self.logger.info(f"Readback is not supported for {driver.bios_module}, entry will not be verified")
+            return None
+
+        doc_path = self.bios_doc(driver)
+        try:
+            outputs = string_outputs(doc_path, driver.readback_controls)
+        except (OSError, ValueError, KeyError):
+            self.logger.warning(f"Failed to read DCS-BIOS controls from {doc_path}, entry will not be verified",
+                                exc_info=True)
+            return None
+
+        try:
+            # started before entry so the export memory holds every display when readback begins
+            stream = ExportStream().start()
+        except OSError:
+            self.logger.warning("Failed to join the DCS-BIOS export stream, entry will not be verified", exc_info=True)
+            return None
+        return ReadbackVerifier(driver, stream, outputs, self.logger)
+
+    async def verify_entry(self, verifier, profile, plan, control):
+        """Reads the entry back and enters again the slots that do not match, returns whether all of them do"""
+        loop = asyncio.get_running_loop()
+        mismatches = await loop.run_in_executor(None, verifier.verify, profile)
+        if not mismatches:
+            self.logger.info("Readback verified every waypoint")
+            return True
+
+        for mismatch in mismatches:
+            self.logger.warning(f"Readback mismatch: {mismatch}")
+
+        failed = {mismatch.slot for mismatch in mismatches}
+        self.logger.info(f"Entering {len(failed)} waypoints again")
+        executor = AsyncPlanExecutor(verifier.driver.send, self.logger, control, clock=self.clock)
+        await executor.run(verifier.driver.optimize(verifier.retry_plan(plan, mismatches)))
+
+        mismatches = await loop.run_in_executor(None, verifier.verify, profile, failed)
+        for mismatch in mismatches:
+            self.logger.error(f"Readback mismatch after entering again: {mismatch}")
+        return not mismatches
+
+    def entry_journal(self):
+        path = self.settings['PREFERENCES'].get('entry_journal', 'entry_journal.jsonl')
+        if not path:
+            return None
+
+        try:
+            return EntryJournal(path)
+        except OSError:
+            self.logger.warning(f"Failed to open the entry journal {path}, entries will not be resumable after "
+                                f"a restart", exc_info=True)
+            return None
+
+    def resume_point(self, profile):
+        """First waypoint ordinal not entered by the last cancelled entry of this profile, if any
+
+        Entries cancelled in this session are remembered in memory, the journal also covers entries that failed or
+        were cut short by a restart.
+        """
+        if self.interrupted is not None:
+            key, completed = self.interrupted
+            if key == (profile.aircraft, profile_key(profile)):
+                return 0 if completed is None else completed + 1
+
+        if self.journal is None:
+            return None
+        return self.journal.resume_point(journal_key(profile))
+
+    def record_entered(self, plan, completed=None):
+        """Remembers what each aircraft slot holds after plan ran up to the completed ordinal, or in full"""
+        entered = self.entered.setdefault(plan.aircraft, dict())
+        fingerprints = plan.fingerprints()
+        for ordinal, slot in plan.slots.items():
+            if completed is None or ordinal <= completed:
+                entered[slot] = fingerprints[slot]
+            else:
+                entered.pop(slot, None)
+
+    def delta_plan(self, driver, plan):
+        if not driver.supports_delta:
+            self.logger.info(f"Delta entry is not supported for {plan.aircraft}, entering everything")
+            return plan
+
+        entered = self.entered.get(plan.aircraft, dict())
+        for slot in plan.removed(entered):
+            self.logger.warning(f"{slot} was removed from the profile but is still loaded in the aircraft")
+
+        delta = plan.delta(entered)
+        self.logger.info(f"Delta entry: {len(delta.waypoints)} of {len(plan.waypoints)} waypoints changed")
+        return delta
+
+    async def enter_all_async(self, profile, control=None, resume=False, progress=None, delta=False):
+        if control is None:
+            control = EntryControl()
+
         self.logger.info(f"Entering waypoints for aircraft: {profile.aircraft}")
-        sleep(int(self.settings['PREFERENCES'].get('Grace_Period', 5)))
-        self.driver.enter_all(profile)
+        driver = self.driver
+        full_plan = plan = driver.plan(profile)
+        if delta:
+            plan = self.delta_plan(driver, plan)
+
+        start = self.resume_point(profile) if resume else None
+        if start:
+            self.logger.info(f"Resuming entry from waypoint ordinal {start}")
+            plan = plan.resume_from(start)
+
+        plan = driver.optimize(plan)
+
+        control.bind()
+        await control.sleep(int(self.settings['PREFERENCES'].get('Grace_Period', 5)), self.clock)
+
+        tracer = self.entry_tracer()
+        transports = self.endpoint_transports()
+        # endpoints of a fan out may stop at different waypoints, only single aircraft entries are journaled
+        journal = self.journal if transports is None else None
+        key = journal_key(profile)
+        if transports is None:
+            executor = AsyncPlanExecutor(driver.send, self.logger, control, progress=progress, clock=self.clock,
+                                         tracer=tracer, on_completed=self.journal_completed(journal, key))
+        else:
+            self.logger.info(f"Entering on {len(transports)} endpoints: {', '.join(transports)}")
+            executor = FanOutExecutor(transports, self.logger, control, progress=progress, clock=self.clock,
+                                      tracer=tracer)
+
+        # every client on the LAN exports to the same multicast group, so pacing and readback cannot tell
+        # endpoints apart
+        pacer = self.export_pacer(driver) if transports is None else None
+        verifier = self.readback_verifier(driver) if transports is None else None
+        if pacer is not None:
+            executor.pacer = pacer
+        if journal is not None:
+            journal.start(key, profile.profilename, resumed=bool(start))
+        try:
+            result = await executor.run(plan)
+            if verifier is not None:
+                result = await self.verify_entry(verifier, profile, full_plan, control) and result
+        except EntryCancelled:
+            completed = executor.completed
+            if completed is None and start:
+                completed = start - 1
+            self.interrupted = ((profile.aircraft, profile_key(profile)), completed)
+            self.record_entered(full_plan, completed if completed is not None else -1)
+            self.logger.info("Entry cancelled")
+            raise
+        finally:
+            if pacer is not None:
+                pacer.stop()
+            if verifier is not None:
+                verifier.stop()
+            for transport in (transports or dict()).values():
+                transport.close()
+            if tracer is not None:
+                self.save_trace(tracer)
+            if journal is not None:
+                journal.sync()
+
+        if journal is not None:
+            journal.finished(key)
+        self.interrupted = None
+        self.record_entered(full_plan)
+        self.last_entry_time = executor.elapsed
+        self.logger.info(f"Entry finished in {round(executor.elapsed, 1)}s: {executor.stats}")
+        return result
+
+    @staticmethod
+    def journal_completed(journal, key):
+        if journal is None:
+            return None
+        return lambda ordinal: journal.completed(key, ordinal)
+
+    def enter_all(self, profile, control=None, resume=False, progress=None, delta=False):
+        """Blocking entry, returns False if it was cancelled through control"""
+        try:
+            return asyncio.run(self.enter_all_async(profile, control, resume, progress, delta))
+        except EntryCancelled:
+            return False
 
     def stop(self):
         self.db.close()
-        if self.driver is not None:
-            self.driver.stop()
+        self.drivers.stop()
+        if self.journal is not None:
+            self.journal.close()
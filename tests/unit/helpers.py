@@ -0,0 +1,40 @@
+"""Fixtures shared by the unit tests, found relative to this file so the tests run from any directory"""
+import os
+import logging
+import configparser
+from LatLon23 import LatLon, Latitude, Longitude
+from src.objects import Profile, Waypoint, MSN
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fixtures")
+
+
+def fixture(*path):
+    return os.path.join(FIXTURES, *path)
+
+
+logger = logging.getLogger()
+config = configparser.ConfigParser()
+config.read(fixture("settings.ini"))
+
+
+class SinkTransport:
+    """Transport that sends nowhere"""
+    def send(self, message):
+        return len(message)
+
+
+def make_profile(aircraft="hornet"):
+    waypoints = [Waypoint(LatLon(Latitude(41.5 + i / 100), Longitude(41.2 + i / 100)), elevation=100 * i,
+                          sequence=1 if i else 0) for i in range(3)]
+    return Profile("test", waypoints=waypoints, aircraft=aircraft)
+
+
+def golden_profile(aircraft):
+    waypoints = [
+        Waypoint(LatLon(Latitude(41.92705), Longitude(41.86352)), elevation=52, name="Batumi", sequence=1),
+        Waypoint(LatLon(Latitude(-42.17917), Longitude(-42.49583)), elevation=0, sequence=1),
+        Waypoint(LatLon(Latitude(43.50952), Longitude(43.62534)), elevation=1572, name="Nalchik"),
+    ]
+    if aircraft == "hornet":
+        waypoints.append(MSN(LatLon(Latitude(42.27613), Longitude(42.01487)), elevation=80, station=8))
+    return Profile("golden", waypoints=waypoints, aircraft=aircraft)
@@ -0,0 +1,56 @@
+import unittest
+import configparser
+import src.drivers as drivers
+from src.calibration import SimulatedTrial, CalibrationError, calibrate
+from src.timing import TimingProfile
+from helpers import logger, config
+
+
+class TestTimingProfile(unittest.TestCase):
+    def test_calibrated_delays_loaded(self):
+        calibrated = configparser.ConfigParser()
+        calibrated.read_dict(config)
+        TimingProfile(0.07, 0.17).save(calibrated, "viper")
+
+        viper = drivers.ViperDriver(logger, calibrated)
+        hornet = drivers.HornetDriver(logger, calibrated)
+        self.assertEqual(viper.timing, TimingProfile(0.07, 0.17))
+        self.assertEqual(hornet.timing, TimingProfile(0.2, 0.5))
+        viper.stop()
+        hornet.stop()
+
+    def test_defaults_without_preferences(self):
+        driver = drivers.WarthogDriver(logger, configparser.ConfigParser())
+        self.assertEqual(driver.timing, TimingProfile())
+        driver.stop()
+
+
+class TestCalibration(unittest.TestCase):
+    holds = TimingProfile(0.05, 0.13)
+
+    def test_simulated(self):
+        for aircraft, driver_class in drivers.DRIVERS.items():
+            driver = driver_class(logger, config)
+            with self.subTest(aircraft=aircraft):
+                trial = SimulatedTrial(driver, self.holds)
+                timing = calibrate(trial, driver.timing, margin=1)
+                self.assertTrue(trial(timing))
+                self.assertFalse(trial(TimingProfile(0.04, timing.medium_delay)))
+                self.assertLessEqual(timing.short_delay, self.holds.short_delay + 0.01)
+                self.assertGreaterEqual(timing.medium_delay, timing.short_delay)
+                if aircraft in ("hornet", "harrier", "mirage", "tomcat"):
+                    self.assertFalse(trial(TimingProfile(timing.short_delay, 0.12)))
+                    self.assertLessEqual(timing.medium_delay, self.holds.medium_delay + 0.01)
+            driver.stop()
+
+    def test_margin(self):
+        driver = drivers.HornetDriver(logger, config)
+        timing = calibrate(SimulatedTrial(driver, self.holds), driver.timing, margin=1.5)
+        self.assertEqual(timing, TimingProfile(0.08, 0.2))
+        driver.stop()
+
+    def test_failing_start(self):
+        driver = drivers.TomcatDriver(logger, config)
+        with self.assertRaises(CalibrationError):
+            calibrate(SimulatedTrial(driver, self.holds), TimingProfile(0.2, 0.1))
+        driver.stop()
@@ -0,0 +1,64 @@
+import unittest
+import configparser
+import itertools
+import logging
+import random
+from LatLon23 import LatLon, Latitude, Longitude
+import src.drivers as drivers
+from src.coordinates import CoordinateFormat, format_coordinates, format_positions, longitudes
+from helpers import make_profile
+
+FORMATS = [CoordinateFormat(*options) for options in
+           itertools.product((False, True), (2, 3), (2, 3), (False, True), (0, 3, 4))]
+
+
+def random_positions(rng, count):
+    positions = list()
+    for _ in range(count):
+        sign = rng.choice((-1, 1))
+        lat = sign * rng.uniform(0, 90)
+        # whole hundredths of a second and ten thousandths of a minute sit on rounding ties
+        lon = -sign * (rng.randint(0, 179) + rng.randint(0, 59) / 60 + rng.randint(0, 5999) / 360000)
+        lat2 = sign * (rng.randint(0, 89) + rng.randint(0, 599999) / 600000)
+        positions += [LatLon(Latitude(lat), Longitude(lon)), LatLon(Latitude(lat2), Longitude(rng.uniform(-360, 360)))]
+    return positions
+
+
+class TestCoordinateFormatting(unittest.TestCase):
+    def assertMatchesLatlonTostring(self, positions):
+        formatted = format_positions(positions, FORMATS)
+        for coordinate_format in FORMATS:
+            options = [getattr(coordinate_format, option) for option in
+                       ("decimal_minutes_mode", "easting_zfill", "zfill_minutes", "one_digit_seconds", "precision")]
+            with self.subTest(format=coordinate_format):
+                self.assertEqual(formatted[coordinate_format],
+                                 [drivers.latlon_tostring(position, *options) for position in positions])
+
+    def test_matches_latlon_tostring(self):
+        self.assertMatchesLatlonTostring(random_positions(random.Random(1996), 500))
+
+    def test_edges(self):
+        values = (0, 1 - 2 ** -53, 2 - 2 ** -52, 59.99999999999999 / 60, 89.99999, 0.5, 1 / 7200)
+        self.assertMatchesLatlonTostring([LatLon(Latitude(value), Longitude(-value - 179 * (value > 0.5)))
+                                          for value in values])
+
+    def test_longitudes_wrapped_like_latlon(self):
+        rng = random.Random(7)
+        values = [rng.uniform(-720, 720) for _ in range(1000)] + [180, -180, 540, 360]
+        self.assertEqual(longitudes(values).tolist(), [Longitude(value).decimal_degree for value in values])
+
+    def test_empty(self):
+        self.assertEqual(format_coordinates([], [], FORMATS[:1]), {FORMATS[0]: []})
+
+    def test_driver_formats_profile_in_one_batch(self):
+        driver = drivers.HornetDriver(logging.getLogger(), configparser.ConfigParser())
+        profile = make_profile()
+        driver.plan(profile)
+        self.assertEqual(len(driver.formatted_positions), 2 * len(profile.waypoints))
+
+        position = profile.waypoints[0].position
+        self.assertEqual(driver.position_strings(position, driver.waypoint_format),
+                         drivers.latlon_tostring(position, decimal_minutes_mode=True))
+        other = LatLon(Latitude(-12.3456), Longitude(-123.4567))
+        self.assertEqual(driver.position_strings(other, driver.mission_format), drivers.latlon_tostring(other))
+        driver.stop()
@@ -0,0 +1,44 @@
+import unittest
+import socket
+from time import monotonic
+from src.dcs_bios import ExportParser, ExportStream, ExportReplay, encode_frame
+from src.plan import EntryPlan, PlanExecutor, Step
+
+
+class TestExportParser(unittest.TestCase):
+    def test_watched_change(self):
+        parser = ExportParser()
+        parser.watch([(0x7400, 8)])
+        self.assertTrue(parser.parse(encode_frame((0x7400, b"N 41"))))
+        self.assertFalse(parser.parse(encode_frame((0x7400, b"N 41"))))
+        self.assertFalse(parser.parse(encode_frame((0x1000, b"\x01\x00"))))
+        self.assertEqual(parser.read_string(0x7400, 8), "N 41")
+        self.assertEqual((parser.frames, parser.changes), (3, 1))
+
+
+class TestClosedLoopPacing(unittest.TestCase):
+    def setUp(self) -> None:
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        probe.bind(("127.0.0.1", 0))
+        self.port = probe.getsockname()[1]
+        probe.close()
+
+        frames = [(i / 100, encode_frame((0x7400, str(i).encode()))) for i in range(100)]
+        self.stream = ExportStream("127.0.0.1", self.port, multicast=False)
+        self.stream.watch([(0x7400, 4)])
+        self.stream.start()
+        self.replay = ExportReplay(frames, port=self.port).start()
+        self.sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def tearDown(self) -> None:
+        self.replay.stop()
+        self.stream.stop()
+        self.sink.close()
+
+    def test_confirmed_presses_skip_fixed_delays(self):
+        plan = EntryPlan("hornet", [Step(f"UFC_{i}", delay_release=1, delay_after=1) for i in range(5)])
+        executor = PlanExecutor(lambda message: self.sink.sendto(message, ("127.0.0.1", 7778)), pacer=self.stream)
+
+        start = monotonic()
+        self.assertTrue(executor.run(plan))
+        self.assertLess(monotonic() - start, plan.duration / 2)
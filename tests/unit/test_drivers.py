@@ -1,11 +1,8 @@
 import unittest
-import logging
-import configparser
+import threading
 import src.drivers as drivers
-
-logger = logging.getLogger()
-config = configparser.ConfigParser()
-config.read("../fixtures/settings.ini")
+from src.clock import Clock
+from helpers import logger, config, make_profile
 
 
 class TestBaseDriver(unittest.TestCase):
@@ -17,3 +14,136 @@ class TestBaseDriver(unittest.TestCase):
 
     def test_send_raw(self):
         self.assertTrue(self.driver.press_with_delay("RIO_CAP_CATRGORY 3"))
+
+
+class TestEntryPlan(unittest.TestCase):
+    def setUp(self) -> None:
+        self.driver = drivers.HornetDriver(logger, config)
+
+    def tearDown(self) -> None:
+        self.driver.stop()
+
+    def test_plan_does_not_send(self):
+        self.driver.transport.close()
+        plan = self.driver.plan(make_profile())
+        self.assertEqual(plan.waypoints, [0, 1, 2, 3])
+        self.assertEqual(plan.datagrams, 2 * len(plan))
+        self.assertAlmostEqual(plan.duration, sum(step.delay_release + step.delay_after for step in plan))
+
+    def test_plan_cached(self):
+        profile = make_profile()
+        plan = self.driver.plan(profile)
+        self.assertIs(plan, self.driver.plan(profile))
+        profile.waypoints[0].elevation = 5
+        self.assertIsNot(plan, self.driver.plan(profile))
+
+    def test_resume_keeps_navigation(self):
+        plan = self.driver.plan(make_profile())
+        resumed = plan.resume_from(2)
+        self.assertEqual(resumed.waypoints, [2, 3])
+        self.assertEqual(len([step for step in resumed if step.control == "AMPCD_PB_12"]), 3)
+
+    def test_delta_only_changed_slots(self):
+        profile = make_profile()
+        entered = self.driver.plan(profile).fingerprints()
+
+        profile.waypoints[1].elevation = 900
+        delta = self.driver.plan(profile).delta(entered)
+        self.assertEqual([delta.slots[ordinal] for ordinal in delta.waypoints], [("WP", 2)])
+
+        profile.update_waypoint(profile.waypoints[0], sequence=1)
+        delta = self.driver.plan(profile).delta(entered)
+        self.assertEqual([delta.slots[ordinal] for ordinal in delta.waypoints], [("WP", 2), ("SEQ", 1)])
+
+    def test_plan_never_sleeps(self):
+        class SleepRecordingClock(Clock):
+            def __init__(self):
+                self.sleeps = list()
+
+            def sleep(self, delay):
+                self.sleeps.append(delay)
+
+        for aircraft, driver_class in drivers.DRIVERS.items():
+            clock = SleepRecordingClock()
+            driver = driver_class(logger, config, clock=clock)
+            with self.subTest(aircraft=aircraft):
+                driver.plan(make_profile(aircraft))
+                # a wait recorded before any press
+                self.assertEqual(len(driver.record_plan(aircraft, driver.wait, 1)), 0)
+                driver.wait(0.5)
+                self.assertEqual(clock.sleeps, [0.5])
+            driver.stop()
+
+    def test_plans_from_several_threads(self):
+        profiles = [make_profile() for _ in range(8)]
+        for i, profile in enumerate(profiles):
+            profile.waypoints[0].elevation = i
+        expected = [drivers.HornetDriver(logger, config).plan(profile).steps for profile in profiles]
+
+        self.driver.plan_cache_size = 0
+        results = dict()
+
+        def plan(i):
+            for _ in range(20):
+                results.setdefault(i, set()).add(tuple(self.driver.plan(profiles[i]).steps))
+
+        threads = [threading.Thread(target=plan, args=(i,)) for i in range(len(profiles))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([results[i] for i in range(len(profiles))], [{tuple(steps)} for steps in expected])
+
+    def test_keys_are_precompiled(self):
+        self.driver.recording = list()
+        self.assertFalse(self.driver.press("ufc", "-"))
+        self.driver.ufc("1")
+        self.driver.ufc("1")
+        first, second = self.driver.recording
+        self.assertIs(first.messages, self.driver.keys["ufc"]["1"].messages)
+        self.assertIs(first.messages, second.messages)
+        self.assertEqual(first.messages, (b"UFC_1 1\n", b"UFC_1 0\n"))
+
+    def test_estimate(self):
+        profile = make_profile()
+        plan = self.driver.optimize(self.driver.plan(profile))
+        estimate = self.driver.estimate(profile)
+        self.assertEqual(estimate.datagrams, plan.datagrams)
+        self.assertAlmostEqual(estimate.duration, plan.duration)
+        self.assertEqual(sum(estimate.presses.values()), len(plan))
+        self.assertEqual((estimate.waypoints, estimate.sequences, estimate.missions), (3, 1, 0))
+        self.assertTrue(str(estimate).startswith("3 waypoints, 1 sequences, "))
+
+        profile.waypoints.append(profile.waypoints[-1])
+        self.assertGreater(self.driver.estimate(profile).presses[("WP", 4)], 0)
+
+
+class TestDriverRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = drivers.DriverRegistry(logger, config)
+
+    def tearDown(self) -> None:
+        self.registry.stop()
+
+    def test_built_when_first_selected(self):
+        self.assertEqual(self.registry.created, dict())
+        viper = self.registry["viper"]
+        self.assertIsInstance(viper, drivers.ViperDriver)
+        self.assertIs(self.registry["viper"], viper)
+        self.assertEqual(list(self.registry.created), ["viper"])
+        self.assertIn("hornet", self.registry)
+        self.assertNotIn("hornet", self.registry.created)
+
+    def test_shared_transport(self):
+        hornet, tomcat = self.registry["hornet"], self.registry["tomcat"]
+        self.assertIs(hornet.transport, tomcat.transport)
+        hornet.ufc("1")
+        tomcat.cap("TAC")
+        self.assertEqual(self.registry.transport.datagrams, 3)
+
+        hornet.stop()
+        self.assertTrue(tomcat.press("cap", "TAC"))
+
+    def test_unknown_aircraft(self):
+        with self.assertRaises(KeyError):
+            self.registry["spitfire"]
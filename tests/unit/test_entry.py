@@ -0,0 +1,163 @@
+import unittest
+import asyncio
+from src.entry import AsyncPlanExecutor, FanOutExecutor, EntryControl, EntryCancelled, EntryWorker
+from src.dcs_bios import BiosTransport, FakeBios, parse_endpoints
+from src.plan import EntryPlan, Step
+from src.clock import VirtualClock
+
+
+def make_plan():
+    steps = [Step("NAV", delay_after=0.001)]
+    for waypoint in range(3):
+        steps += [Step(f"KEY_{waypoint}_{i}", delay_release=0.001, delay_after=0.001, waypoint=waypoint)
+                  for i in range(3)]
+    return EntryPlan("hornet", steps)
+
+
+class TestAsyncPlanExecutor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sent = list()
+        self.control = EntryControl()
+
+    def send(self, message):
+        self.sent.append(message)
+        if message == b"KEY_1_1 1\n":
+            self.control.cancel()
+        return len(message)
+
+    def test_cancel_releases_and_reports_completed(self):
+        executor = AsyncPlanExecutor(self.send, control=self.control)
+        with self.assertRaises(EntryCancelled):
+            asyncio.run(executor.run(make_plan()))
+
+        self.assertEqual(executor.completed, 0)
+        self.assertEqual(self.sent[-1], b"KEY_1_1 0\n")
+
+    def test_resume_from_completed(self):
+        plan = make_plan().resume_from(1)
+        executor = AsyncPlanExecutor(lambda message: self.sent.append(message) or len(message))
+        self.assertTrue(asyncio.run(executor.run(plan)))
+        self.assertEqual(executor.completed, 2)
+        self.assertNotIn(b"KEY_0_0 1\n", self.sent)
+        self.assertIn(b"NAV 1\n", self.sent)
+
+    def test_virtual_clock_reports_planned_time(self):
+        plan = EntryPlan("viper", [Step(f"ICP_BTN_{i}", delay_release=0.5, delay_after=1) for i in range(1000)])
+        clock = VirtualClock()
+        executor = AsyncPlanExecutor(lambda message: len(message), clock=clock)
+
+        self.assertTrue(asyncio.run(executor.run(plan)))
+        self.assertAlmostEqual(executor.elapsed, plan.duration)
+        self.assertAlmostEqual(clock.now(), 1500)
+
+
+class TestFanOutExecutor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fakes = [FakeBios(port=0).start() for _ in range(3)]
+        self.transports = {f"{fake.host}:{fake.port}": BiosTransport(fake.host, fake.port) for fake in self.fakes}
+        self.progress = list()
+
+    def tearDown(self) -> None:
+        for fake in self.fakes:
+            fake.stop()
+        for transport in self.transports.values():
+            transport.close()
+
+    def commands(self, fake):
+        fake.wait_idle(0.05)
+        return [command for _, command in fake.session().commands]
+
+    def test_every_endpoint_entered(self):
+        plan = make_plan()
+        executor = FanOutExecutor(self.transports, progress=self.progress.append)
+        self.assertTrue(asyncio.run(executor.run(plan)))
+
+        expected = [message.decode("utf-8").strip() for step in plan for message in step.messages]
+        for fake in self.fakes:
+            self.assertEqual(self.commands(fake), expected)
+        self.assertEqual(executor.completed, 2)
+        self.assertEqual({progress.endpoint for progress in self.progress}, set(self.transports))
+        self.assertTrue(all(result.error is None for result in executor.results.values()))
+
+    def test_endpoints_share_virtual_time(self):
+        clock = VirtualClock()
+        plan = make_plan()
+        executor = FanOutExecutor(self.transports, progress=self.progress.append, clock=clock)
+        self.assertTrue(asyncio.run(executor.run(plan)))
+
+        self.assertAlmostEqual(executor.elapsed, plan.duration)
+        self.assertAlmostEqual(clock.now(), plan.duration)
+        self.assertTrue(all(progress.elapsed <= plan.duration + 1e-9 for progress in self.progress))
+        self.assertTrue(all(result.elapsed == executor.elapsed for result in executor.results.values()))
+
+    def test_failing_endpoint_reported(self):
+        failing = list(self.transports)[1]
+        self.transports[failing].close()
+        executor = FanOutExecutor(self.transports)
+        self.assertFalse(asyncio.run(executor.run(make_plan())))
+
+        self.assertIsNotNone(executor.results[failing].error)
+        self.assertIsNone(executor.completed)
+        for fake, (endpoint, result) in zip(self.fakes, executor.results.items()):
+            if endpoint != failing:
+                self.assertTrue(result.result)
+                self.assertEqual(len(self.commands(fake)), 2 * len(make_plan()))
+
+    def test_cancel_stops_every_endpoint(self):
+        control = EntryControl()
+        transport = self.transports[list(self.transports)[0]]
+        send = transport.send
+
+        def cancelling_send(message):
+            if message == b"KEY_1_1 1\n":
+                control.cancel()
+            return send(message)
+
+        transport.send = cancelling_send
+        executor = FanOutExecutor(self.transports, control=control)
+        with self.assertRaises(EntryCancelled):
+            asyncio.run(executor.run(make_plan()))
+        self.assertTrue(all(result.error == "cancelled" for result in executor.results.values()))
+
+    def test_parse_endpoints(self):
+        self.assertEqual(parse_endpoints("10.0.0.2, 10.0.0.3:7779,"), [("10.0.0.2", 7778), ("10.0.0.3", 7779)])
+        self.assertEqual(parse_endpoints(""), [])
+
+
+class FakeEditor:
+    def enter_all(self, profile, control=None, resume=False, progress=None, delta=False):
+        executor = AsyncPlanExecutor(lambda message: len(message), control=control, progress=progress)
+        try:
+            return asyncio.run(executor.run(make_plan()))
+        except EntryCancelled:
+            return False
+
+
+class SlowEditor:
+    def enter_all(self, profile, control=None, resume=False, progress=None, delta=False):
+        executor = AsyncPlanExecutor(lambda message: len(message), control=control)
+        try:
+            return asyncio.run(executor.run(EntryPlan("hornet", [Step("NAV", delay_after=60)])))
+        except EntryCancelled:
+            return False
+
+
+class TestEntryWorker(unittest.TestCase):
+    def test_single_job_with_progress(self):
+        worker = EntryWorker(FakeEditor())
+        self.assertTrue(worker.start(None))
+        self.assertFalse(worker.start(None))
+        worker.thread.join()
+
+        progress = worker.poll()
+        self.assertEqual((progress.waypoint, progress.waypoints, progress.eta), (3, 3, 0))
+        self.assertEqual(worker.result, "completed")
+        self.assertFalse(worker.busy)
+
+    def test_stop_waits_for_entry(self):
+        worker = EntryWorker(SlowEditor())
+        self.assertTrue(worker.stop())
+        self.assertTrue(worker.start(None))
+        self.assertTrue(worker.stop(timeout=5))
+        self.assertEqual(worker.result, "cancelled")
+        self.assertFalse(worker.busy)
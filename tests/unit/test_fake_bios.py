@@ -0,0 +1,30 @@
+import unittest
+import src.drivers as drivers
+from src.dcs_bios import FakeBios, Session
+from src.clock import VirtualClock
+from helpers import logger, config, fixture, golden_profile
+
+
+def record(aircraft, fake):
+    driver = drivers.DRIVERS[aircraft](logger, config, port=fake.port, clock=VirtualClock())
+    try:
+        driver.execute(driver.plan(golden_profile(aircraft)))
+    finally:
+        driver.stop()
+    fake.wait_idle()
+    return fake.session()
+
+
+class TestGoldenSessions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fake = FakeBios(port=0).start()
+
+    def tearDown(self) -> None:
+        self.fake.stop()
+
+    def test_drivers_match_golden(self):
+        for aircraft in drivers.DRIVERS:
+            with self.subTest(aircraft=aircraft):
+                self.fake.clear()
+                session = record(aircraft, self.fake)
+                self.assertEqual(session.diff(Session.load(fixture("golden", f"{aircraft}.json"))), [])
@@ -0,0 +1,101 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import src.drivers as drivers
+from src.clock import VirtualClock
+from src.entry import AsyncPlanExecutor
+from src.journal import EntryJournal, journal_key
+from helpers import logger, config, make_profile, SinkTransport
+
+
+class TestEntryJournal(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "journal.jsonl")
+        self.key = journal_key(make_profile())
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_resumed_after_reopening(self):
+        journal = EntryJournal(self.path)
+        self.assertIsNone(journal.resume_point(self.key))
+        journal.start(self.key, "test")
+        self.assertEqual(journal.resume_point(self.key), 0)
+        journal.completed(self.key, 0)
+        journal.completed(self.key, 1)
+        journal.close()
+
+        journal = EntryJournal(self.path)
+        self.assertEqual(journal.resume_point(self.key), 2)
+        journal.start(self.key, "test", resumed=True)
+        journal.completed(self.key, 2)
+        self.assertEqual(journal.resume_point(self.key), 3)
+        journal.finished(self.key)
+        journal.close()
+
+        self.assertIsNone(EntryJournal(self.path).resume_point(self.key))
+
+    def test_synced_when_entry_stops(self):
+        journal = EntryJournal(self.path)
+        journal.start(self.key)
+        for ordinal in range(40):
+            journal.completed(self.key, ordinal)
+        self.assertEqual(journal.unsynced, 41)
+        self.assertEqual(EntryJournal(self.path).resume_point(self.key), 40)
+
+        journal.sync()
+        self.assertEqual(journal.unsynced, 0)
+        journal.finished(self.key)
+        self.assertEqual(journal.unsynced, 0)
+        journal.close()
+
+    def test_new_entry_forgets_completed_waypoints(self):
+        journal = EntryJournal(self.path)
+        journal.start(self.key)
+        journal.completed(self.key, 4)
+        journal.start(self.key)
+        self.assertEqual(journal.resume_point(self.key), 0)
+        journal.close()
+
+    def test_torn_line_ignored(self):
+        journal = EntryJournal(self.path)
+        journal.start(self.key)
+        journal.completed(self.key, 0)
+        journal.close()
+        with open(self.path, "a") as f:
+            f.write('{"key": "' + self.key + '", "event": "way')
+
+        self.assertEqual(EntryJournal(self.path).resume_point(self.key), 1)
+
+    def test_compaction_keeps_unfinished_entries(self):
+        journal = EntryJournal(self.path)
+        for i in range(10):
+            journal.start(f"finished:{i}")
+            journal.completed(f"finished:{i}", 0)
+            journal.finished(f"finished:{i}")
+        journal.start(self.key, "test")
+        journal.completed(self.key, 0)
+        journal.close()
+
+        journal = EntryJournal(self.path, compact_lines=10)
+        self.assertEqual(journal.resume_point(self.key), 1)
+        journal.close()
+        with open(self.path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_executor_reports_completed_waypoints(self):
+        driver = drivers.HornetDriver(logger, config)
+        plan = driver.plan(make_profile())
+        driver.stop()
+        waypoints = sorted({step.waypoint for step in plan if step.waypoint is not None})
+
+        journal = EntryJournal(self.path)
+        journal.start(self.key)
+        executor = AsyncPlanExecutor(SinkTransport().send, clock=VirtualClock(),
+                                     on_completed=lambda ordinal: journal.completed(self.key, ordinal))
+        asyncio.run(executor.run(plan.resume_from(waypoints[1])))
+        journal.close()
+
+        self.assertEqual(journal.entries[self.key], set(waypoints[1:]))
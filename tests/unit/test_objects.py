@@ -0,0 +1,100 @@
+import unittest
+import copy
+import random
+from LatLon23 import LatLon, Latitude, Longitude
+from src.objects import Profile, Waypoint, MSN
+
+
+def rescanned(profile):
+    """Indexes and numbers of a profile computed from scratch, the way Profile used to on every access"""
+    waypoints = [wp for wp in profile.waypoints if type(wp) == Waypoint]
+    missions = [wp for wp in profile.waypoints if isinstance(wp, MSN)]
+    sequences = sorted({wp.sequence for wp in waypoints if wp.sequence})
+    stations, types = dict(), dict()
+    for mission in missions:
+        stations.setdefault(mission.station, list()).append(mission)
+    for wp in waypoints:
+        types.setdefault(wp.wp_type, list()).append(wp)
+    numbers = {id(wp): i for group in list(stations.values()) + list(types.values())
+               for i, wp in enumerate(group, 1)}
+    return dict(
+        sequences=sequences,
+        sequences_dict={identifier: [i for i, wp in enumerate(waypoints, 1) if wp.sequence == identifier]
+                        for identifier in sequences},
+        stations_dict=stations,
+        waypoints_dict=types,
+        waypoints_as_list=waypoints,
+        msns_as_list=missions,
+        numbers=[numbers[id(wp)] for wp in profile.waypoints]
+    )
+
+
+class TestProfileIndexes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.rng = random.Random(1)
+
+    def make_waypoint(self):
+        position = LatLon(Latitude(self.rng.uniform(-80, 80)), Longitude(self.rng.uniform(-170, 170)))
+        if self.rng.random() < 0.3:
+            return MSN(position, station=self.rng.choice((2, 3, 7, 8)))
+        return Waypoint(position, sequence=self.rng.choice((0, 0, 1, 2, 3)),
+                        wp_type=self.rng.choice(("WP", "WP", "FP", "IP")))
+
+    def assertIndexed(self, profile):
+        expected = rescanned(profile)
+        self.assertEqual([wp.number for wp in profile.waypoints], expected.pop("numbers"))
+        for name, value in expected.items():
+            self.assertEqual(getattr(profile, name), value, name)
+
+    def mutate(self, profile):
+        waypoints = profile.waypoints
+        operation = self.rng.randrange(8)
+        if operation == 0 or not waypoints:
+            waypoints.append(self.make_waypoint())
+        elif operation == 1:
+            waypoints.insert(self.rng.randint(0, len(waypoints)), self.make_waypoint())
+        elif operation == 2:
+            waypoints.remove(self.rng.choice(waypoints))
+        elif operation == 3:
+            waypoints.pop(self.rng.randrange(len(waypoints)))
+        elif operation == 4:
+            del waypoints[self.rng.randrange(len(waypoints))]
+        elif operation == 5:
+            wp = self.rng.choice(waypoints)
+            if isinstance(wp, MSN):
+                profile.update_waypoint(wp, station=self.rng.choice((2, 3, 7, 8)))
+            else:
+                profile.update_waypoint(wp, sequence=self.rng.choice((0, 1, 2)), wp_type=self.rng.choice(("WP", "FP")))
+        elif operation == 6:
+            waypoints.reverse()
+        else:
+            waypoints.extend([self.make_waypoint(), self.make_waypoint()])
+
+    def test_indexes_match_rescan(self):
+        for _ in range(100):
+            profile = Profile("test", [self.make_waypoint() for _ in range(self.rng.randrange(10))])
+            self.assertIndexed(profile)
+            for _ in range(30):
+                self.mutate(profile)
+                self.assertIndexed(profile)
+
+    def test_appended_waypoints_numbered(self):
+        profile = Profile("test")
+        profile.waypoints.append(Waypoint(LatLon(Latitude(1), Longitude(1)), sequence=1))
+        profile.waypoints.append(Waypoint(LatLon(Latitude(2), Longitude(2)), wp_type="FP"))
+        profile.waypoints.append(Waypoint(LatLon(Latitude(3), Longitude(3)), sequence=1))
+        profile.waypoints.append(MSN(LatLon(Latitude(4), Longitude(4)), station=8))
+        self.assertEqual([str(wp) for wp in profile.waypoints], ["WP1 | SEQ1", "FP1", "WP2 | SEQ1", "MSN1 | STA8"])
+        self.assertEqual(profile.get_sequence(1), [1, 3])
+
+        profile.waypoints.pop(0)
+        self.assertEqual([str(wp) for wp in profile.waypoints], ["FP1", "WP1 | SEQ1", "MSN1 | STA8"])
+        self.assertEqual(profile.get_sequence(1), [2])
+
+    def test_copy_keeps_indexes(self):
+        profile = Profile("test", [self.make_waypoint() for _ in range(20)])
+        copied = copy.deepcopy(profile)
+        self.assertIndexed(copied)
+        copied.waypoints.append(self.make_waypoint())
+        self.assertIndexed(copied)
+        self.assertEqual(len(profile.waypoints), 20)
@@ -0,0 +1,65 @@
+import unittest
+import src.drivers as drivers
+from src.optimizer import drop_noops, rewrite
+from src.plan import EntryPlan, Step
+from src.simulator import HornetCockpit
+from helpers import logger, config, make_profile
+
+
+class TestHornetOptimizer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.driver = drivers.HornetDriver(logger, config)
+        self.plan = self.driver.plan(make_profile())
+
+    def tearDown(self) -> None:
+        self.driver.stop()
+
+    def assertSameEndState(self, optimized):
+        for original, cockpit in zip(HornetCockpit.initial_states(), HornetCockpit.initial_states()):
+            original.run(self.plan)
+            cockpit.run(optimized)
+            self.assertEqual(cockpit.waypoints, original.waypoints)
+            self.assertEqual(cockpit.sequences, original.sequences)
+            self.assertEqual(cockpit.registers(), original.registers())
+
+    def test_same_end_state_with_fewer_datagrams(self):
+        optimized = self.driver.optimize(self.plan)
+        self.assertEqual(self.plan.datagrams - optimized.datagrams, 14)
+        self.assertEqual(optimized.waypoints, self.plan.waypoints)
+        self.assertSameEndState(optimized)
+
+    def test_ufc_takeover(self):
+        optimized = rewrite(self.plan, HornetCockpit.initial_states())
+        self.assertSameEndState(optimized)
+        # the CLR CLR preamble, the CLR after each of the 3 waypoints, the last one before the SEQ options
+        self.assertEqual(self.plan.datagrams - optimized.datagrams, 10)
+        self.assertEqual([step.control for step in optimized].count("UFC_CLR"),
+                         [step.control for step in self.plan].count("UFC_CLR") - 5)
+        for before, after in zip(optimized.steps, optimized.steps[1:]):
+            if before.control == "UFC_CLR":
+                self.assertNotIn(after.control, ("AMPCD_PB_12", "AMPCD_PB_05", "AMPCD_PB_01"))
+
+    def test_drop_noops(self):
+        optimized = drop_noops(self.plan, HornetCockpit.initial_states())
+        self.assertSameEndState(optimized)
+        # two of the three CLRs after the sequences
+        self.assertEqual(self.plan.datagrams - optimized.datagrams, 4)
+
+    def test_entered_coordinates(self):
+        cockpit = HornetCockpit().run(self.driver.optimize(self.plan))
+        profile = make_profile()
+        for i, wp in enumerate(profile.waypoints, 1):
+            lat, lon = drivers.latlon_tostring(wp.position, decimal_minutes_mode=True)
+            self.assertEqual(cockpit.waypoints[i]["lat"], f"N{lat}")
+            self.assertEqual(cockpit.waypoints[i]["lon"], f"E{lon}")
+        self.assertEqual(cockpit.sequences, {1: [0, 2, 3]})
+
+    def test_preamble_dropped_for_any_ufc_state(self):
+        start = [step.control for step in self.plan].index("AMPCD_PB_10")
+        optimized = self.driver.optimize(EntryPlan("hornet", self.plan.steps[start:], self.plan.slots))
+        self.assertEqual([step.control for step in optimized.steps[:4]],
+                         ["AMPCD_PB_10", "AMPCD_PB_19", "AMPCD_PB_12", "AMPCD_PB_05"])
+
+    def test_clear_kept_off_the_data_page(self):
+        plan = EntryPlan("hornet", [Step("UFC_CLR"), Step("AMPCD_PB_05")])
+        self.assertEqual(len(rewrite(plan, HornetCockpit.initial_states())), 2)
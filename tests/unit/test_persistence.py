@@ -0,0 +1,207 @@
+import unittest
+import os
+import sqlite3
+import tempfile
+from LatLon23 import LatLon, Latitude, Longitude
+from src.db import DatabaseInterface, MIGRATIONS
+from src.models import ProfileModel, WaypointModel, SequenceModel, db
+from src.objects import Profile, Waypoint, MSN
+
+
+def persistence_profile(name="test", count=5):
+    waypoints = [Waypoint(LatLon(Latitude(41.5 + i / 100), Longitude(41.2 + i / 100)), elevation=100 * i,
+                          name=f"WP {i}", sequence=i % 3, wp_type="FP" if i == 1 else "WP") for i in range(count)]
+    waypoints += [MSN(LatLon(Latitude(42.1), Longitude(42.2)), elevation=80, station=station) for station in (2, 8, 8)]
+    return Profile(name, waypoints=waypoints, aircraft="hornet")
+
+
+def saved(profile):
+    return [(type(wp).__name__, str(wp), wp.elevation, round(wp.latitude, 9), round(wp.longitude, 9))
+            for wp in profile.waypoints]
+
+
+class TestPersistence(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = DatabaseInterface(os.path.join(self.directory.name, "profiles.db"))
+
+    def tearDown(self) -> None:
+        self.db.close()
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        profile = persistence_profile()
+        profile.save()
+        loaded = Profile.load("test")
+        self.assertEqual(saved(loaded), saved(profile))
+        self.assertEqual(loaded.sequences_dict, profile.sequences_dict)
+        self.assertEqual(loaded.aircraft, "hornet")
+
+    def test_save_replaces_rows(self):
+        persistence_profile(count=200).save()
+        persistence_profile("other").save()
+        profile = persistence_profile(count=2)
+        profile.aircraft = "viper"
+        profile.save()
+
+        self.assertEqual(saved(Profile.load("test")), saved(profile))
+        self.assertEqual(ProfileModel.get(ProfileModel.name == "test").aircraft, "viper")
+        self.assertEqual(WaypointModel.select().count(), 5 + 8)
+        self.assertEqual(SequenceModel.select().count(), 1 + 2)
+
+    def test_delete(self):
+        persistence_profile().save()
+        persistence_profile("other").save()
+        Profile.delete("test")
+        self.assertEqual([profile.name for profile in Profile.list_all()], ["other"])
+        self.assertEqual(WaypointModel.select().count(), 8)
+        self.assertEqual(SequenceModel.select().count(), 2)
+
+    def test_save_writes_only_changes(self):
+        persistence_profile().save()
+        profile = Profile.load("test")
+        ids = [wp.row_id for wp in profile.waypoints]
+
+        profile.waypoints[2].name = "renamed"
+        profile.waypoints.pop(3)
+        profile.waypoints.append(Waypoint(LatLon(Latitude(43), Longitude(43)), sequence=4))
+        profile.save()
+
+        self.assertEqual([wp.row_id for wp in profile.waypoints][:-1], ids[:3] + ids[4:])
+        self.assertGreater(profile.waypoints[-1].row_id, max(ids))
+        loaded = Profile.load("test")
+        self.assertEqual(saved(loaded), saved(profile))
+        self.assertEqual([wp.row_id for wp in loaded.waypoints], [wp.row_id for wp in profile.waypoints])
+        self.assertEqual(loaded.sequences_dict, profile.sequences_dict)
+        self.assertEqual(SequenceModel.select().count(), 3)
+
+    def test_update_writes_one_row(self):
+        persistence_profile().save()
+        profile = Profile.load("test")
+        profile.waypoints[0].elevation = 1234
+
+        changes = db.connection().total_changes
+        profile.save()
+        self.assertEqual(db.connection().total_changes - changes, 1)
+        profile.save()
+        self.assertEqual(db.connection().total_changes - changes, 1)
+
+    def test_reordered_profile_saved_again(self):
+        profile = persistence_profile()
+        profile.save()
+        profile.waypoints.reverse()
+        profile.save()
+        self.assertEqual(saved(Profile.load("test")), saved(profile))
+
+    def test_saved_elsewhere_since(self):
+        profile = persistence_profile()
+        profile.save()
+        persistence_profile(count=7).save()
+        profile.waypoints[0].name = "renamed"
+        profile.save()
+        self.assertEqual(saved(Profile.load("test")), saved(profile))
+
+    def statements(self, call, *args):
+        statements = list()
+        db.connection().set_trace_callback(statements.append)
+        try:
+            call(*args)
+        finally:
+            db.connection().set_trace_callback(None)
+        return [statement for statement in statements if not statement.startswith(("BEGIN", "COMMIT", "SAVEPOINT",
+                                                                                    "RELEASE"))]
+
+    def test_queries_independent_of_waypoints(self):
+        persistence_profile("small", count=2).save()
+        persistence_profile("large", count=300).save()
+        for call in (Profile.load, Profile.delete):
+            self.assertEqual(len(self.statements(call, "small")), len(self.statements(call, "large")))
+        self.assertEqual(WaypointModel.select().count(), 0)
+        self.assertEqual(SequenceModel.select().count(), 0)
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "profiles.db")
+
+    def tearDown(self) -> None:
+        DatabaseInterface.close()
+        self.directory.cleanup()
+
+    def test_pragmas(self):
+        DatabaseInterface(self.path)
+        self.assertEqual(db.pragma("journal_mode"), "wal")
+        self.assertEqual(db.pragma("synchronous"), 1)
+        self.assertEqual(db.pragma("foreign_keys"), 1)
+        self.assertEqual(db.pragma("user_version"), len(MIGRATIONS))
+        self.assertFalse(os.path.exists(self.path + ".v0.bak"))
+
+    @staticmethod
+    def schema():
+        """Columns and indexes of every table, by table name"""
+        tables = dict()
+        for table in db.get_tables():
+            columns = db.execute_sql(f'PRAGMA table_info("{table}")').fetchall()
+            indexes = [(index.name, tuple(index.columns), index.unique) for index in db.get_indexes(table)]
+            foreign_keys = db.execute_sql(f'PRAGMA foreign_key_list("{table}")').fetchall()
+            tables[table] = columns, sorted(indexes), foreign_keys
+        return tables
+
+    def create_unversioned(self):
+        # databases before schema versions were tracked only had the tables and their foreign key indexes
+        db.init(self.path)
+        db.connect()
+        db.execute_sql("CREATE TABLE profilemodel (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+                       "aircraft VARCHAR(255) NOT NULL)")
+        db.execute_sql("CREATE UNIQUE INDEX profilemodel_name ON profilemodel (name)")
+        db.execute_sql("CREATE TABLE sequencemodel (id INTEGER NOT NULL PRIMARY KEY, identifier INTEGER NOT NULL, "
+                       "profile_id INTEGER NOT NULL, FOREIGN KEY (profile_id) REFERENCES profilemodel (id))")
+        db.execute_sql("CREATE TABLE waypointmodel (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(255), "
+                       "latitude REAL NOT NULL, longitude REAL NOT NULL, elevation INTEGER NOT NULL, "
+                       "profile_id INTEGER NOT NULL, sequence_id INTEGER, wp_type VARCHAR(255) NOT NULL, "
+                       "station INTEGER NOT NULL, FOREIGN KEY (profile_id) REFERENCES profilemodel (id), "
+                       "FOREIGN KEY (sequence_id) REFERENCES sequencemodel (id))")
+        db.execute_sql("CREATE INDEX sequencemodel_profile_id ON sequencemodel (profile_id)")
+        db.execute_sql("CREATE INDEX waypointmodel_profile_id ON waypointmodel (profile_id)")
+        db.execute_sql("CREATE INDEX waypointmodel_sequence_id ON waypointmodel (sequence_id)")
+        db.execute_sql("INSERT INTO profilemodel VALUES (1, 'old', 'hornet')")
+        db.execute_sql("INSERT INTO sequencemodel VALUES (1, 1, 1)")
+        db.execute_sql("INSERT INTO waypointmodel VALUES (1, 'WP', 41.5, 41.2, 100, 1, 1, 'WP', 0)")
+        db.close()
+
+    def test_fresh_and_migrated_schemas_match(self):
+        DatabaseInterface(":memory:")
+        fresh = self.schema()
+        DatabaseInterface.close()
+
+        self.create_unversioned()
+        DatabaseInterface(self.path)
+        self.assertEqual(self.schema(), fresh)
+        self.assertIn("sequencemodel_profile_id_identifier", [index[0] for index in fresh["sequencemodel"][1]])
+
+    def test_first_migration_is_the_unversioned_schema(self):
+        self.create_unversioned()
+        unversioned = self.schema()
+        DatabaseInterface.close()
+
+        db.init(":memory:")
+        db.connect()
+        MIGRATIONS[0](db)
+        self.assertEqual(self.schema(), unversioned)
+
+    def test_migrates_unversioned_database(self):
+        self.create_unversioned()
+        DatabaseInterface(self.path)
+        self.assertEqual(db.pragma("user_version"), len(MIGRATIONS))
+        self.assertIn("sequencemodel_profile_id_identifier", [index.name for index in db.get_indexes("sequencemodel")])
+        profile = Profile.load("old")
+        self.assertEqual([str(wp) for wp in profile.waypoints], ["WP1 | SEQ1 | WP"])
+        DatabaseInterface.close()
+
+        backup = sqlite3.connect(self.path + ".v0.bak")
+        self.assertEqual(backup.execute("SELECT name FROM profilemodel").fetchall(), [("old",)])
+        backup.close()
+
+        DatabaseInterface(self.path)
+        self.assertEqual(Profile.load("old").waypoints[0].elevation, 100)
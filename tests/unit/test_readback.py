@@ -0,0 +1,74 @@
+import unittest
+from LatLon23 import LatLon, Latitude, Longitude
+import src.drivers as drivers
+from src.clock import VirtualClock
+from src.dcs_bios import ExportStream
+from src.objects import Profile, Waypoint
+from src.readback import ReadbackVerifier
+from src.simulator import CockpitEndpoint, ViperCockpit
+from helpers import logger, config
+
+OUTPUTS = {f"DED_LINE_{i}": (0x4500 + 32 * i, 29) for i in range(1, 6)}
+
+
+class DroppingEndpoint(CockpitEndpoint):
+    """Loses the command with the given index, like a dropped UDP datagram"""
+    def __init__(self, *args, drop=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drop = drop
+        self.count = 0
+
+    def received(self, command):
+        self.count += 1
+        if self.count - 1 != self.drop:
+            super().received(command)
+
+
+def profile():
+    waypoints = [Waypoint(LatLon(Latitude(41.92705), Longitude(41.86352)), elevation=52),
+                 Waypoint(LatLon(Latitude(-42.17917), Longitude(-42.49583))),
+                 Waypoint(LatLon(Latitude(43.50952), Longitude(43.62534)), elevation=1572)]
+    return Profile("readback", waypoints=waypoints, aircraft="viper")
+
+
+class TestReadback(unittest.TestCase):
+    def setUp(self) -> None:
+        self.stream = ExportStream("127.0.0.1", 0, multicast=False).start()
+        self.endpoint = None
+        self.driver = None
+
+    def tearDown(self) -> None:
+        self.driver.stop()
+        self.endpoint.stop()
+        self.stream.stop()
+
+    def connect(self, drop=None):
+        self.endpoint = DroppingEndpoint(ViperCockpit(), OUTPUTS, port=0, export_port=self.stream.s.getsockname()[1],
+                                         drop=drop).start()
+        self.driver = drivers.ViperDriver(logger, config, port=self.endpoint.port, clock=VirtualClock())
+        return ReadbackVerifier(self.driver, self.stream, OUTPUTS, logger)
+
+    def enter(self, plan):
+        self.driver.execute(plan)
+        self.endpoint.wait_idle()
+
+    def test_verified(self):
+        verifier = self.connect()
+        self.enter(self.driver.plan(profile()))
+        self.assertEqual(verifier.verify(profile()), [])
+
+    def test_dropped_datagram_reentered(self):
+        plan = drivers.ViperDriver(logger, config).plan(profile())
+        second = [i for i, step in enumerate(plan) if step.waypoint == 1]
+        # the first latitude digit of the second steerpoint, after its hemisphere
+        verifier = self.connect(drop=sum(len(step.messages) for step in plan.steps[:second[1]]))
+        self.enter(plan)
+
+        mismatches = verifier.verify(profile())
+        self.assertEqual({(mismatch.slot, mismatch.field) for mismatch in mismatches}, {(("WP", 2), "lat")})
+
+        retry = verifier.retry_plan(plan, mismatches)
+        self.assertEqual(retry.waypoints, [1])
+        self.enter(retry)
+        self.assertEqual(verifier.verify(profile(), {("WP", 2)}), [])
+        self.assertEqual(verifier.verify(profile()), [])
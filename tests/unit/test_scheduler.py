@@ -0,0 +1,31 @@
+import unittest
+from src.clock import VirtualClock
+from src.plan import EntryPlan, PlanExecutor, Step
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = VirtualClock()
+        self.plan = EntryPlan("hornet", [Step(f"UFC_{i}", delay_release=0.2, delay_after=0.2) for i in range(100)])
+
+    def slow_send(self, cost):
+        def send(message):
+            self.clock.sleep(cost)
+            return len(message)
+        return send
+
+    def test_send_cost_does_not_accumulate(self):
+        executor = PlanExecutor(self.slow_send(0.005), clock=self.clock)
+        executor.run(self.plan)
+
+        self.assertAlmostEqual(executor.elapsed, self.plan.duration)
+        self.assertAlmostEqual(executor.stats.drift, 0)
+        self.assertAlmostEqual(executor.stats.mean_lateness, 0.005)
+        self.assertEqual(executor.stats.slips, 0)
+
+    def test_stall_moves_deadlines_back(self):
+        executor = PlanExecutor(self.slow_send(0.3), clock=self.clock)
+        executor.run(self.plan)
+
+        self.assertEqual(executor.stats.slips, executor.stats.datagrams)
+        self.assertAlmostEqual(executor.stats.drift, 0.3 * executor.stats.datagrams)
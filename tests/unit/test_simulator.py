@@ -0,0 +1,90 @@
+import unittest
+import random
+import re
+from LatLon23 import LatLon, Latitude, Longitude
+import src.drivers as drivers
+from src.dcs_bios import Session
+from src.objects import Profile, Waypoint
+from src.simulator import cockpits
+from helpers import logger, config, fixture, golden_profile
+
+LIMITS = dict(hornet=20, harrier=20, mirage=9, tomcat=3, warthog=20, viper=20)
+
+
+def random_profile(aircraft, rng):
+    def degrees(limit):
+        return rng.choice((-1, 1)) * rng.uniform(1, limit)
+
+    waypoints = [Waypoint(LatLon(Latitude(degrees(80)), Longitude(degrees(179))),
+                          elevation=rng.choice((0, rng.randint(1, 15000))),
+                          name=rng.choice(("", "Batumi", "Senaki-Kolkhi", "WP 12")),
+                          sequence=rng.choice((0, 0, 1, 2)) if aircraft == "hornet" else 0)
+                 for _ in range(rng.randint(1, LIMITS[aircraft]))]
+    return Profile("fuzz", waypoints=waypoints, aircraft=aircraft)
+
+
+def typed_position(aircraft, position):
+    """Latitude and longitude as each driver types them, with the hemisphere it selects first"""
+    if aircraft == "hornet":
+        lat, lon = drivers.latlon_tostring(position, decimal_minutes_mode=True)
+    elif aircraft == "harrier":
+        lat, lon = (value.split(".")[0] for value in
+                    drivers.latlon_tostring(position, decimal_minutes_mode=False, easting_zfill=3))
+    elif aircraft == "mirage":
+        lat, lon = (value[:-2].replace(".", "") for value in
+                    drivers.latlon_tostring(position, decimal_minutes_mode=True, easting_zfill=3))
+    elif aircraft == "tomcat":
+        lat, lon = drivers.latlon_tostring(position, one_digit_seconds=True)
+    else:
+        lat, lon = (value.replace(".", "") for value in
+                    drivers.latlon_tostring(position, decimal_minutes_mode=True, easting_zfill=3, precision=3))
+
+    return ("N" if position.lat.degree > 0 else "S") + lat, ("E" if position.lon.degree > 0 else "W") + lon
+
+
+def expected_table(aircraft, profile):
+    table = dict()
+    for i, wp in enumerate(profile.waypoints_as_list, 1):
+        lat, lon = typed_position(aircraft, wp.position)
+        entry = dict(lat=lat, lon=lon)
+        if wp.elevation and aircraft != "mirage":
+            entry["elev"] = wp.elevation
+        if aircraft == "warthog":
+            entry["name"] = re.sub(r'[^A-Za-z0-9]', '', wp.name).upper() or f"WP{wp.number}"
+        table[wp.number if aircraft == "tomcat" else i] = entry
+    return table
+
+
+def expected_sequences(profile):
+    return {identifier: ([0] if identifier == 1 else []) + waypoints
+            for identifier, waypoints in profile.sequences_dict.items()}
+
+
+class TestCockpitSimulator(unittest.TestCase):
+    def test_fuzzed_profiles(self):
+        rng = random.Random(1996)
+        for aircraft, driver_class in drivers.DRIVERS.items():
+            driver = driver_class(logger, config)
+            for i in range(25):
+                profile = random_profile(aircraft, rng)
+                with self.subTest(aircraft=aircraft, profile=i):
+                    cockpit = cockpits[aircraft]().run(driver.optimize(driver.plan(profile)))
+                    self.assertEqual(cockpit.waypoints, expected_table(aircraft, profile))
+                    if aircraft == "hornet":
+                        self.assertEqual(cockpit.sequences, expected_sequences(profile))
+                    else:
+                        self.assertEqual(cockpit.unmodelled, [])
+            driver.stop()
+
+    def test_golden_sessions(self):
+        for aircraft, driver_class in drivers.DRIVERS.items():
+            with self.subTest(aircraft=aircraft):
+                driver = driver_class(logger, config)
+                plan = driver.optimize(driver.plan(golden_profile(aircraft)))
+                driver.stop()
+
+                replayed = cockpits[aircraft]().replay(Session.load(fixture("golden", f"{aircraft}.json")))
+                simulated = cockpits[aircraft]().run(plan)
+                self.assertEqual(replayed.waypoints, simulated.waypoints)
+                self.assertEqual(replayed.sequences, simulated.sequences)
+                self.assertEqual(replayed.registers(), simulated.registers())
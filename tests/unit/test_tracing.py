@@ -0,0 +1,72 @@
+import unittest
+import asyncio
+import json
+import os
+import tempfile
+import src.drivers as drivers
+from src.clock import VirtualClock
+from src.entry import AsyncPlanExecutor, FanOutExecutor
+from src.plan import PlanExecutor
+from src.tracing import EntryTracer
+from helpers import logger, config, make_profile, SinkTransport
+
+
+class TestEntryTracer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.driver = drivers.HornetDriver(logger, config)
+        self.plan = self.driver.plan(make_profile())
+        self.clock = VirtualClock()
+        self.tracer = EntryTracer(self.clock)
+
+    def tearDown(self) -> None:
+        self.driver.stop()
+
+    def spans(self, category):
+        return [event for event in self.tracer.chrome_trace()["traceEvents"] if event.get("cat") == category]
+
+    def test_steps_tagged_with_driver_calls(self):
+        calls = {tuple(name for name, _ in step.section) for step in self.plan}
+        self.assertIn(("enter_all", "enter_missions"), calls)
+        self.assertIn(("enter_all", "enter_waypoints", "enter_coords", "enter_number"), calls)
+
+    def test_datagram_spans(self):
+        asyncio.run(AsyncPlanExecutor(SinkTransport().send, clock=self.clock, tracer=self.tracer).run(self.plan))
+        datagrams = self.spans("datagram")
+        self.assertEqual(len(datagrams), self.plan.datagrams)
+        for span in datagrams:
+            self.assertAlmostEqual(span["args"]["actual_delay"], span["args"]["planned_delay"])
+        self.assertAlmostEqual(sum(span["dur"] for span in datagrams) / 1e6, self.plan.duration)
+
+    def test_calls_contain_their_presses(self):
+        PlanExecutor(SinkTransport().send, clock=self.clock, tracer=self.tracer).run(self.plan)
+        calls = self.spans("call")
+        root, = [span for span in calls if span["name"] == "enter_all"]
+        self.assertAlmostEqual(root["dur"] / 1e6, self.plan.duration)
+        self.assertEqual(sum(1 for span in calls if span["name"] == "enter_coords"), 3)
+
+        for span in calls + self.spans("datagram"):
+            self.assertGreaterEqual(span["ts"], root["ts"])
+            self.assertLessEqual(span["ts"] + span["dur"], root["ts"] + root["dur"] + 1e-3)
+
+        missions = sum(span["dur"] for span in calls if span["name"] == "enter_missions")
+        waypoints = sum(span["dur"] for span in calls if span["name"] == "enter_waypoints")
+        self.assertAlmostEqual((missions + waypoints) / 1e6, self.plan.duration)
+
+        names = [span["name"] for span in self.spans("waypoint")]
+        self.assertEqual(names, ["WP 1", "WP 2", "WP 3", "SEQ 1"])
+
+    def test_fan_out_processes(self):
+        transports = dict(one=SinkTransport(), two=SinkTransport())
+        asyncio.run(FanOutExecutor(transports, clock=VirtualClock(), tracer=self.tracer).run(self.plan))
+        processes = [event["args"]["name"] for event in self.tracer.chrome_trace()["traceEvents"]
+                     if event["name"] == "process_name"]
+        self.assertEqual(processes, ["one", "two"])
+        self.assertEqual(len(self.spans("datagram")), 2 * self.plan.datagrams)
+
+    def test_save(self):
+        PlanExecutor(SinkTransport().send, clock=self.clock, tracer=self.tracer).run(self.plan)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            self.tracer.save(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["displayTimeUnit"], "ms")
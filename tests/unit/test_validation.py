@@ -0,0 +1,61 @@
+import unittest
+from LatLon23 import LatLon, Latitude, Longitude
+import src.drivers as drivers
+from src.objects import Profile, Waypoint, MSN
+from src.validation import validate
+from helpers import logger, config
+
+
+def position(i):
+    return LatLon(Latitude(41.5 + i / 100), Longitude(41.2 + i / 100))
+
+
+def typed_profile(wp_types, stations=(), aircraft="tomcat"):
+    waypoints = [Waypoint(position(i), wp_type=wp_type) for i, wp_type in enumerate(wp_types)]
+    waypoints += [MSN(position(i), station=station) for i, station in enumerate(stations)]
+    return Profile("test", waypoints=waypoints, aircraft=aircraft)
+
+
+class TestValidation(unittest.TestCase):
+    def test_consecutive_invalid_waypoints_all_dropped(self):
+        profile = typed_profile(["WP"] * 6)
+        report = validate(profile.waypoints, dict(WP=3))
+        self.assertEqual([str(wp) for wp in report.accepted], ["WP1", "WP2", "WP3"])
+        self.assertEqual(report.valid, [True] * 3 + [False] * 3)
+        self.assertEqual(report.counts, dict(WP=6))
+        self.assertEqual(report.entered, dict(WP=3))
+        self.assertEqual([reason for _, reason in report.dropped], ["over the limit of 3 WP"] * 3)
+
+    def test_grouped_by_type(self):
+        profile = typed_profile(["WP", "IP", "FP", "WP", "ST", "IP"])
+        report = validate(profile.waypoints, dict(WP=3, FP=1, IP=1, ST=1, HA=1, DP=1, HB=1))
+        self.assertEqual([str(wp) for wp in report.accepted], ["FP1", "IP1", "ST1", "WP1", "WP2"])
+        self.assertEqual(report.accepted, sorted([wp for wp in profile.waypoints if str(wp) != "IP2"],
+                                                 key=lambda wp: wp.wp_type))
+        self.assertEqual(str(report), "FP 1/1, IP 1/2, ST 1/1, WP 2/2, 1 dropped")
+
+    def test_unsupported_type(self):
+        profile = typed_profile(["WP"], stations=(2, 2))
+        report = validate(profile.waypoints, dict(WP=None))
+        self.assertEqual(report.missions, [])
+        self.assertEqual([reason for _, reason in report.dropped], ["MSN not supported"] * 2)
+
+    def test_missions_limited_per_station(self):
+        profile = typed_profile(["WP"], stations=[2] * 7 + [8] * 2, aircraft="hornet")
+        report = validate(profile.waypoints, dict(WP=None, MSN=6))
+        self.assertEqual(len(report.missions), 8)
+        self.assertEqual(len(report.waypoints), 1)
+        self.assertEqual([str(wp) for wp, _ in report.dropped], ["MSN7 | STA2"])
+
+    def test_driver_shares_report_until_profile_changes(self):
+        driver = drivers.TomcatDriver(logger, config)
+        profile = typed_profile(["WP"] * 5)
+        report = driver.validation(profile)
+        self.assertIs(report, driver.validation(profile))
+        self.assertEqual(driver.validate_waypoints(profile.waypoints), report.accepted)
+        self.assertEqual(len(report.waypoints), 3)
+
+        profile.waypoints.pop()
+        profile.update_waypoint_numbers()
+        self.assertIsNot(report, driver.validation(profile))
+        driver.stop()